@@ -1,9 +1,9 @@
 from __future__ import print_function
 from lxml import etree as ET
+import hashlib
 import os
-import pkg_resources as pkg
 
-from pygcam.config import getConfigDict, getParam, stringTrue
+from pygcam.config import getConfigDict, getParam, getParamAsBoolean, stringTrue
 from pygcam.log import getLogger
 from pygcam.error import XmlFormatError, PygcamException
 
@@ -35,6 +35,31 @@ _ops = {
 
 _types = {'str': str, 'int': int, 'float': float, 'bool': bool}
 
+# Compiled schemas keyed by schemaPath, shared by all XMLFile instances
+_schemas = {}
+
+# (schemaPath, digest) of XML content that has been validated successfully
+_validated = set()
+
+def getSchema(schemaPath):
+    """
+    Return the compiled XMLSchema for `schemaPath`, the path relative to the
+    root of the package to an .xsd file. Each schema is compiled only once per
+    process.
+    """
+    schema = _schemas.get(schemaPath)
+    if schema is None:
+        import pkg_resources as pkg     # slow to import, so deferred until needed
+
+        # ensure that the entire directory has been extracted so that 'xs:include' works
+        pkg.resource_filename('pygcam', os.path.dirname(schemaPath))
+        abspath = pkg.resource_filename('pygcam', schemaPath)
+
+        xsd = ET.parse(abspath)
+        schema = _schemas[schemaPath] = ET.XMLSchema(xsd)
+
+    return schema
+
 # TBD: Modified from version from mcs.XML
 
 class XMLFile(object):
@@ -111,29 +136,34 @@ class XMLFile(object):
         """
         Validate a ParameterList against ``self.schemaFile``. Optionally raises an
         error on failure, else return boolean validity status. If no schema file
-        is defined, return ``True``.
+        is defined, or config variable GCAM.ValidateXML is False, return ``True``.
+        Content that has been validated against the same schema is not validated
+        again.
         """
-        if not self.schemaPath:
+        if not self.schemaPath or not getParamAsBoolean('GCAM.ValidateXML'):
             return True
 
         tree = self.tree
 
-        # ensure that the entire directory has been extracted so that 'xs:include' works
-        pkg.resource_filename('pygcam', os.path.dirname(self.schemaPath))
-        abspath = pkg.resource_filename('pygcam', self.schemaPath)
+        key = (self.schemaPath, hashlib.sha1(ET.tostring(tree)).hexdigest())
+        if key in _validated:
+            return True
 
-        xsd = ET.parse(abspath)
-        schema = ET.XMLSchema(xsd)
+        schema = getSchema(self.schemaPath)
 
         if raiseOnError:
             try:
                 schema.assertValid(tree)
-                return True
             except ET.DocumentInvalid as e:
                 raise XmlFormatError("Validation of '%s'\n  using schema '%s' failed:\n  %s" % (self.filename, self.schemaPath, e))
+            valid = True
         else:
             valid = schema.validate(tree)
-            return valid
+
+        if valid:
+            _validated.add(key)
+
+        return valid
 
     def evalTest(self, node):
         tag = node.tag
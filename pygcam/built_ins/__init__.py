@@ -1,27 +1,23 @@
-from .building_plugin import BuildingCommand
-from .buildingElec_plugin import BuildingElecCommand
-from .transport_plugin import TransportCommand
-from .chart_plugin import ChartCommand
-from .config_plugin import ConfigCommand
-from .diff_plugin import DiffCommand
-from .gcam_plugin import GcamCommand
-from .gui_plugin import GUICommand
-from .init_plugin import InitCommand
-from .mcs_plugin import MCSCommand
-from .mi_plugin import ModelInterfaceCommand
-from .new_plugin import NewProjectCommand
-from .protect_plugin import ProtectLandCommand
-from .query_plugin import QueryCommand
-from .res_plugin import RESCommand
-from .run_plugin import RunCommand
-from .sandbox_plugin import SandboxCommand
-from .setup_plugin import SetupCommand
-from .compare_plugin import CompareCommand
-from .zev_plugin import ZEVCommand
-from.industry_plugin import IndustryCommand
-
-BuiltinSubcommands = [BuildingCommand, BuildingElecCommand, ChartCommand, CompareCommand,
-                      ConfigCommand, DiffCommand, GcamCommand, GUICommand, IndustryCommand,
-                      InitCommand, MCSCommand, ModelInterfaceCommand, NewProjectCommand,
-                      ProtectLandCommand, QueryCommand, RESCommand, RunCommand, SandboxCommand,
-                      SetupCommand, TransportCommand, ZEVCommand]
+# Built-in sub-commands, as (module, class) names. Modules are imported only
+# when the sub-command is used; see GcamTool.
+BuiltinSubcommands = [('building_plugin',      'BuildingCommand'),
+                      ('buildingElec_plugin',  'BuildingElecCommand'),
+                      ('chart_plugin',         'ChartCommand'),
+                      ('compare_plugin',       'CompareCommand'),
+                      ('config_plugin',        'ConfigCommand'),
+                      ('diff_plugin',          'DiffCommand'),
+                      ('gcam_plugin',          'GcamCommand'),
+                      ('gui_plugin',           'GUICommand'),
+                      ('industry_plugin',      'IndustryCommand'),
+                      ('init_plugin',          'InitCommand'),
+                      ('mcs_plugin',           'MCSCommand'),
+                      ('mi_plugin',            'ModelInterfaceCommand'),
+                      ('new_plugin',           'NewProjectCommand'),
+                      ('protect_plugin',       'ProtectLandCommand'),
+                      ('query_plugin',         'QueryCommand'),
+                      ('res_plugin',           'RESCommand'),
+                      ('run_plugin',           'RunCommand'),
+                      ('sandbox_plugin',       'SandboxCommand'),
+                      ('setup_plugin',         'SetupCommand'),
+                      ('transport_plugin',     'TransportCommand'),
+                      ('zev_plugin',           'ZEVCommand')]
@@ -92,6 +92,11 @@ class ChartCommand(SubcommandABC):
                             help=clean_help('''A column to use as the index column, or blank for None. This column
                             is displayed on the X-axis of stacked barcharts. Default value is "region".'''))
 
+        parser.add_argument('-j', '--jobs', type=int, default=None,
+                            help=clean_help('''With --fromFile, render charts in this many parallel processes.
+                            Charts are grouped by CSV file so that each file is read only once. Default
+                            is the value of config parameter GCAM.ChartJobs.'''))
+
         parser.add_argument('-k', '--yticks', action="store_true",
                             help=clean_help("Show tick marks on Y-axis. Default is no tick marks."))
 
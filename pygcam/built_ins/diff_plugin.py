@@ -42,8 +42,10 @@ class DiffCommand(SubcommandABC):
                             holding a list of queries to run, with optional mappings specified to rewrite output.
                             This file has the same structure as the <queries> element in project.xml. If the file
                             doesn't end in ".xml", it must be a text file listing the names of queries to process,
-                            one per line. NOTE: When --queryFile is specified, the two positional arguments are
-                            required: the names of the baseline and policy scenarios, in that order.'''))
+                            one per line. NOTE: When --queryFile is specified, the positional arguments are
+                            the names of the baseline scenario and one or more policy scenarios, in that
+                            order. The baseline results for each query are read once and compared to those
+                            of each policy.'''))
 
         parser.add_argument('-r', '--rewriteSetsFile',
                             help=clean_help('''An XML file defining query maps by name (default taken from
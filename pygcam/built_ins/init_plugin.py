@@ -317,8 +317,7 @@ class InitCommand(SubcommandABC):
 
             argList = ['new', dfltProject, '-r', projectDir] + (['--overwrite'] if overwrite else [])
 
-            args = tool.parser.parse_args(args=argList)
-            tool.run(args=args)
+            tool.run(argList=argList)
             print('Created project "%s" in %s' % (dfltProject, newProjectDir))
 
 PluginClass = InitCommand
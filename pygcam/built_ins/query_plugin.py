@@ -47,6 +47,11 @@ class QueryCommand(SubcommandABC):
                             help=clean_help('''The scenario group directory name, if any. Used with to compute default
                             for --workspace argument.'''))
 
+        parser.add_argument('-j', '--jobs', type=int, default=None,
+                            help=clean_help('''Divide the queries among this many batch files and run
+                            ModelInterface on these in parallel. Default is the value of config
+                            parameter GCAM.QueryJobs.'''))
+
         parser.add_argument('-n', '--noRun', action="store_true",
                             help=clean_help("Show the command to be run, but don't run it"))
 
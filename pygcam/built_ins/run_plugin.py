@@ -39,6 +39,11 @@ class RunCommand(SubcommandABC):
         parser.add_argument('-G', '--listGroups', action='store_true',
                             help=clean_help('''List the scenario groups defined in the project file and exit.'''))
 
+        parser.add_argument('-j', '--setupJobs', type=int, default=None,
+                            help=clean_help('''Run the "setup" steps of the policy scenarios in this many
+                            processes, after the baseline's steps have run. Default is the value of config
+                            parameter GCAM.SetupJobs.'''))
+
         parser.add_argument('-k', '--skipStep', dest='skipSteps', action='append',
                             help=clean_help('''Steps to skip. These must be names of steps defined in the
                             project.xml file. Multiple steps can be given in a single (comma-delimited)
@@ -7,6 +7,7 @@
 '''
 import argparse
 import os
+import time
 
 from .matplotlibFix import plt
 from matplotlib.ticker import FuncFormatter
@@ -15,11 +16,11 @@ import numpy as np
 import seaborn as sns
 import shlex
 
-from .config import pathjoin, unixPath
+from .config import getParamAsInt, pathjoin, unixPath
 from .error import CommandlineError
 from .log import getLogger
 from .query import dropExtraCols, readCsv
-from .utils import systemOpenFile, digitColumns
+from .utils import systemOpenFile, digitColumns, mkdirs, workerProcessPool
 
 _logger = getLogger(__name__)
 
@@ -34,10 +35,20 @@ def setupPalette(count, pal=None):
     sns.set_palette(palette, n_colors=count)
 
 
+_plotSettings = None
+
 # For publications, call setupPlot("paper", font_scale=1.5)
 def setupPlot(context="talk", style="white", font_scale=1.0):
+    global _plotSettings
+
+    # Skip the (relatively slow) seaborn calls if the settings are unchanged
+    settings = (context, style, font_scale)
+    if settings == _plotSettings:
+        return
+
     sns.set_context(context, font_scale=font_scale)
     sns.set_style(style)
+    _plotSettings = settings
 
 
 def _getFloatFromFile(filename):
@@ -102,14 +113,11 @@ def plotUnstackedRegionComparison(df, categoryCol, valueCol=None, region=None,
 
     yearCols = digitColumns(df)
 
-    if valueCol:
-        # Copy value col so we can delete all yearCols
-        df[plotCol] = df[valueCol]
-    else:
-        # Create and plot a new column with values summed across years
-        df[plotCol] = df[yearCols].sum(axis=1)
+    # Plot the value col, or a new column with values summed across years
+    values = df[valueCol] if valueCol else df[yearCols].sum(axis=1)
 
     df = df.drop(yearCols, axis=1)          # copy to not affect caller's df
+    df[plotCol] = values
 
     regions = region.split(',')
     reg   = df.query('region in %s' % regions)
@@ -285,6 +293,7 @@ def plotTimeSeries(df, xlabel='', ylabel='', box=False, zeroLine=False, title=""
                    openFile=False, closeFig=True):
 
     setupPlot()
+    setupPalette(1)     # so the line color doesn't depend on previous plots
     fig, ax = plt.subplots(1, 1, figsize=(8, 4))
 
     yearCols = digitColumns(df)
@@ -333,7 +342,7 @@ def plotTimeSeries(df, xlabel='', ylabel='', box=False, zeroLine=False, title=""
     return (fig, ax)
 
 
-def chartGCAM(args, num=None, negate=False):
+def chartGCAM(args, num=None, negate=False, cache=False):
     """
     Generate a chart from GCAM data. This function is called to process
     the ``chart`` sub-command for a single scenario. See the command-line
@@ -345,7 +354,10 @@ def chartGCAM(args, num=None, negate=False):
         filename to allow files to have numerical sequence.
     :param negate: (bool) if True, all values in year columns are multiplied
         by -1 before plotting.
-    :return: none
+    :param cache: (bool) if True, the CSV file is read through the in-memory
+        CSV cache, so charting the same file repeatedly reads it only once.
+    :return: (list of (str, float)) the pathname of each image file generated
+        and the number of seconds taken to render it.
     """
     barWidth   = args.barWidth
     box        = args.box
@@ -385,8 +397,7 @@ def chartGCAM(args, num=None, negate=False):
     # use outputDir if provided, else use parent dir of outFile
     outputDir = outputDir or os.path.dirname(outFile)
 
-    if not os.path.lexists(outputDir):
-        os.mkdir(outputDir, 0o755)
+    mkdirs(outputDir, 0o755)
 
     if outFile:
         imgFile = os.path.basename(outFile)
@@ -410,7 +421,9 @@ def chartGCAM(args, num=None, negate=False):
         yearStrs = None
 
     # e.g., "/Users/rjp/ws-ext/new-reference/batch-new-reference/LUC_Emission_by_Aggregated_LUT_EM-new-reference." % scenario
-    df = readCsv(csvFile, skiprows=args.skiprows, years=yearStrs, interpolate=args.interpolate)
+    # the DataFrame is copied below before any modification
+    df = readCsv(csvFile, skiprows=args.skiprows, years=yearStrs, interpolate=args.interpolate,
+                 cache=cache, mutable=False)
 
     if region:
         try:
@@ -451,8 +464,11 @@ def chartGCAM(args, num=None, negate=False):
     imgFileOrig = imgFile
     titleOrig   = title
     dfOrig = df
+    figures = []
 
     for reg in regions:
+        startTime = time.time()
+
         if reg:
             df = dfOrig.query('region == "%s"' % reg)
             title = titleOrig + " (%s)" % reg
@@ -499,6 +515,63 @@ def chartGCAM(args, num=None, negate=False):
                                   palette=palette, outFile=outFile, sideLabel=sideLabel, labelColor=labelColor,
                                   yFormat=yFormat, transparent=transparent, openFile=openFile)
 
+        figures.append((outFile, time.time() - startTime))
+
+    return figures
+
+def _chartGroup(specs, negate):
+    """
+    Generate the charts described by `specs`, a list of (argparse Namespace, num)
+    pairs that all refer to the same CSV file, which is read only once.
+    """
+    figures = []
+    for args, num in specs:
+        figures.extend(chartGCAM(args, num=num, negate=negate, cache=True))
+
+    return figures
+
+def chartBatch(specs, negate=False, jobs=1):
+    """
+    Generate the charts described by `specs`, grouped by CSV file so that each
+    file is read only once. If `jobs` > 1, the groups are divided among a pool
+    of up to `jobs` processes. Charts are rendered with the non-interactive
+    "Agg" backend (see matplotlibFix.py).
+
+    :param specs: (list of (argparse Namespace, int or None)) the arguments
+        to chartGCAM() for each chart, and the number to prepend to the image
+        filename, if any.
+    :param negate: (bool) if True, all values in year columns are multiplied
+        by -1 before plotting.
+    :param jobs: (int) the maximum number of processes to use
+    :return: (list of (str, float)) the pathname of each image file generated
+        and the number of seconds taken to render it.
+    """
+    groups = {}
+    for args, num in specs:
+        key = (os.path.abspath(args.csvFile), args.skiprows)
+        groups.setdefault(key, []).append((args, num))
+
+    groups = list(groups.values())
+    jobs = max(1, min(jobs, len(groups)))
+    startTime = time.time()
+
+    if jobs == 1:
+        results = [_chartGroup(group, negate) for group in groups]
+    else:
+        # largest groups first, so they don't delay the end of the batch
+        groups.sort(key=len, reverse=True)
+        with workerProcessPool(jobs) as pool:
+            futures = [pool.submit(_chartGroup, group, negate) for group in groups]
+            results = [future.result() for future in futures]
+
+    figures = [figure for result in results for figure in result]
+    for outFile, secs in figures:
+        _logger.info("%6.2f sec  %s", secs, unixPath(outFile))
+
+    _logger.info("Generated %d charts from %d CSV files in %.2f sec using %d process(es)",
+                 len(figures), len(groups), time.time() - startTime, jobs)
+    return figures
+
 def chartMain(mainArgs, tool, parser):
     # DOCUMENT '*null*', if still useful
     if not mainArgs.fromFile and mainArgs.csvFile == '*null*':
@@ -525,8 +598,13 @@ def chartMain(mainArgs, tool, parser):
                      'years'     : mainArgs.years}
 
         scenarios = mainArgs.scenario.split(',')
+        jobs = mainArgs.jobs or getParamAsInt('GCAM.ChartJobs')
+        specs = []
 
         for scenario in scenarios:
+            if lines is None:       # 'exit' was found
+                break
+
             substDict['scenario'] = scenario
             argDict = vars(mainArgs)
             argDict['scenario'] = scenario  # for each call, pass the current scenario only
@@ -540,7 +618,8 @@ def chartMain(mainArgs, tool, parser):
                     continue
 
                 if line == 'exit':
-                    return
+                    lines = None
+                    break
 
                 line = line.format(**substDict)
                 fileArgs = shlex.split(line)
@@ -551,7 +630,9 @@ def chartMain(mainArgs, tool, parser):
                 nextNum = num if enumerate else None
                 num += 1
 
-                chartGCAM(allArgs, num=nextNum, negate=negate)
+                specs.append((allArgs, nextNum))
+
+        chartBatch(specs, negate=negate, jobs=jobs)
 
     else:
         chartGCAM(mainArgs, negate=negate)
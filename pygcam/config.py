@@ -7,7 +7,7 @@ import os
 import sys
 import platform
 import re
-from pkg_resources import resource_string
+from pkgutil import get_data
 from six import iteritems
 
 if sys.version_info.major == 2:
@@ -26,6 +26,8 @@ _ConfigParser = None
 
 _ProjectSection = DEFAULT_SECTION
 
+_Overrides = {}         # the latest value passed to setParam, keyed by (section, name)
+
 # Support for path translations to access docker-mounted host dirs
 _PathMap = None
 _PathPattern = None     # compiled regex matching any mapped paths
@@ -185,13 +187,14 @@ def getConfig(reload=False, allowMissing=False):
     if reload:
         global _ConfigParser
         _ConfigParser = None
+        _Overrides.clear()
 
     return _ConfigParser or readConfigFiles(allowMissing=allowMissing)
 
 
 def _readConfigResourceFile(filename, package='pygcam', raiseError=True):
     try:
-        data = resource_string(package, filename)
+        data = get_data(package, filename)
     except IOError:
         if raiseError:
             raise
@@ -448,8 +451,34 @@ def setParam(name, value, section=None):
     """
     section = section or getSection()
     _ConfigParser.set(section, name, value)
+    _Overrides[(section, name)] = value
     return value
 
+def workerConfigState():
+    """
+    Return the arguments to pass to `initWorkerConfig` so that a worker process
+    sees the same configuration as the calling process, e.g., as the `initargs`
+    of a ProcessPoolExecutor whose `initializer` is `initWorkerConfig`.
+
+    :return: (tuple) the current project section and the parameters set in memory
+    """
+    return getSection(), list(_Overrides.items())
+
+def initWorkerConfig(section, overrides):
+    """
+    Initialize the configuration of a worker process. Processes that aren't
+    forked from the parent don't inherit its project section or the values
+    set via `setParam`, e.g., from "+s" command-line options.
+
+    :param section: (str) the config file section (project) to read from
+    :param overrides: (list) ((section, name), value) tuples to pass to `setParam`
+    :return: none
+    """
+    getConfig()
+    setSection(section)
+    for (sect, name), value in overrides:
+        setParam(name, value, section=sect)
+
 def getParam(name, section=None, raw=False, raiseError=True):
     """
     Get the value of the configuration parameter `name`. Calls
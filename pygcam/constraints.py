@@ -166,9 +166,12 @@ def genBioConstraints(**kwargs):
 
     batchDir = getBatchDir(baseline, resultsDir)
 
-    refinedLiquidsDF = readQueryResult(batchDir, baseline, 'Refined-liquids-production-by-technology', cache=True)
-    totalBiomassDF   = readQueryResult(batchDir, baseline, 'Total_biomass_consumption', cache=True)
-    purposeGrownDF   = readQueryResult(batchDir, baseline, 'Purpose-grown_biomass_production', cache=True)
+    refinedLiquidsDF = readQueryResult(batchDir, baseline, 'Refined-liquids-production-by-technology', cache=True,
+                                       mutable=False)
+    totalBiomassDF   = readQueryResult(batchDir, baseline, 'Total_biomass_consumption', cache=True,
+                                       mutable=False)
+    purposeGrownDF   = readQueryResult(batchDir, baseline, 'Purpose-grown_biomass_production', cache=True,
+                                       mutable=False)
 
     yearCols = getYearCols(kwargs['years'])
 
@@ -277,7 +280,7 @@ def genDeltaConstraints(**kwargs):
     purposeGrownQuery   = kwargs.get('purposeGrownQuery',   'Purpose-grown_biomass_production')
 
     batchDir = getBatchDir(baseline, resultsDir)
-    refinedLiquidsDF = readQueryResult(batchDir, baseline, refinedLiquidsQuery, cache=True)
+    refinedLiquidsDF = readQueryResult(batchDir, baseline, refinedLiquidsQuery, cache=True, mutable=False)
 
     yearCols = getYearCols(kwargs['years'])
 
@@ -320,7 +323,7 @@ def genDeltaConstraints(**kwargs):
         deltaCellulose = deltas * coefficients[yearCols]
         printSeries(deltaCellulose, 'cellulose', header='deltaCellulose:')
 
-        totalBiomassDF = readQueryResult(batchDir, baseline, totalBiomassQuery, cache=True)
+        totalBiomassDF = readQueryResult(batchDir, baseline, totalBiomassQuery, cache=True, mutable=False)
         totalBiomassUSA = totalBiomassDF.query(US_REGION_QUERY)[yearCols]
 
         biomassConstraint = totalBiomassUSA.iloc[0] + deltaCellulose.iloc[0]
@@ -328,7 +331,7 @@ def genDeltaConstraints(**kwargs):
 
         # For switchgrass, we generate a constraint file to adjust purpose-grown biomass
         # by the same amount as the total regional biomass, forcing the change to come from switchgrass.
-        purposeGrownDF = readQueryResult(batchDir, baseline, purposeGrownQuery, cache=True)
+        purposeGrownDF = readQueryResult(batchDir, baseline, purposeGrownQuery, cache=True, mutable=False)
 
         # For some reason, purpose grown results are returned for 1990, 2005, then
         # 2020, 2025, but not 2010 or 2015. So we add any missing columns here.
@@ -336,7 +339,7 @@ def genDeltaConstraints(**kwargs):
         if len(missingCols) > 0:
             purposeGrownDF = pd.concat([purposeGrownDF, pd.DataFrame(columns=missingCols)])
 
-        purposeGrownDF.fillna(0, inplace=True)
+        purposeGrownDF = purposeGrownDF.fillna(0)     # not in place: the cached data is shared
         purposeGrownUSA  = purposeGrownDF.query(US_REGION_QUERY)[yearCols]
 
         xml = _generateConstraintXML('regional-biomass-constraint', biomassConstraint, policyType=biomassPolicyType,
@@ -2,50 +2,166 @@
 .. Copyright (c) 2019 Richard Plevin
    See the https://opensource.org/licenses/MIT for license details.
 '''
+from .config import getParam, getParamAsInt
 from .error import PygcamException, FileMissingError
 from .log import getLogger
+from .utils import LRUCache, mkdirs
 import os
 
 _logger = getLogger(__name__)
 
-_csvCache = {}
+# In-memory cache of DataFrames, keyed by (abspath, skiprows), holding ((mtime, size), df).
+# Created on first use since its size is set by config variable GCAM.CsvCacheMB.
+_csvCache = None
 
-def readCachedCsv(filename, skiprows=1, cache=False):
+def _getMemoryCache():
+    global _csvCache
+
+    if _csvCache is None:
+        maxbytes = getParamAsInt('GCAM.CsvCacheMB') * 1024 * 1024
+        _csvCache = LRUCache(maxsize=1000, maxbytes=maxbytes,     # limited mainly by maxbytes
+                             sizeof=lambda item: int(item[1].memory_usage(deep=True).sum()))
+    return _csvCache
+
+def clearCsvCache():
+    """
+    Empty the in-memory CSV cache. The on-disk cache is unaffected.
+
+    :return: none
+    """
+    if _csvCache is not None:
+        _csvCache.clear()
+
+def _fileStamp(filename):
+    st = os.stat(filename)
+    return (st.st_mtime, st.st_size)
+
+def _diskCachePath(cacheDir, path, skiprows, indexCol):
+    import hashlib
+
+    key = hashlib.sha1(('%s|%d|%s' % (path, skiprows, indexCol)).encode('utf-8')).hexdigest()
+    return os.path.join(cacheDir, key + '.pkl')
+
+def _readDiskCache(cachePath, path, stamp):
+    """
+    Return the DataFrame saved in `cachePath` if it was read from `path`
+    when it had the given (mtime, size) `stamp`, else None.
+    """
+    import pickle
+
+    try:
+        with open(cachePath, 'rb') as f:
+            entry = pickle.load(f)
+
+        if entry['path'] == path and tuple(entry['stamp']) == stamp:
+            _logger.debug("Found %s in disk cache", path)
+            return entry['df']
+
+    except IOError:
+        pass    # not cached
+
+    except Exception as e:
+        _logger.debug("Ignoring unreadable cache file %s: %s", cachePath, e)
+
+    return None
+
+def _writeDiskCache(cachePath, path, stamp, df):
+    import pickle
+
+    # Write to a temp file and rename it, since concurrent processes may read the cache
+    tmpPath = '%s.%d' % (cachePath, os.getpid())
+    try:
+        mkdirs(os.path.dirname(cachePath))
+        with open(tmpPath, 'wb') as f:
+            pickle.dump({'path': path, 'stamp': stamp, 'df': df}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        if os.name == 'nt' and os.path.exists(cachePath):
+            os.remove(cachePath)    # os.rename won't replace an existing file on Windows
+
+        os.rename(tmpPath, cachePath)
+
+    except Exception as e:
+        _logger.debug("Failed to write CSV cache file %s: %s", cachePath, e)
+        try:
+            os.remove(tmpPath)
+        except OSError:
+            pass
+
+def isDiskCacheEnabled():
+    """
+    Return True if config variable GCAM.CsvCacheDir names an on-disk CSV cache.
+    """
+    return bool(getParam('GCAM.CsvCacheDir'))
+
+def readCachedCsv(filename, skiprows=1, cache=False, mutable=True, indexCol=None):
     """
     Read a CSV file of the form generated by GCAM batch queries, i.e., skip one
-    row and then read column headings and data. Optionally drop all years outside
-    the `years` given. Optionally, linearly interpolate annual values between
-    time-steps.
+    row and then read column headings and data. If config variable GCAM.CsvCacheDir
+    is set, the parsed data is saved in a binary file in that directory, which is
+    used instead of the CSV file until the CSV file's modification time or size
+    changes.
 
     :param filename: (str) the path to a CSV file
     :param skiprows: (int) the number of rows to skip before reading the data matrix
-    :param cache: (bool) If True, file will be sought in, and saved to, a CSV cache.
-       The "raw" file data is cached, so if called with different processing args,
-       the same initial DataFrame is used, but it will be processed correctly.
-    :return: (DataFrame) the data read in, processed as per arguments
+    :param cache: (bool) If True, file will be sought in, and saved to, an in-memory
+       CSV cache limited to GCAM.CsvCacheMB megabytes. The "raw" file data is cached,
+       so if called with different processing args, the same initial DataFrame is used,
+       but it will be processed correctly.
+    :param mutable: (bool) If True, the caller may modify the DataFrame returned, so
+       a copy of any cached DataFrame is returned. If False, the caller must not
+       modify the DataFrame.
+    :param indexCol: (None or False) passed to pandas as `index_col`. Use False to
+       prevent pandas from using the first column as the index when rows end with
+       a delimiter.
+    :return: (DataFrame) the data read in
     """
     import pandas as pd
 
-    found = False
+    path = os.path.abspath(filename)
+
+    try:
+        stamp = _fileStamp(path)
+    except OSError as e:
+        raise FileMissingError(path, e)
+
+    memCache = _getMemoryCache() if cache else None
+    key = (path, skiprows, indexCol)
+    df = None
+
+    if memCache is not None:
+        entry = memCache.get(key)
+        if entry and entry[0] == stamp:
+            _logger.debug("Found %s in CSV cache", filename)
+            df = entry[1]
 
-    if cache and filename in _csvCache:
-        _logger.debug("Found %s in CSV cache", filename)
-        df = _csvCache[filename]
-        found = True
+    cacheDir = getParam('GCAM.CsvCacheDir')
+    cachePath = _diskCachePath(cacheDir, path, skiprows, indexCol) if cacheDir else None
 
-    else:
+    if df is None and cachePath:
+        df = _readDiskCache(cachePath, path, stamp)
+        if df is not None:
+            if memCache is None:
+                return df   # not shared, so no need to copy
+
+            memCache.set(key, (stamp, df))
+
+    if df is None:
         try:
             _logger.debug("Reading %s", filename)
-            df = pd.read_table(filename, sep=',', skiprows=skiprows, index_col=None)
+            df = pd.read_table(filename, sep=',', skiprows=skiprows, index_col=indexCol, quoting=0)
 
         except IOError as e:
-            raise FileMissingError(os.path.abspath(filename), e)
+            raise FileMissingError(path, e)
 
         except Exception as e:
             raise PygcamException('Error reading %s: %s' % (filename, e))
 
-    # Cache a copy, unless it was already in the cache
-    if cache and not found:
-        _csvCache[filename] = df.copy()
+        if cachePath:
+            _writeDiskCache(cachePath, path, stamp, df)
+
+        if memCache is None:
+            return df   # not shared, so no need to copy
+
+        memCache.set(key, (stamp, df))
 
-    return df
+    return df.copy() if mutable else df
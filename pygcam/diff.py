@@ -13,36 +13,22 @@ from .query import readCsv, dropExtraCols, csv2xlsx, sumYears, sumYearsByGroup,
 _logger = getLogger(__name__)
 
 
-def computeDifference(df1, df2, resetIndex=True, dropna=True, asPercentChange=False):
+def _alignedDifference(df1, df2, resetIndex=True, dropna=True, asPercentChange=False):
     """
-    Compute the difference between two DataFrames.
-
-    :param df1: a pandas DataFrame instance
-    :param obj2: a pandas DataFrame instance
-    :param resetIndex: (bool) if True (the default), the index in the DataFrame
-      holding the computed difference is reset so that data in non-year columns
-      appear in individual columns. Otherwise, the index in the returned
-      DataFrame is based on all non-year columns.
-    :param dropna: (bool) if True, drop rows with NaN values after computing difference
-    :param asPercentChange: (bool) if True, compute percent change rather than difference.
-    :return: a pandas DataFrame with the difference in all the year columns, computed
-      as (df2 - df1) if asPercentChange is False, otherwise as (df2 - df1)/df1.
+    Compute the difference between two DataFrames by indexing both on all non-year
+    columns and subtracting with pandas index alignment. This is used by DiffEngine
+    when the reference data has duplicate keys or NaN rows are to be retained.
+    See :py:func:`computeDifference` for a description of the arguments.
     """
     df1 = dropExtraCols(df1, inplace=False)
     df2 = dropExtraCols(df2, inplace=False)
 
-    if set(df1.columns) != set(df2.columns):
-        raise FileFormatError("Can't compute difference because result sets have different columns. df1:%s, df2:%s" \
-                              % (df1.columns, df2.columns))
+    _checkColumns(df1, df2)
 
-    # Handle corner case in which query results for non-existent data have zero in Units column
-    if 'Units' in df1.columns:
-        units = list(df1.Units.unique())
-        if len(units) == 2 and '0.0' in units:
-            units.remove('0.0')
-            realUnits = units[0]
-            df1.Units = realUnits
-            df2.Units = realUnits
+    realUnits = _realUnits(df1)
+    if realUnits:
+        df1.Units = realUnits
+        df2.Units = realUnits
 
     yearCols = [col for col in df1.columns if col.isdigit()]
     nonYearCols = list(set(df1.columns) - set(yearCols))
@@ -64,6 +50,153 @@ def computeDifference(df1, df2, resetIndex=True, dropna=True, asPercentChange=Fa
 
     return diff
 
+def _checkColumns(df1, df2):
+    if set(df1.columns) != set(df2.columns):
+        raise FileFormatError("Can't compute difference because result sets have different columns. df1:%s, df2:%s" \
+                              % (df1.columns, df2.columns))
+
+def _realUnits(df):
+    """
+    Handle corner case in which query results for non-existent data have zero in
+    Units column: return the real units, if there are exactly two values, one of
+    which is '0.0', otherwise None.
+    """
+    if 'Units' in df.columns:
+        units = list(df.Units.unique())
+        if len(units) == 2 and '0.0' in units:
+            units.remove('0.0')
+            return units[0]
+
+    return None
+
+class DiffEngine(object):
+    """
+    Computes differences between a reference query result and any number of
+    other results for the same query. The reference data is prepared once: the
+    values of its non-year ("key") columns are encoded as integers and combined
+    into a single hashed index, and its year columns are stored as a NumPy array.
+    Each difference is then computed by looking up the keys of the other result's
+    rows in the index and subtracting the arrays.
+
+    Rows of the other result whose keys aren't in the reference produce NaN, as
+    with pandas alignment, and are dropped. Results are in the row order of the
+    other result, with the key columns in the order of the reference columns.
+    """
+    def __init__(self, refDF):
+        import pandas as pd
+
+        refDF = dropExtraCols(refDF, inplace=False)
+        self.refDF = refDF
+        self.realUnits = _realUnits(refDF)
+        if self.realUnits:
+            refDF.Units = self.realUnits
+
+        self.yearCols = [col for col in refDF.columns if col.isdigit()]
+        self.keyCols  = [col for col in refDF.columns if not col.isdigit()]
+
+        # Encode each key column's values as 1..N, with 0 for NaN
+        self.levels = []
+        codes = []
+        for col in self.keyCols:
+            colCodes, uniques = pd.factorize(refDF[col].values)
+            self.levels.append(pd.Index(uniques))
+            codes.append(colCodes + 1)
+
+        self.radices = [len(level) + 1 for level in self.levels]
+        self.index = None
+
+        if self._fitsInt64():
+            self.index = pd.Index(self._combine(codes))
+
+        self.usable = self.index is not None and self.index.is_unique
+        self.values = refDF[self.yearCols].values.astype(float)
+
+    def _fitsInt64(self):
+        product = 1
+        for radix in self.radices:
+            product *= radix
+
+        return product < 2 ** 63
+
+    def _combine(self, codes):
+        import numpy as np
+
+        key = np.zeros(len(codes[0]) if codes else len(self.refDF), dtype=np.int64)
+        for colCodes, radix in zip(codes, self.radices):
+            key = key * radix + colCodes
+
+        return key
+
+    def diff(self, otherDF, resetIndex=True, dropna=True, asPercentChange=False):
+        """
+        Compute the difference between the reference data and `otherDF`.
+        See :py:func:`computeDifference` for a description of the arguments.
+        """
+        import numpy as np
+        import pandas as pd
+
+        if not (self.usable and dropna):
+            return _alignedDifference(self.refDF, otherDF, resetIndex=resetIndex,
+                                      dropna=dropna, asPercentChange=asPercentChange)
+
+        otherDF = dropExtraCols(otherDF, inplace=False)
+        _checkColumns(self.refDF, otherDF)
+
+        if self.realUnits:
+            otherDF.Units = self.realUnits
+
+        found = np.ones(len(otherDF), dtype=bool)
+        codes = []
+        for col, level in zip(self.keyCols, self.levels):
+            values = otherDF[col].values
+            colCodes = level.get_indexer(values)
+            found &= (colCodes >= 0) | pd.isnull(values)   # values not in the reference don't match
+            codes.append(colCodes + 1)
+
+        positions = self.index.get_indexer(self._combine(codes))
+        found &= positions >= 0
+        positions = positions[found]
+
+        otherValues = otherDF[self.yearCols].values.astype(float)[found]
+        refValues = self.values[positions]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = otherValues - refValues
+            if asPercentChange:
+                values /= refValues
+
+        keep = ~np.isnan(values).any(axis=1)
+        rows = np.flatnonzero(found)[keep]
+
+        data = {col: otherDF[col].values[rows] for col in self.keyCols}
+        for i, col in enumerate(self.yearCols):
+            data[col] = values[keep, i]
+
+        result = pd.DataFrame(data, columns=self.keyCols + self.yearCols)
+
+        if not resetIndex:
+            result.set_index(self.keyCols, inplace=True)
+
+        return result
+
+def computeDifference(df1, df2, resetIndex=True, dropna=True, asPercentChange=False):
+    """
+    Compute the difference between two DataFrames.
+
+    :param df1: a pandas DataFrame instance
+    :param obj2: a pandas DataFrame instance
+    :param resetIndex: (bool) if True (the default), the index in the DataFrame
+      holding the computed difference is reset so that data in non-year columns
+      appear in individual columns. Otherwise, the index in the returned
+      DataFrame is based on all non-year columns.
+    :param dropna: (bool) if True, drop rows with NaN values after computing difference
+    :param asPercentChange: (bool) if True, compute percent change rather than difference.
+    :return: a pandas DataFrame with the difference in all the year columns, computed
+      as (df2 - df1) if asPercentChange is False, otherwise as (df2 - df1)/df1.
+    """
+    engine = DiffEngine(df1)
+    return engine.diff(df2, resetIndex=resetIndex, dropna=dropna, asPercentChange=asPercentChange)
+
 def _label(referenceFile, otherFile, asPercentChange=False):
     label = "([{other}] minus [{ref}]) / [{ref}]" if asPercentChange else "[{other}] minus [{ref}]"
 
@@ -93,6 +226,7 @@ def writeDiffsToCSV(outFile, referenceFile, otherFiles, skiprows=1, interpolate=
     """
     refDF = readCsv(referenceFile, skiprows=skiprows, interpolate=interpolate,
                     years=years, startYear=startYear)
+    engine = DiffEngine(refDF)
 
     with open(outFile, 'w') as f:
         for otherFile in otherFiles:
@@ -100,7 +234,7 @@ def writeDiffsToCSV(outFile, referenceFile, otherFiles, skiprows=1, interpolate=
             otherDF   = readCsv(otherFile, skiprows=skiprows, interpolate=interpolate,
                                 years=years, startYear=startYear)
 
-            diff = computeDifference(refDF, otherDF, asPercentChange=asPercentChange)
+            diff = engine.diff(otherDF, asPercentChange=asPercentChange)
             csvText = diff.to_csv(index=None)
             label = _label(referenceFile, otherFile, asPercentChange=asPercentChange)
             f.write("%s\n%s" % (label, csvText))    # csvText has "\n" already
@@ -136,6 +270,7 @@ def writeDiffsToXLSX(outFile, referenceFile, otherFiles, skiprows=1, interpolate
         _logger.debug("Reading reference file:", referenceFile)
         refDF = readCsv(referenceFile, skiprows=skiprows, interpolate=interpolate,
                         years=years, startYear=startYear)
+        engine = DiffEngine(refDF)
 
         for otherFile in otherFiles:
             otherFile = ensureCSV(otherFile)   # add csv extension if needed
@@ -146,7 +281,7 @@ def writeDiffsToXLSX(outFile, referenceFile, otherFiles, skiprows=1, interpolate
             sheetName = 'Diff%d' % sheetNum
             sheetNum += 1
 
-            diff = computeDifference(refDF, otherDF, asPercentChange=asPercentChange)
+            diff = engine.diff(otherDF, asPercentChange=asPercentChange)
             diff.to_excel(writer, index=None, sheet_name=sheetName, startrow=2, startcol=0)
 
             worksheet = writer.sheets[sheetName]
@@ -228,6 +363,50 @@ def queryCsvPathname(query, scenario, workingDir='.'):
     pathname = pathjoin(workingDir, scenario, QueryResultsDir, '%s-%s.csv' % (query, scenario))
     return pathname
 
+def writeQueryDiffs(queries, baseline, policies, workingDir='.', skiprows=1, interpolate=False,
+                    years=None, startYear=0, asPercentChange=False):
+    """
+    For each query, compute the differences between the results for the `baseline`
+    scenario and those of each of the `policies`, reading the baseline results only
+    once per query. Each difference is written to the .CSV file whose pathname is
+    computed by :py:func:`diffCsvPathname`, in the format written by
+    :py:func:`writeDiffsToCSV`.
+
+    :param queries: (list of str) the base file names of query results
+    :param baseline: (str) the baseline scenario
+    :param policies: (list of str) the policy scenarios
+    :param workingDir: (str) the directory immediately above the baseline
+        and policy sandboxes.
+    :param skiprows: (int) should be 1 for GCAM files, to skip header info before column names
+    :param interpolate: (bool) if True, linearly interpolate annual values between timesteps
+       in all data files and compute the differences for all resulting years.
+    :param years: (iterable of 2 values coercible to int) the range of years to include in
+       results.
+    :param startYear: (int) the year at which to begin interpolation, if interpolate is True.
+       Defaults to the first year in `years`.
+    :param asPercentChange: (bool) if True, compute percent change rather than difference.
+    :return: none
+    """
+    for query in queries:
+        baselineFile = queryCsvPathname(query, baseline, workingDir=workingDir)
+        refDF = readCsv(baselineFile, skiprows=skiprows, interpolate=interpolate,
+                        years=years, startYear=startYear)
+        engine = DiffEngine(refDF)
+
+        for policy in policies:
+            policyFile = queryCsvPathname(query, policy, workingDir=workingDir)
+            otherDF = readCsv(policyFile, skiprows=skiprows, interpolate=interpolate,
+                              years=years, startYear=startYear)
+
+            outFile = diffCsvPathname(query, baseline, policy, workingDir=workingDir,
+                                      createDir=True, asPercentChange=asPercentChange)
+            _logger.info("Writing %s", outFile)
+
+            diff = engine.diff(otherDF, asPercentChange=asPercentChange)
+            label = _label(baselineFile, policyFile, asPercentChange=asPercentChange)
+            with open(outFile, 'w') as f:
+                f.write("%s\n%s" % (label, diff.to_csv(index=None)))
+
 def diffMain(args):
     workingDir = args.workingDir
     mkdirs(workingDir)
@@ -252,10 +431,10 @@ def diffMain(args):
 
     # If a query file is given, we loop over the query names, computing required arguments to performDiff().
     if queryFile:
-        if len(args.csvFiles) != 2:
-            raise CommandlineError("When --queryFile is specified, 2 positional arguments--the baseline and policy names--are required.")
+        if len(args.csvFiles) < 2:
+            raise CommandlineError("When --queryFile is specified, at least 2 positional arguments--the baseline and policy names--are required.")
 
-        baseline, policy = args.csvFiles
+        baseline, policies = args.csvFiles[0], args.csvFiles[1:]
 
         # def makePath(query, scenario):
         #     return pathjoin(scenario, QueryResultsDir, '%s-%s.csv' % (query, scenario))
@@ -270,17 +449,9 @@ def diffMain(args):
                 lines = f.read()
                 queries = [line for line in lines.split('\n') if line]   # eliminates blank lines
 
-        for query in queries:
-            baselineFile = queryCsvPathname(query, baseline, workingDir=workingDir)
-            policyFile   = queryCsvPathname(query, policy,   workingDir=workingDir)
-
-            outFile = diffCsvPathname(query, baseline, policy, workingDir=workingDir,
-                                      createDir=True, asPercentChange=asPercentChange)
-            _logger.info("Writing %s", outFile)
-
-            writeDiffsToFile(outFile, baselineFile, [policyFile], ext='.csv', skiprows=skiprows,
-                             interpolate=interpolate, years=years, startYear=startYear,
-                             asPercentChange=asPercentChange)
+        writeQueryDiffs(queries, baseline, policies, workingDir=workingDir, skiprows=skiprows,
+                        interpolate=interpolate, years=years, startYear=startYear,
+                        asPercentChange=asPercentChange)
     else:
         csvFiles = [ensureCSV(f) for f in args.csvFiles]
         referenceFile = csvFiles[0]
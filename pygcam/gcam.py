@@ -5,16 +5,19 @@
    See the https://opensource.org/licenses/MIT for license details.
 '''
 from __future__ import print_function
+from collections import namedtuple
 import os
 import re
 import subprocess
+import sys
+import time
 from semver import VersionInfo
 
 from .config import getParam, getParamAsBoolean, parse_version_info, pathjoin, unixPath
 from .error import ProgramExecutionError, GcamError, GcamSolverError, PygcamException, ConfigFileError
 from .log import getLogger
 from .scenarioSetup import createSandbox
-from .utils import writeXmldbDriverProperties, getExeDir, pushd
+from .utils import writeXmldbDriverProperties, getExeDir, pushd, mkdirs
 from .windows import IsWindows
 
 _logger = getLogger(__name__)
@@ -111,7 +114,114 @@ def setJavaPath(exeDir):
     os.environ['CLASSPATH'] = classpath = envClasspath + ';' + javaBinServer + ';' + miClasspath
     _logger.debug('CLASSPATH=%s', classpath)
 
-def _gcamWrapper(args):
+# Reported by the GCAM wrapper as each model period completes. Iterations is None
+# if GCAM didn't report it; elapsed is seconds since the period started.
+ProgressEvent = namedtuple('ProgressEvent', ['period', 'year', 'iterations', 'elapsed'])
+
+_progressCallback = None
+
+def setProgressCallback(func):
+    """
+    Set a function to be called with a ProgressEvent as GCAM completes each
+    period when run by the wrapper, or None to remove it.
+
+    :param func: (callable or None) the function to call
+    :return: none
+    """
+    global _progressCallback
+    _progressCallback = func
+
+
+_ModelDidNotSolve = b'Model did not solve'
+_ErrorPattern = re.compile(b'BaseXException|' + _ModelDidNotSolve)
+_ProgressPattern = re.compile(br'^(?:Period (\d+): (\d+)|Model solved normally.*?worldCalcCount\s*=\s*(\d+))',
+                              re.MULTILINE)
+
+_ReadSize = 65536
+_MaxPartialLine = 1024 * 1024   # scan a partial line if it grows this large
+
+class GcamOutputScanner(object):
+    """
+    Scans GCAM's console output, a buffer at a time, for errors and for the
+    start and completion of each model period.
+    """
+    def __init__(self, progress=None):
+        self.progress = progress
+        self.partial = b''      # incomplete last line of the previous buffer
+        self.period = None      # (period, year, startTime, iterations) of the current period
+
+    def _endPeriod(self):
+        if self.period:
+            period, year, startTime, iterations = self.period
+            self.period = None
+
+            event = ProgressEvent(period, year, iterations, time.time() - startTime)
+            _logger.info('GCAM period %d (%d) completed: %s iterations, %.1f sec',
+                         period, year, iterations, event.elapsed)
+            if self.progress:
+                self.progress(event)
+
+    def _scan(self, text):
+        match = _ErrorPattern.search(text)
+        if match:
+            start = text.rfind(b'\n', 0, match.start()) + 1
+            end = text.find(b'\n', match.end())
+            line = text[start:end if end >= 0 else len(text)].decode('utf-8', 'replace').rstrip()
+
+            msg = 'GCAM error: ' + line
+            raise GcamSolverError(msg) if match.group(0) == _ModelDidNotSolve else GcamError(msg)
+
+        for match in _ProgressPattern.finditer(text):
+            period, year, iterations = match.groups()
+            if period is not None:
+                self._endPeriod()
+                self.period = (int(period), int(year), time.time(), None)
+            elif self.period:
+                self.period = self.period[:3] + (int(iterations),)
+                self._endPeriod()
+
+    def feed(self, data):
+        """
+        Scan the complete lines in `data`, saving any partial line for the next call.
+
+        :raises GcamSolverError: if GCAM reports that the model did not solve
+        :raises GcamError: if GCAM reports a BaseX exception
+        """
+        text = self.partial + data
+        end = text.rfind(b'\n') + 1
+
+        if end == 0 and len(text) < _MaxPartialLine:
+            self.partial = text
+            return
+
+        if end == 0:
+            end = len(text)
+
+        self.partial = text[end:]
+        self._scan(text[:end])
+
+    def close(self):
+        """
+        Scan any remaining partial line and report the last period.
+        """
+        text, self.partial = self.partial, b''
+        if text:
+            self._scan(text)
+
+        self._endPeriod()
+
+
+def _gcamWrapper(args, progress=None):
+    """
+    Run GCAM, copying its console output to the file named by GCAM.WrapperLogFile
+    (or to stdout) while scanning it for errors and progress. GCAM is terminated
+    as soon as an error is detected.
+
+    :param args: (list of str) the GCAM command and arguments
+    :param progress: (callable) a function to call with a ProgressEvent as each
+        period completes
+    :return: (int) GCAM's exit status
+    """
     try:
         _logger.debug('Starting gcam with wrapper')
         gcamProc = subprocess.Popen(args, bufsize=0, stdout=subprocess.PIPE,
@@ -121,25 +231,37 @@ def _gcamWrapper(args):
         msg = 'gcamWrapper failed to run command: {} ({})'.format(' '.join(args), e)
         raise PygcamException(msg)
 
-    modelDidNotSolve = 'Model did not solve'
-    pattern = re.compile('(.*(BaseXException|%s).*)' % modelDidNotSolve)
+    logFile = getParam('GCAM.WrapperLogFile')
+    if logFile:
+        _logger.info("Writing GCAM output to '%s'", os.path.abspath(logFile))
+        mkdirs(os.path.dirname(os.path.abspath(logFile)))
+        log = open(logFile, 'wb')
+    else:
+        log = getattr(sys.stdout, 'buffer', sys.stdout)     # python 2 stdout accepts bytes
 
-    gcamOut = gcamProc.stdout
-    while True:
-        line = gcamOut.readline().decode('utf-8')
-        if line == '':
-            break
+    scanner = GcamOutputScanner(progress=progress)
+    fd = gcamProc.stdout.fileno()
 
-        _logger.info(line.rstrip())          # see if this ends up in worker.log
+    try:
+        while True:
+            data = os.read(fd, _ReadSize)
+            if not data:
+                break
 
-        match = re.search(pattern, line)
-        if match:
-            gcamProc.terminate()
-            msg = 'GCAM error: ' + match.group(0)
-            if match.group(1) == modelDidNotSolve:
-                raise GcamSolverError(msg)
-            else:
-                raise GcamError(msg)
+            log.write(data)
+            scanner.feed(data)
+
+        scanner.close()
+
+    except GcamError:
+        gcamProc.terminate()
+        raise
+
+    finally:
+        if logFile:
+            log.close()
+        else:
+            log.flush()
 
     _logger.debug('gcamWrapper found EOF. Waiting for GCAM to exit...')
     status = gcamProc.wait()
@@ -189,7 +311,7 @@ def linkToMacJava():
         os.chdir(owd)
 
 def runGCAM(scenario, workspace=None, refWorkspace=None, scenariosDir=None, groupDir='',
-            configFile=None, forceCreate=False, noRun=False, noWrapper=False):
+            configFile=None, forceCreate=False, noRun=False, noWrapper=False, progress=None):
     """
 
     :param scenario: (str) the scenario to run
@@ -210,6 +332,9 @@ def runGCAM(scenario, workspace=None, refWorkspace=None, scenariosDir=None, grou
        display the command that would be executed.
     :param noWrapper: (bool) if True, don't run GCAM inside a "wrapper" that reads
         output and kills the model run as soon as an error is detected.
+    :param progress: (callable) a function to call with a ProgressEvent as each
+        period completes, when running in the wrapper. Defaults to the function
+        set by setProgressCallback(), if any.
     :return: none
     :raises ProgramExecutionError: if GCAM exits with non-zero status
     """
@@ -253,7 +378,8 @@ def runGCAM(scenario, workspace=None, refWorkspace=None, scenariosDir=None, grou
         _logger.info('Running: %s', command)
 
         noWrapper = IsWindows or noWrapper     # never use the wrapper on Windows
-        exitCode = subprocess.call(gcamArgs, shell=False) if noWrapper else _gcamWrapper(gcamArgs)
+        exitCode = subprocess.call(gcamArgs, shell=False) if noWrapper else \
+                   _gcamWrapper(gcamArgs, progress=progress or _progressCallback)
 
         if exitCode != 0:
             raise ProgramExecutionError(command, exitCode)
@@ -7,17 +7,18 @@
 from __future__ import print_function
 import copy
 import os
+import time
 from semver import VersionInfo
 import six
 import sys
 
 from lxml import etree as ET
 
-from .config import getParam, parse_version_info, pathjoin
+from .config import getParam, getParamAsBoolean, getParamAsInt, parse_version_info, pathjoin
 from .constants import UnmanagedLandClasses
 from .error import FileFormatError, CommandlineError, PygcamException
 from .log import getLogger
-from .utils import mkdirs, flatten, getRegionList
+from .utils import mkdirs, flatten, getRegionList, workerProcessPool
 from .XMLFile import XMLFile
 
 _logger = getLogger(__name__)
@@ -120,13 +121,13 @@ class LandProtection(object):
         # self.protectLandTree(tree, scenarioName)
         protectLandTree(tree, scenarioName)
 
-        if backup:
+        if backup and os.path.lexists(outfile):
             try:
                 # Ensure we're not clobbering reference files.
                 backupFile = outfile + '~'
                 os.rename(outfile, backupFile)
             except Exception as e:
-                PygcamException('Failed to create backup file "%s": %s', backupFile, e)
+                raise PygcamException('Failed to create backup file "%s": %s' % (backupFile, e))
 
         _logger.info("Writing '%s'...", outfile)
         tree.write(outfile, xml_declaration=True, pretty_print=True)
@@ -415,7 +416,7 @@ def parseLandProtectionFile(scenarioFile=None):
 
 def runProtectionScenario(scenarioName, outputDir=None, workspace=None,
                           scenarioFile=None, xmlFiles=None, inPlace=False,
-                          unprotectFirst=False):
+                          unprotectFirst=False, stream=None, jobs=None):
     """
     Run the protection named by `scenarioName`, found in `scenarioFile` if given,
     or the value of config variable `GCAM.LandProtectionXmlFile` otherwise. The source
@@ -436,6 +437,11 @@ def runProtectionScenario(scenarioName, outputDir=None, workspace=None,
     :param inPlace: (bool) if True, input and output files may be the same (output overwrites input).
     :param unprotectFirst: (bool) if True, make all land "unprotected" before
            protecting.
+    :param stream: (bool) if True, rewrite the files with protectLandStream, using
+       up to `jobs` processes. If None, the value of config variable
+       `GCAM.StreamLandProtection` is used.
+    :param jobs: (int) the maximum number of files to process at once when streaming.
+       If None, the value of config variable `GCAM.LandProtectionJobs` is used.
     :return: none
     """
     _logger.debug("Land-protection scenario '%s'", scenarioName)
@@ -445,6 +451,10 @@ def runProtectionScenario(scenarioName, outputDir=None, workspace=None,
     workspace = workspace or getParam('GCAM.SandboxRefWorkspace')
     xmlFiles = xmlFiles or _landXmlPaths(workspace)
 
+    stream = getParamAsBoolean('GCAM.StreamLandProtection') if stream is None else stream
+    jobs = jobs or getParamAsInt('GCAM.LandProtectionJobs')
+
+    pairs = []
     for inFile in xmlFiles:
         basename = os.path.basename(inFile)
         outFile = inFile if inPlace else pathjoin(outputDir, basename)
@@ -453,7 +463,30 @@ def runProtectionScenario(scenarioName, outputDir=None, workspace=None,
         if not inPlace and os.path.lexists(outFile) and os.path.samefile(inFile, outFile):
             raise CommandlineError("Attempted to overwrite '%s' but --inPlace was not specified." % inFile)
 
-        landProtection.protectLand(inFile, outFile, scenarioName, unprotectFirst=unprotectFirst)
+        pairs.append((inFile, outFile))
+
+    if not stream:
+        for inFile, outFile in pairs:
+            landProtection.protectLand(inFile, outFile, scenarioName, unprotectFirst=unprotectFirst)
+        return
+
+    jobs = max(1, min(jobs, len(pairs)))
+    startTime = time.time()
+
+    if jobs == 1:
+        results = [_protectLandFile(scenarioFile, scenarioName, inFile, outFile) for inFile, outFile in pairs]
+    else:
+        # parseLandProtectionFile reads GCAM.LandProtectionXmlFile if scenarioFile is None
+        with workerProcessPool(jobs) as pool:
+            futures = [pool.submit(_protectLandFile, scenarioFile, scenarioName, inFile, outFile)
+                       for inFile, outFile in pairs]
+            results = [future.result() for future in futures]
+
+    for outFile, secs in results:
+        _logger.info("%6.2f sec  %s", secs, outFile)
+
+    _logger.info("Applied protection scenario '%s' to %d files in %.2f sec using %d process(es)",
+                 scenarioName, len(results), time.time() - startTime, jobs)
 
 def protectLandMain(args):
 
@@ -577,26 +610,51 @@ def _landtype_basin_pairs(reg_dict):
     return pairs
 
 def _cache_land_nodes(tree, regions):
-    d = {}
-    for reg in regions:
-        nodes = tree.xpath('//region[@name="{}"]//UnmanagedLandLeaf'.format(reg))
-        d[reg] = {eltname(node) : node for node in nodes}
+    # One pass over the regions, rather than an XPath search for each
+    d = {reg : {} for reg in regions}
+    for region in tree.iter('region'):
+        reg_dict = d.get(region.get('name'))
+        if reg_dict is not None:
+            reg_dict.update({eltname(node) : node for node in region.iter('UnmanagedLandLeaf')})
     return d
 
+def _protect_region(reg, reg_dict, prot_tups):
+    land_basin_pairs = _landtype_basin_pairs(reg_dict)
+
+    for (landtype, basin, prot_frac) in prot_tups:
+        for (l, b) in land_basin_pairs:
+            if landtype == l and (basin == b or not basin):
+                _logger.debug("Processing {}, {}, {}".format(reg, landtype, b))
+                total = _get_total_area(reg_dict, landtype, b)
+                prot_vals   = total * prot_frac
+                unprot_vals = total - prot_vals
+                _update_protection(reg_dict, landtype, b, prot_vals, unprot_vals)
+
 def _protect_land(tree, prot_dict):
     node_dict = _cache_land_nodes(tree, prot_dict.keys())
     for (reg, prot_tups) in prot_dict.items():
-        reg_dict = node_dict[reg]
-        land_basin_pairs = _landtype_basin_pairs(reg_dict)
-
-        for (landtype, basin, prot_frac) in prot_tups:
-            for (l, b) in land_basin_pairs:
-                if landtype == l and (basin == b or not basin):
-                    _logger.debug("Processing {}, {}, {}".format(reg, landtype, b))
-                    total = _get_total_area(reg_dict, landtype, b)
-                    prot_vals   = total * prot_frac
-                    unprot_vals = total - prot_vals
-                    _update_protection(reg_dict, landtype, b, prot_vals, unprot_vals)
+        _protect_region(reg, node_dict[reg], prot_tups)
+
+def _protection_dict(scenarioName):
+    """
+    Return a dict keyed by region name, with a list of (landtype, basin, fraction)
+    tuples for each region protected by the scenario `scenarioName`.
+    """
+    from collections import defaultdict
+
+    scenario = Scenario.getScenario(scenarioName)
+    if not scenario:
+        raise FileFormatError("Protection scenario '%s' was not found" % scenarioName)
+
+    prot_dict = defaultdict(list)
+
+    for reg, protReg in scenario.protRegDict.items():
+        for prot in protReg.protections:
+            fraction = prot.fraction
+            basin = prot.basin
+            prot_dict[reg] += [(landtype, basin, fraction) for landtype in prot.landClasses]
+
+    return prot_dict
 
 #
 # Modified from landProtection.py method of same name
@@ -611,20 +669,169 @@ def protectLandTree(tree, scenarioName):
     :param scenarioName: (str) the name of the scenario to apply
     :return: none
     """
-    from collections import defaultdict
-
     _logger.info("Applying protection scenario %s", scenarioName)
 
-    scenario = Scenario.getScenario(scenarioName)
-    if not scenario:
-        raise FileFormatError("Protection scenario '%s' was not found" % scenarioName)
+    prot_dict = _protection_dict(scenarioName)
+    _protect_land(tree, prot_dict)
 
-    prot_dict = defaultdict(list)
 
-    for reg, protReg in scenario.protRegDict.items():
-        for prot in protReg.protections:
-            fraction = prot.fraction
-            basin = prot.basin
-            prot_dict[reg] += [(landtype, basin, fraction) for landtype in prot.landClasses]
+#
+# Streaming version of protectLand, which holds only one region in memory
+#
+_PLACEHOLDER = '_pygcam_placeholder_'
+_INDENT = b'  '     # indentation per level used by lxml's pretty_print
 
-    _protect_land(tree, prot_dict)
+def _serializeAt(elt, depth):
+    """
+    Serialize `elt` as pretty-printed by ElementTree.write() at the given `depth`
+    in a document, by nesting it in `depth` placeholder elements which are then
+    stripped from the result. Note that `elt` is moved out of its tree.
+    """
+    top = parent = ET.Element(_PLACEHOLDER)
+    for _ in range(depth - 1):
+        parent = ET.SubElement(parent, _PLACEHOLDER)
+    parent.append(elt)
+
+    text = ET.tostring(top, pretty_print=True)
+    head = b''.join(_INDENT * i + b'<%s>\n' % _PLACEHOLDER.encode() for i in range(depth))
+    tail = b''.join(_INDENT * i + b'</%s>\n' % _PLACEHOLDER.encode() for i in reversed(range(depth)))
+    return text[len(head):-len(tail)]
+
+def _spineText(spine, innerChildren=True):
+    """
+    Serialize a copy of the document holding the elements of `spine` (the root
+    and the ancestors of the streamed elements) and their current children, with
+    a placeholder where the streamed elements go, i.e., before the current
+    children of the innermost spine element. Returns the text before and after
+    the placeholder.
+
+    :param spine: (list of etree.Element) the root, then each of its descendants
+        down to the parent of the streamed elements.
+    :param innerChildren: (bool) if False, the children of the innermost spine
+        element are not copied, which affects only the text after the placeholder.
+    :return: (tuple of bytes) the text before and after the placeholder
+    """
+    copies = []
+    parentCopy = None
+    for elt in spine:
+        eltCopy = ET.Element(elt.tag, dict(elt.attrib), nsmap=elt.nsmap) if parentCopy is None \
+                  else ET.SubElement(parentCopy, elt.tag, dict(elt.attrib), nsmap=elt.nsmap)
+        eltCopy.text = elt.text
+        copies.append((elt, eltCopy))
+        parentCopy = eltCopy
+
+    for i, (elt, eltCopy) in enumerate(copies):
+        inner = copies[i + 1][0] if i + 1 < len(copies) else None
+        if inner is None and not innerChildren:
+            break
+
+        for child in elt:
+            if child is inner:
+                eltCopy.append(copies[i + 1][1])    # move the spine copy into position
+            else:
+                eltCopy.append(copy.deepcopy(child))
+
+    copies[-1][1].insert(0, ET.Element(_PLACEHOLDER))
+
+    # Copy comments and processing instructions preceding and following the root
+    root, rootCopy = copies[0]
+    for sibling in root.itersiblings(preceding=True):
+        rootCopy.addprevious(copy.deepcopy(sibling))
+
+    for sibling in reversed(list(root.itersiblings())):
+        rootCopy.addnext(copy.deepcopy(sibling))
+
+    text = ET.tostring(ET.ElementTree(rootCopy), xml_declaration=True, pretty_print=True)
+    line = _INDENT * len(spine) + b'<%s/>\n' % _PLACEHOLDER.encode()
+    head, tail = text.split(line)
+    return head, tail
+
+def protectLandStream(infile, outfile, scenarioName, backup=True):
+    """
+    Generate a copy of `infile` with land protected according to `scenarioName`,
+    writing the output to `outfile`. The result is identical to that of
+    LandProtection.protectLand, but the file is read in a single pass with
+    iterparse and each region is written and discarded once it's been modified,
+    so only one region is held in memory at a time.
+
+    :param infile: input file (should be one of the GCAM aglu-xml land files)
+    :param outfile: the file to create which represents the desired land protection
+    :param scenarioName: a scenario in the landProtection.xml file
+    :param backup: if True, create a backup `outfile`, with a '~' appended to the name,
+      before writing a new file.
+    :return: none
+    """
+    _logger.info("Applying protection scenario %s to '%s'", scenarioName, infile)
+
+    prot_dict = _protection_dict(scenarioName)
+
+    # Since we're still reading infile while writing outfile, we read from the
+    # backup file or a temporary copy if they're the same file.
+    inPlace = os.path.lexists(outfile) and os.path.samefile(infile, outfile)
+    tmpFile = None
+
+    if backup and os.path.lexists(outfile):
+        backupFile = outfile + '~'
+        try:
+            os.rename(outfile, backupFile)
+            if inPlace:
+                infile = backupFile
+                inPlace = False
+        except Exception as e:
+            raise PygcamException('Failed to create backup file "%s": %s' % (backupFile, e))
+
+    if inPlace:
+        infile = tmpFile = outfile + '.tmp'
+        os.rename(outfile, tmpFile)
+
+    context = ET.iterparse(infile, events=('end',), tag='region', remove_blank_text=True)
+    spine = None
+
+    _logger.info("Writing '%s'...", outfile)
+    with open(outfile, 'wb') as f:
+        for _, region in context:
+            parent = region.getparent()
+
+            if spine is None:
+                spine = list(reversed(list(parent.iterancestors()))) + [parent]
+                head, _ = _spineText(spine, innerChildren=False)
+                f.write(head)
+
+            elif parent is not spine[-1]:
+                raise FileFormatError("%s: all <region> elements must have the same parent" % infile)
+
+            reg = region.get('name')
+            if reg in prot_dict:
+                reg_dict = {eltname(node) : node for node in region.iter('UnmanagedLandLeaf')}
+                _protect_region(reg, reg_dict, prot_dict[reg])
+
+            # Write any elements or comments preceding the region, then the region.
+            # Elements following it may already have been parsed, so they're left.
+            while parent[0] is not region:
+                f.write(_serializeAt(parent[0], len(spine)))
+            f.write(_serializeAt(region, len(spine)))
+
+        if spine is None:
+            # no regions; write the file as LandProtection.protectLand would
+            tree = context.root.getroottree()
+            tree.write(f, xml_declaration=True, pretty_print=True)
+        else:
+            _, tail = _spineText(spine)
+            f.write(tail)
+
+    if tmpFile:
+        os.remove(tmpFile)
+
+def _protectLandFile(scenarioFile, scenarioName, inFile, outFile):
+    """
+    Apply a protection scenario to one file, in a worker process. Returns the name
+    of the file written and the number of seconds taken.
+    """
+    startTime = time.time()
+
+    # Scenarios are inherited from the parent process unless it was spawned
+    if not Scenario.getScenario(scenarioName):
+        parseLandProtectionFile(scenarioFile=scenarioFile)
+
+    protectLandStream(inFile, outFile, scenarioName)
+    return outFile, time.time() - startTime
@@ -166,6 +166,7 @@ class CoreDatabase(object):
         self.url     = None
         self.engine  = None
         self.appId   = None
+        self.outputIdMaps = {}      # dicts of outputIds by name, keyed by program name
 
     def endSession(self, session):
         '''
@@ -506,6 +507,80 @@ class CoreDatabase(object):
         return ids
         # return zip(*ids)[0] if ids else []
 
+    def getOutputIdMap(self, program=GCAM_PROGRAM, refresh=False):
+        '''
+        Return a dict of outputIds keyed by output name for the given program. The
+        dict is read from the database in a single query on first use and cached.
+
+        :param program: (str) the name of the program the outputs are defined for
+        :param refresh: (bool) if True, re-read the Output table even if cached
+        :return: (dict) outputIds keyed by output name
+        '''
+        idMap = self.outputIdMaps.get(program)
+
+        if idMap is None or refresh:
+            with self.sessionScope() as session:
+                rows = session.query(Output.name, Output.outputId).join(Program).filter(Program.name == program).all()
+            self.outputIdMaps[program] = idMap = dict(rows)
+
+        return idMap
+
+    def lookupOutputId(self, name, program=GCAM_PROGRAM):
+        '''
+        Return the outputId for the named output from the in-memory cache. The
+        cache is re-read once if the name is not found, in case the output was
+        created after the cache was loaded.
+        '''
+        outputId = self.getOutputIdMap(program).get(name)
+
+        if outputId is None:
+            outputId = self.getOutputIdMap(program, refresh=True).get(name)
+            if outputId is None:
+                raise PygcamMcsSystemError("%s output %s was not found in the Output table" % (program, name))
+
+        return outputId
+
+    def upsertStatement(self, tableClass):
+        '''
+        Return an INSERT statement for `tableClass` that replaces an existing row with
+        the same primary key, i.e., "INSERT OR REPLACE" on SQLite or
+        "INSERT ... ON CONFLICT DO UPDATE" on Postgres. For other databases, a plain
+        INSERT is returned.
+        '''
+        table = tableClass.__table__
+
+        if usingPostgres():
+            from sqlalchemy.dialects.postgresql import insert
+
+            stmt = insert(table)
+            keys = [col.name for col in table.primary_key]
+            updates = {col.name : stmt.excluded[col.name] for col in table.columns if not col.primary_key}
+            return stmt.on_conflict_do_update(index_elements=keys, set_=updates)
+
+        if usingSqlite():
+            return table.insert().prefix_with('OR REPLACE')
+
+        return table.insert()
+
+    def saveOutValues(self, rows, session=None):
+        '''
+        Save many scalar output values with a single executemany, overwriting
+        any existing value for the same runId and outputId.
+
+        :param rows: (list of dict) each with keys 'runId', 'outputId', and 'value'
+        :param session: a session to use; if None, one is allocated and committed.
+        :return: none
+        '''
+        if not rows:
+            return
+
+        sess = session or self.Session()
+        sess.execute(self.upsertStatement(OutValue), rows)
+
+        if session is None:
+            self.commitWithRetry(sess)
+            self.endSession(sess)
+
     def getOutputs(self):
         rows = self.getTable(Output)
         return [obj.name for obj in rows]
@@ -888,6 +963,28 @@ class CoreDatabase(object):
 
             return rows
 
+    def getMeanDurations(self, simId=None):
+        """
+        Return the mean duration (in minutes) of successful runs of each experiment,
+        as recorded in Run.duration.
+
+        :param simId: (int) if given, consider only runs of this simulation,
+           otherwise, consider runs of all simulations.
+        :return: (dict) mean run duration keyed by experiment name
+        """
+        from sqlalchemy import func
+
+        with self.sessionScope() as session:
+            q = session.query(Experiment.expName, func.avg(Run.duration)).\
+                    join(Run, Run.expId == Experiment.expId).\
+                    filter(Run.status == RUN_SUCCEEDED, Run.duration != None).\
+                    group_by(Experiment.expName)
+
+            if simId is not None:
+                q = q.filter(Run.simId == simId)
+
+            return {expName: float(minutes) for expName, minutes in q.all() if minutes is not None}
+
     def createExp(self, name, description=None):
         '''
         Insert a row for the given experiment
@@ -1201,6 +1298,97 @@ class GcamDatabase(CoreDatabase):
                                   value=value, row=0, col=varNum)
                 session.add(inValue)
 
+    def getParamIds(self, pnames):
+        '''
+        Return a list of inputIds corresponding to the parameter names in `pnames`.
+        Names not found in the cache are read from the database in a single query.
+        '''
+        missing = set(pnames) - set(self.paramIds.keys())
+
+        if missing:
+            with self.sessionScope() as session:
+                rows = session.query(Input.paramName, Input.inputId).filter(Input.paramName.in_(missing)).all()
+            self.paramIds.update(dict(rows))
+
+        try:
+            return [self.paramIds[name] for name in pnames]
+        except KeyError as e:
+            raise PygcamMcsSystemError("Parameter %s was not found in the Input table" % e)
+
+    def saveParameterValuesDF(self, simId, df, chunkSize=50000):
+        '''
+        Bulk-load parameter values from a "long" DataFrame with columns 'inputId',
+        'trialNum', 'col' (the varNum), and 'value'. On Postgres, values are loaded
+        with COPY; otherwise they're inserted with executemany in chunks of `chunkSize`.
+
+        :param simId: (int) simulation ID
+        :param df: (pandas.DataFrame) the values to save
+        :param chunkSize: (int) the number of rows to insert per statement
+        :return: none
+        '''
+        df = df[['inputId', 'trialNum', 'col', 'value']].copy()
+        df['simId'] = simId
+        df['row'] = 0
+
+        cols = ['inputId', 'simId', 'trialNum', 'row', 'col', 'value']
+        df = df[cols]
+
+        if usingPostgres():
+            self._copyToPostgres(InValue, df)
+        else:
+            self._executemanyRaw(InValue, df, chunkSize=chunkSize)
+
+    def _executemanyRaw(self, tableClass, df, chunkSize=50000):
+        '''
+        Insert the rows of `df` into `tableClass`'s table by calling the DBAPI
+        cursor's executemany() directly, in chunks of `chunkSize` rows. This avoids
+        SQLAlchemy's per-row parameter processing, which dominates for large inserts.
+        The DataFrame's columns must be named for the table's columns.
+        '''
+        cols = list(df.columns)
+        compiled = tableClass.__table__.insert().compile(dialect=self.engine.dialect, column_keys=cols)
+        sql = str(compiled)
+
+        if compiled.positional:
+            df = df[list(compiled.positiontup)]
+
+        conn = self.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            for start in xrange(0, df.shape[0], chunkSize):
+                chunk = df.iloc[start:start + chunkSize]
+                if compiled.positional:
+                    rows = list(chunk.itertuples(index=False, name=None))
+                else:
+                    rows = chunk.to_dict('records')
+                cursor.executemany(sql, rows)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _copyToPostgres(self, tableClass, df):
+        '''
+        Load the contents of `df` into `tableClass`'s table using Postgres' COPY
+        command. The DataFrame's columns must be named for the table's columns.
+        '''
+        from six.moves import StringIO
+
+        buffer = StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+
+        tableName = tableClass.__table__.name
+        colNames = ', '.join(['"%s"' % col for col in df.columns])
+        sql = 'COPY %s (%s) FROM STDIN WITH CSV' % (tableName, colNames)
+
+        conn = self.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.copy_expert(sql, buffer)
+            conn.commit()
+        finally:
+            conn.close()
+
     def deleteRunResults(self, runId, outputIds=None, session=None):
         """
         Augment core method by deleting timeseries data, too.
@@ -1220,6 +1408,99 @@ class GcamDatabase(CoreDatabase):
             self.commitWithRetry(sess)
             self.endSession(sess)
 
+    def saveTimeSeriesRows(self, rows, session=None):
+        '''
+        Insert many TimeSeries rows with a single executemany.
+
+        :param rows: (list of dict) each with keys 'runId', 'outputId', 'regionId',
+           'units', and one key per year column (e.g., 'y2020').
+        :param session: a session to use; if None, one is allocated and committed.
+        :return: none
+        '''
+        if not rows:
+            return
+
+        sess = session or self.Session()
+        sess.execute(TimeSeries.__table__.insert(), rows)
+
+        if session is None:
+            self.commitWithRetry(sess)
+            self.endSession(sess)
+
+    def saveRunResults(self, runResults, session=None, chunkSize=500):
+        '''
+        Save the results for many runs at once. Stale results for each run are deleted,
+        outputIds are resolved from the in-memory cache, and all scalar and timeseries
+        values are written using a few batched statements rather than one query per value.
+
+        :param runResults: (list of (runId, resultsList) pairs) where resultsList holds
+           the dicts produced by XMLResultFile.collectResults()
+        :param session: a session to use; if None, one is allocated and committed.
+        :param chunkSize: (int) the max number of runIds to delete in a single statement,
+           to avoid exceeding the database's limit on bound parameters.
+        :return: (int) the number of rows written
+        '''
+        yearCols = self.yearCols()
+        outValueRows = []
+        timeSeriesRows = []
+        runsByOutputs = {}      # runIds grouped by the set of outputIds they produce
+
+        for runId, resultsList in runResults:
+            if not resultsList:
+                continue
+
+            outputIds = []
+            for resultDict in resultsList:
+                outputId = self.lookupOutputId(resultDict['paramName'])
+                outputIds.append(outputId)
+                value = resultDict['value']
+
+                if resultDict['isScalar']:
+                    outValueRows.append(dict(runId=runId, outputId=outputId, value=value))
+                else:
+                    row = dict(runId=runId, outputId=outputId, units=resultDict['units'],
+                               regionId=self.getRegionId(resultDict['regionName']))   # cached; not a DB query
+                    for colName in yearCols:
+                        row[colName] = value.get(colName)
+                    timeSeriesRows.append(row)
+
+            runsByOutputs.setdefault(frozenset(outputIds), []).append(runId)
+
+        sess = session or self.Session()
+
+        # Delete any stale results for these runIds (i.e., if re-running a given runId)
+        for outputIds, runIds in iteritems(runsByOutputs):
+            outputIds = list(outputIds)
+            for i in xrange(0, len(runIds), chunkSize):
+                chunk = runIds[i:i + chunkSize]
+                for tableClass in (OutValue, TimeSeries):
+                    sess.query(tableClass).filter(tableClass.runId.in_(chunk),
+                                                  tableClass.outputId.in_(outputIds)).\
+                        delete(synchronize_session=False)
+
+        self.saveOutValues(outValueRows, session=sess)
+        self.saveTimeSeriesRows(timeSeriesRows, session=sess)
+
+        if session is None:
+            self.commitWithRetry(sess)
+            self.endSession(sess)
+
+        return len(outValueRows) + len(timeSeriesRows)
+
+    def saveWorkerResults(self, results, session=None):
+        '''
+        Save the results from a list of WorkerResult instances using saveRunResults().
+        Only results for runs that succeeded are saved.
+
+        :param results: (list of WorkerResult) results returned by worker tasks
+        :param session: a session to use; if None, one is allocated and committed.
+        :return: (int) the number of rows written
+        '''
+        runResults = [(result.context.runId, result.resultsList) for result in results
+                      if result.context.status == RUN_SUCCEEDED]
+
+        return self.saveRunResults(runResults, session=session)
+
     def saveTimeSeries(self, runId, regionId, paramName, values, units=None, session=None):
         sess = session or self.Session()
 
@@ -1245,6 +1526,57 @@ class GcamDatabase(CoreDatabase):
             sess.commit()
             self.endSession(sess)
 
+    def getOutValues(self, simId, expName, outputName, limit=None):
+        '''
+        Augment core method by reading from the columnar result store, if enabled
+        and present for this simulation.
+        '''
+        from .resultStore import ResultStore
+
+        store = ResultStore.forReading(simId)
+        if store:
+            return store.getOutValues(expName, outputName, limit=limit)
+
+        return super(GcamDatabase, self).getOutValues(simId, expName, outputName, limit=limit)
+
+    def getTimeSeriesDF(self, simId, paramName, expList):
+        '''
+        Retrieve timeseries results for the given simId and paramName as a DataFrame
+        with columns 'runId', 'units', 'expName' and one column per year (e.g., 'y2020').
+        Data are read from the columnar result store, if enabled and present for this
+        simulation, otherwise from the database.
+
+        :param simId: simulation ID
+        :param paramName: name of output parameter
+        :param expList: (list of str) the names of the experiments to select
+           results for.
+        :return: (pandas.DataFrame) the results, or None if none were found
+        '''
+        import pandas as pd
+        from .resultStore import ResultStore
+
+        store = ResultStore.forReading(simId)
+        if store:
+            return store.getTimeSeries(paramName, expList, self.yearCols())
+
+        yearCols = [getattr(TimeSeries, col) for col in self.yearCols()]
+
+        # Select columns rather than TimeSeries objects to avoid ORM overhead
+        with self.sessionScope() as session:
+            query = session.query(TimeSeries.runId, TimeSeries.units, Experiment.expName, *yearCols).\
+                join(Run, TimeSeries.runId == Run.runId).filter(Run.simId == simId, Run.status == RUN_SUCCEEDED).\
+                join(Experiment, Run.expId == Experiment.expId).filter(Experiment.expName.in_(expList)).\
+                join(Output, TimeSeries.outputId == Output.outputId).filter(Output.name == paramName)
+
+            rows = query.all()
+
+        if not rows:
+            return None
+
+        cols = [d['name'] for d in query.column_descriptions]
+        df = pd.DataFrame.from_records(rows, columns=cols)
+        return df
+
     def getTimeSeries(self, simId, paramName, expList):
         '''
         Retrieve all timeseries rows for the given simId and paramName.
@@ -528,6 +528,7 @@ class XMLParameter(XMLWrapper):
         XMLParameter.saveInstance(self)
 
         self.vars    = []    # the list of XMLVariable or XMLRandomVar wrapping Elements from query
+        self.elementIndex = None  # (elements, original values) compiled from self.vars by getElementIndex()
         self.rv      = None  # stored here only if the distro is shared across Elements from query
         self.query   = None  # XMLQuery instance
         self.dataSrc = None  # A subclass of XMLTrialData instance
@@ -673,6 +674,26 @@ class XMLParameter(XMLWrapper):
 
         # Add these to the list since we might be called for multiple scenarios
         self.vars.extend(vars)
+        self.elementIndex = None
+
+    def getElementIndex(self):
+        """
+        Return a tuple of the list of elements referenced by this parameter's
+        variables and a NumPy array of their original values, in the same order.
+        Shared RVs, which don't point to an XML element, are excluded. The index
+        is compiled on first use and must be cleared by calling clearElementIndex()
+        if the variables are pointed at different elements.
+        """
+        if self.elementIndex is None:
+            vars = [var for var in self.vars if var.getElement() is not None]
+            elements = [var.getElement() for var in vars]
+            values = np.array([var.getFloatValue() for var in vars], dtype=float)
+            self.elementIndex = (elements, values)
+
+        return self.elementIndex
+
+    def clearElementIndex(self):
+        self.elementIndex = None
 
     def updateElements(self, simId, trialNum, df):
         """
@@ -688,33 +709,32 @@ class XMLParameter(XMLWrapper):
         if not self.vars:
             raise PygcamMcsSystemError("Called updateElements with no variables defined in self.vars")
 
-        isFactor = dataSrc.isFactor()
-        isDelta  = dataSrc.isDelta()
-
-        # Update all elements referenced by our list of XMLVariables (or of their subclass, XMLRandomVar)
-        for var in self.vars:
-            if var.getElement() is None:    # Skip shared RVs, which don't point to an XML element
-                _logger.debug("Skipping shared element for %s", var)
-                continue
-
-            originalValue = var.getFloatValue()  # apply factor and delta to cached, original value
+        elements, originalValues = self.getElementIndex()
+        if not elements:
+            return
 
-            varName = var.getParameter().getName()
-            randomValue = df.loc[trialNum, varName]
+        # All of our variables take the value from the column named for this parameter
+        randomValue = df.loc[trialNum, self.getName()]
 
-            newValue = randomValue * originalValue if isFactor else \
-                ((randomValue + originalValue) if isDelta else randomValue)
+        # Apply factor and delta to the cached, original values
+        if dataSrc.isFactor():
+            newValues = randomValue * originalValues
+        elif dataSrc.isDelta():
+            newValues = randomValue + originalValues
+        else:
+            newValues = np.full(len(elements), randomValue, dtype=float)
 
-            if hasattr(dataSrc, 'modDict'):
-                modDict = dataSrc.modDict
-                if modDict['lowbound'] is not None:
-                    newValue = max(newValue, modDict['lowbound'])
+        if hasattr(dataSrc, 'modDict'):
+            modDict = dataSrc.modDict
+            if modDict['lowbound'] is not None:
+                newValues = np.maximum(newValues, modDict['lowbound'])
 
-                if modDict['highbound'] is not None:
-                    newValue = min(newValue, modDict['highbound'])
+            if modDict['highbound'] is not None:
+                newValues = np.minimum(newValues, modDict['highbound'])
 
-            # Set the value in the cached tree so it can be written to trial's local-xml dir
-            var.setValue(newValue)
+        # Set the values in the cached tree so it can be written to trial's local-xml dir
+        for elt, value in zip(elements, newValues.tolist()):
+            elt.text = str(value)
 
 
 def trialRelativePath(relPath, prefix):
@@ -747,12 +767,73 @@ class XMLRelFile(XMLFile):
 
         super(XMLRelFile, self).__init__(absPath)
 
+        # Set by snapshot() to allow the tree to be reused across trials
+        self.variables = []
+        self.originalText = None
+        self.pristine = None
+        self.positions = None
+
     def getRelPath(self):
         return self.relPath
 
     def getAbsPath(self):
         return self.getFilename()
 
+    def isVolatile(self):
+        """
+        Return True if user functions (a WriteFunc or a trial function) may modify
+        this file's tree in ways other than setting the text of the queried elements.
+        """
+        inputFile = self.inputFile
+        trialFuncs = [param for param in inputFile.parameters.values() if param.getDataSrc().isTrialFunc()]
+        return bool(inputFile.writeFuncs or trialFuncs)
+
+    def snapshot(self, variables):
+        """
+        Save the state needed to restore this file's tree to its just-loaded state
+        before the next trial is applied, so the file needn't be read and queried again.
+        For files that only have element values set, we save the original text of the
+        queried elements. For "volatile" files, we save a pristine copy of the tree and
+        the document-order position of each queried element.
+
+        :param variables: (list of XMLVariable) the variables whose elements may be
+           in this file's tree.
+        """
+        import copy
+
+        root = self.tree.getroot()
+        self.variables = [var for var in variables
+                          if var.getElement() is not None and var.getElement().getroottree().getroot() is root]
+
+        if self.isVolatile():
+            positions = {elt: i for i, elt in enumerate(root.iter())}
+            self.positions = [positions[var.getElement()] for var in self.variables]
+            self.pristine = copy.deepcopy(self.tree)
+        else:
+            self.originalText = [var.getElement().text for var in self.variables]
+
+    def restore(self):
+        """
+        Restore the tree to the state saved by snapshot(). Volatile files get a fresh
+        copy of the pristine tree and their variables are pointed at the corresponding
+        elements; otherwise, the original text is restored to each queried element.
+        """
+        import copy
+
+        if self.pristine is not None:
+            self.tree = copy.deepcopy(self.pristine)
+            elements = list(self.tree.getroot().iter())
+            for var, pos in zip(self.variables, self.positions):
+                var.element = elements[pos]
+
+            # The parameters' element indices refer to the replaced tree
+            for param in set(var.getParameter() for var in self.variables):
+                param.clearElementIndex()
+
+        elif self.originalText is not None:
+            for var, text in zip(self.variables, self.originalText):
+                var.getElement().text = text
+
     def saveSomewhere(self):
         # Save the modified file somewhere for each trial. Maybe in trial-xml?
         pass
@@ -976,6 +1057,33 @@ class XMLParameterFile(XMLFile):
         for obj in self.inputFiles.values():
             obj.runQueries()
 
+    def snapshot(self):
+        """
+        Save the just-loaded state of all modified XML files so they can be
+        restored before applying each subsequent trial.
+        """
+        variables = [var for param in XMLParameter.getInstances() if param.getDataSrc() for var in param.getVars()]
+
+        for xmlFile in XMLInputFile.getModifiedXMLFiles():
+            xmlFile.snapshot(variables)
+
+    def restore(self):
+        """
+        Restore all modified XML files to the state saved by snapshot().
+        """
+        for xmlFile in XMLInputFile.getModifiedXMLFiles():
+            xmlFile.restore()
+
+    def inputPaths(self):
+        """
+        Return the pathnames of all files read in creating this object, i.e.,
+        the parameter file, the GCAM config files, and the GCAM input files.
+        """
+        paths = [self.getFilename()]
+        paths += [cfg.getFilename() for cfg in XMLConfigFile.instances.values()]
+        paths += [xmlFile.getAbsPath() for xmlFile in XMLInputFile.getModifiedXMLFiles()]
+        return paths
+
     def generateRandomVars(self):
         for obj in self.inputFiles.values():
             obj.generateRandomVars()
@@ -1012,6 +1120,55 @@ class XMLParameterFile(XMLFile):
         for obj in self.inputFiles.values():
             obj.dump()
 
+# The (key, fileStamps, XMLParameterFile) tuple saved by the last call to loadParameterFile()
+_paramFileCache = None
+
+def _fileStamps(paths):
+    stamps = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stamps.append((path, st.st_mtime, st.st_size))
+        except OSError:
+            stamps.append((path, None, None))
+
+    return stamps
+
+def loadParameterFile(context, paramPath, scenarioNames, useCache=True):
+    """
+    Return an XMLParameterFile for `paramPath` with its input files loaded and its
+    queries run for the given scenarios. The instance, and the parsed trees and query
+    results it holds, are cached in the process and reused by subsequent calls with
+    the same arguments, provided that none of the files read have changed. On reuse,
+    the trees are restored to their just-loaded state rather than being read again.
+
+    :param context: (Context) the trial context
+    :param paramPath: (str) the pathname of the parameters.xml file
+    :param scenarioNames: (list of str) the scenarios whose input files are loaded
+    :param useCache: (bool) if False, decache everything and read the files again
+    :return: (XMLParameterFile) the loaded parameter file
+    """
+    global _paramFileCache
+
+    key = (os.path.abspath(paramPath), context.simId, context.groupName, tuple(scenarioNames))
+
+    if useCache and _paramFileCache:
+        cachedKey, stamps, paramFile = _paramFileCache
+        if cachedKey == key and stamps == _fileStamps([path for path, _, _ in stamps]):
+            _logger.debug("Reusing cached parameter file %s", paramPath)
+            paramFile.restore()
+            return paramFile
+
+    decache()
+
+    paramFile = XMLParameterFile(paramPath)
+    paramFile.loadInputFiles(context, scenarioNames, writeConfigFiles=False)
+    paramFile.runQueries()
+    paramFile.snapshot()
+
+    _paramFileCache = (key, _fileStamps(paramFile.inputPaths()), paramFile)
+    return paramFile
+
 def decache():
     '''
     Clear all instance caches so a new run can begin cleanly
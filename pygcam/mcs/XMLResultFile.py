@@ -3,13 +3,16 @@
 # Copyright (c) 2015-2017. The Regents of the University of California (Regents).
 # See the file COPYRIGHT.txt for details.
 import os
-from collections import OrderedDict, defaultdict
+from collections import OrderedDict
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
-from ..config import getParam
+from ..config import getParam, getParamAsInt
+from ..csvCache import readCachedCsv, isDiskCacheEnabled
 from ..log import getLogger
+from ..utils import LRUCache
 from ..XMLFile import XMLFile
 from .error import PygcamMcsUserError, PygcamMcsSystemError, FileMissingError
 from .Database import getDatabase
@@ -77,6 +80,32 @@ class XMLConstraint(XMLWrapper):
         mask = fn(self.value)
         return df[mask]
 
+    def key(self):
+        return (self.column, self.op, self.value)
+
+    def mask(self, df):
+        """
+        Return a boolean array identifying the rows of `df` that satisfy this
+        constraint, or None if the constraint has no operator.
+        """
+        if not self.op:
+            return None
+
+        col = df[self.column]
+
+        if self.op in self.equal:
+            mask = (col == self.value)
+        elif self.op in self.notEqual:
+            mask = (col != self.value)
+        elif self.op == 'startswith':
+            mask = col.str.startswith(self.value, na=False)
+        elif self.op == 'endswith':
+            mask = col.str.endswith(self.value, na=False)
+        else:   # 'contains'
+            mask = col.str.contains(self.value, na=False)
+
+        return mask.values
+
 class XMLColumn(XMLWrapper):
     def __init__(self, element):
         super(XMLColumn, self).__init__(element)
@@ -120,6 +149,22 @@ class XMLResult(XMLWrapper):
     def isScalar(self):
         return self.column is not None or self.cumulative
 
+    def neededColumns(self):
+        """
+        Return the set of query result columns needed to compute this result.
+        """
+        from .util import activeYears
+
+        columns = set(['scenario', 'region', 'Units'])
+        columns.update([c.column for c in self.constraints])
+
+        if self.column is not None and not self.cumulative:
+            columns.add(self.columnName())
+        else:
+            columns.update(activeYears())
+
+        return columns
+
     def _getPath(self, eltName):
         'Get a single filename from the named element'
         objs = self.element.findall(eltName)
@@ -202,12 +247,12 @@ class QueryResult(object):
     '''
     Holds the results of an XPath batch query
     '''
-    def __init__(self, filename):
+    def __init__(self, filename, columns=None):
         self.filename = filename
         self.title = None
         self.df    = None
         self.units = None
-        self.readCSV()
+        self.readCSV(columns=columns)
 
     @staticmethod
     def parseScenarioString(scenStr):
@@ -233,17 +278,39 @@ class QueryResult(object):
         runDate = datetime.strptime(dateWithoutTZ, "%Y-%d-%mT%H:%M:%S")   # N.B. order is DD-MM, not MM-DD
         return name, runDate
 
-    def readCSV(self):
+    def readCSV(self, columns=None):
         '''
         Read a CSV file produced by a batch query. The first line is the name of the query;
         the second line provides the column headings; all subsequent lines are data. Data
         are comma-delimited, and strings with spaces are double-quoted. Assume units are
-        the same as in the first row of data.
+        the same as in the first row of data. If `columns` is given, only those columns
+        are read, and any year columns among them are read as floats.
         '''
         _logger.debug("readCSV: reading %s", self.filename)
+
         with open(self.filename) as f:
-            self.title  = f.readline().strip()
-            self.df = pd.read_table(f, sep=',', header=0, index_col=False, quoting=0)
+            self.title = f.readline().strip()
+
+            # Use the binary on-disk cache if enabled, otherwise read only the columns needed
+            if not isDiskCacheEnabled():
+                kwargs = {}
+                if columns is not None:
+                    columns = set(columns)
+                    kwargs['usecols'] = lambda col: col in columns
+                    kwargs['dtype'] = {col: float for col in columns if col.isdigit()}
+
+                self.df = pd.read_table(f, sep=',', header=0, index_col=False, quoting=0, **kwargs)
+
+        if isDiskCacheEnabled():
+            df = readCachedCsv(self.filename, skiprows=1, mutable=False, indexCol=False)
+            if columns is not None:
+                df = df[[col for col in df.columns if col in set(columns)]]
+                yearCols = [col for col in df.columns if col.isdigit()]
+                df = df.astype({col: float for col in yearCols})
+            else:
+                df = df.copy()
+
+            self.df = df
 
         df = self.df
 
@@ -268,14 +335,21 @@ class QueryResult(object):
     def getData(self):
         return self.df
 
-# A single result DF can have data for multiple outputs, so we cache the files
-outputCache = defaultdict(lambda: None)
+# A single result DF can have data for multiple outputs, so we cache recently read files.
+# Created on first use since the size is set by config variable MCS.OutputCacheSize.
+outputCache = None
 
 def getCachedFile(csvPath, loader=QueryResult, desc="query result"):
-    result = outputCache[csvPath]
+    global outputCache
+
+    if outputCache is None:
+        outputCache = LRUCache(getParamAsInt('MCS.OutputCacheSize'))
+
+    result = outputCache.get(csvPath)
     if not result:
         try:
-            outputCache[csvPath] = result = loader(csvPath)
+            result = loader(csvPath)
+            outputCache.set(csvPath, result)
         except Exception as e:
             _logger.warning('saveResults: Failed to read {}: {}'.format(desc, e))
             raise FileMissingError(csvPath)
@@ -286,32 +360,14 @@ def getOutputDir(trialDir, scenario, type):
     subDir = 'queryResults' if type == RESULT_TYPE_SCENARIO else 'diffs'
     return os.path.join(trialDir, scenario, subDir)
 
-
-def extractResult(context, scenario, outputDef, type):
+def _resultFromSelection(outputDef, selected, units):
+    """
+    Compute the result dict for `outputDef` from the rows of a query result
+    that satisfy its constraints, ignoring the "percentage" attribute.
+    """
     from .util import activeYears, YEAR_COL_PREFIX
 
-    _logger.debug("Extracting result for {}, name={}".format(context, outputDef.name))
-
-    trialDir = context.getTrialDir()
-
-    outputDir = getOutputDir(trialDir, scenario, type)
-    baseline = None if type == RESULT_TYPE_SCENARIO else context.baseline
-    csvPath = outputDef.csvPathname(scenario, outputDir=outputDir, baseline=baseline, type=type)
-
-    queryResult = getCachedFile(csvPath)
-    _logger.debug("queryResult:\n%s", queryResult.df)
- 
-    paramName   = outputDef.name
-    whereClause = outputDef.whereClause
-    _logger.debug("whereClause: %s", whereClause)
-
-    # apply (in)equality constraints
-    selected = queryResult.df.query(whereClause) if whereClause else queryResult.df
-
-    # apply string constraints
-    selected = outputDef.stringMatch(selected)
     _logger.debug("Selected:\n%s", selected)
-
     count = selected.shape[0]
 
     if count == 0:
@@ -330,7 +386,7 @@ def extractResult(context, scenario, outputDef, type):
     isScalar = outputDef.isScalar()
 
     # Create a dict to return. (context already has runId and scenario)
-    resultDict = dict(regionName=regionName, paramName=paramName, units=queryResult.units, isScalar=isScalar)
+    resultDict = dict(regionName=regionName, paramName=outputDef.name, units=units, isScalar=isScalar)
 
     active = activeYears()
     if isScalar:
@@ -347,18 +403,138 @@ def extractResult(context, scenario, outputDef, type):
         yearCols = [YEAR_COL_PREFIX + y for y in active]
         value = {colName: selected[yearStr].sum() for colName, yearStr in zip(yearCols, active)}
 
+    resultDict['value'] = value
+    return resultDict
+
+def _percentChange(value, baseValue):
+    if isinstance(baseValue, dict):
+        return dict(100 * pd.Series(value) / pd.Series(baseValue))
+
+    return 100 * value / baseValue
+
+
+def extractResult(context, scenario, outputDef, type):
+    """
+    Extract a single result from a (cached) query result file. To extract all the
+    results for a trial, ResultExtractor is more efficient.
+    """
+    _logger.debug("Extracting result for {}, name={}".format(context, outputDef.name))
+
+    trialDir = context.getTrialDir()
+
+    outputDir = getOutputDir(trialDir, scenario, type)
+    baseline = None if type == RESULT_TYPE_SCENARIO else context.baseline
+    csvPath = outputDef.csvPathname(scenario, outputDir=outputDir, baseline=baseline, type=type)
+
+    queryResult = getCachedFile(csvPath)
+    _logger.debug("queryResult:\n%s", queryResult.df)
+
+    whereClause = outputDef.whereClause
+    _logger.debug("whereClause: %s", whereClause)
+
+    # apply (in)equality constraints
+    selected = queryResult.df.query(whereClause) if whereClause else queryResult.df
+
+    # apply string constraints
+    selected = outputDef.stringMatch(selected)
+
+    resultDict = _resultFromSelection(outputDef, selected, queryResult.units)
+
     if outputDef.percentage:
         # Recursively read the baseline scenario result so we can compute % change
         newDef = XMLResult(outputDef.element)
         newDef.percentage = False
         baseResult = extractResult(context, context.baseline, newDef, RESULT_TYPE_SCENARIO)
-        bv = baseResult['value']
-        value = 100 * (dict(pd.Series(value) / pd.Series(bv)) if isinstance(bv, dict) else value / bv)
-
-    resultDict['value'] = value
+        resultDict['value'] = _percentChange(resultDict['value'], baseResult['value'])
 
     return resultDict
 
+
+class ResultExtractor(object):
+    """
+    Extracts the values of a set of XMLResult definitions for a single trial.
+    The definitions are grouped by the query result file they refer to, and each
+    file is read once, loading only the columns needed by any of its results.
+    Each distinct constraint is evaluated once per file as a vectorized mask, and
+    each result's rows are selected by combining the masks for its constraints.
+    The data are released after each file is processed.
+    """
+    def __init__(self, context):
+        self.context = context
+
+    def csvPath(self, outputDef, scenario, type):
+        context = self.context
+        outputDir = getOutputDir(context.getTrialDir(), scenario, type)
+        baseline = None if type == RESULT_TYPE_SCENARIO else context.baseline
+        return outputDef.csvPathname(scenario, outputDir=outputDir, baseline=baseline, type=type)
+
+    def readFile(self, csvPath, columns):
+        try:
+            return QueryResult(csvPath, columns=columns)
+        except Exception as e:
+            _logger.warning('saveResults: Failed to read query result: {}'.format(e))
+            raise FileMissingError(csvPath)
+
+    def extract(self, scenario, outputDefs, type):
+        """
+        Return a list of result dicts, one for each of `outputDefs`, in order.
+
+        :param scenario: (str) the scenario to extract results for
+        :param outputDefs: (list of XMLResult) the result definitions
+        :param type: (str) RESULT_TYPE_SCENARIO or RESULT_TYPE_DIFF
+        :return: (list of dict) the results, as produced by extractResult()
+        """
+        baseline = self.context.baseline
+
+        # Each request is identified by (index of outputDef, scenario); results with
+        # percentage=1 also require the baseline value for the same definition.
+        requests = OrderedDict()
+        for i, outputDef in enumerate(outputDefs):
+            requests[(i, scenario)] = self.csvPath(outputDef, scenario, type)
+            if outputDef.percentage:
+                requests[(i, baseline)] = self.csvPath(outputDef, baseline, RESULT_TYPE_SCENARIO)
+
+        byFile = OrderedDict()
+        for key, csvPath in requests.items():
+            byFile.setdefault(csvPath, []).append(key)
+
+        results = {}
+        for csvPath, keys in byFile.items():
+            defs = [outputDefs[i] for i, _ in keys]
+            columns = set().union(*[outputDef.neededColumns() for outputDef in defs])
+
+            queryResult = self.readFile(csvPath, columns)
+            df = queryResult.df
+            masks = {}
+
+            for key, outputDef in zip(keys, defs):
+                _logger.debug("Extracting result for {}, name={}".format(self.context, outputDef.name))
+                rows = np.ones(df.shape[0], dtype=bool)
+
+                for constraint in outputDef.constraints:
+                    ckey = constraint.key()
+                    if ckey not in masks:
+                        masks[ckey] = constraint.mask(df)
+
+                    mask = masks[ckey]
+                    if mask is not None:
+                        rows &= mask
+
+                results[key] = _resultFromSelection(outputDef, df[rows], queryResult.units)
+
+            del df, queryResult, masks
+
+        resultList = []
+        for i, outputDef in enumerate(outputDefs):
+            resultDict = results[(i, scenario)]
+            if outputDef.percentage:
+                baseValue = results[(i, baseline)]['value']
+                resultDict['value'] = _percentChange(resultDict['value'], baseValue)
+
+            resultList.append(resultDict)
+
+        return resultList
+
 def collectResults(context, type):
     '''
     Called by worker to process results, return a list of dicts
@@ -383,7 +559,8 @@ def collectResults(context, type):
         _logger.info('saveResults: No outputs defined for type %s', type)
         return []
 
-    resultList = [extractResult(context, scenario, outputDef, type) for outputDef in outputDefs]
+    extractor = ResultExtractor(context)
+    resultList = extractor.extract(scenario, outputDefs, type)
     return resultList
 
 def saveResults(context, resultList):
@@ -392,36 +569,17 @@ def saveResults(context, resultList):
     '''
     from .Database import getDatabase
 
-    runId = context.runId
-
     db = getDatabase()
     session = db.Session()
 
-    # Delete any stale results for this runId (i.e., if re-running a given runId)
-    names = [resultDict['paramName'] for resultDict in resultList]
-    ids = db.getOutputIds(names)
-    db.deleteRunResults(runId, outputIds=ids, session=session)
-    db.commitWithRetry(session)
+    try:
+        db.saveRunResults([(context.runId, resultList)], session=session)
+        db.commitWithRetry(session)
 
-    for resultDict in resultList:
-        paramName  = resultDict['paramName']
-        value      = resultDict['value']
-        regionName = resultDict['regionName']
-        regionId = db.getRegionId(regionName)
+    except Exception as e:
+        session.rollback()
+        # TBD: distinguish database save errors from data access errors?
+        raise PygcamMcsSystemError("saveResults failed: %s" % e)
 
-        # Save the values to the database
-        try:
-            if resultDict['isScalar']:
-                db.setOutValue(runId, paramName, value, session=session)  # TBD: need regionId?
-            else:
-                units = resultDict['units']
-                db.saveTimeSeries(runId, regionId, paramName, value, units=units, session=session)
-
-        except Exception as e:
-            session.rollback()
-            db.endSession(session)
-            # TBD: distinguish database save errors from data access errors?
-            raise PygcamMcsSystemError("saveResults failed: %s" % e)
-
-    db.commitWithRetry(session)
-    db.endSession(session)
+    finally:
+        db.endSession(session)
@@ -707,6 +707,8 @@ class Analysis(object):
         :param sep: (str) column separator to use in output file
         :return: none
         '''
+        from .resultStore import ResultStore
+
         db = self.db
         simId = self.simId
         resultDict = self.resultDict
@@ -714,18 +716,31 @@ class Analysis(object):
         resultList = resultList or self.resultNames
         scenarioList = scenarioList or self.scenarioNames
 
+        # If the columnar store is available, all results for a scenario are read at once
+        store = ResultStore.forReading(simId)
+
         for scenario in scenarioList:
             resultDF = resultDict.get(scenario)
+            needed = [name for name in resultList if resultDF is None or name not in resultDF.columns]
 
-            for resultName in resultList:
+            if store and needed:
+                values = store.getOutValues(scenario, needed, limit=self.limit)
+                missing = [name for name in needed if values is None or name not in values.columns]
+                if missing:
+                    raise PygcamMcsUserError(
+                        'No results were found for sim %d, experiment %s, result %s' % (simId, scenario, missing[0]))
+
+                resultDF = values if resultDF is None else pd.concat([resultDF, values], axis=1)
+                needed = []
+
+            for resultName in needed:
                 # returns DF with 'trialNum' as index, 'value' holds float value
-                if resultDF is None or resultName not in resultDF.columns:
-                    values = db.getOutValues(simId, scenario, resultName, limit=self.limit)
-                    if values is None:
-                        raise PygcamMcsUserError(
-                            'No results were found for sim %d, experiment %s, result %s' % (simId, scenario, resultName))
+                values = db.getOutValues(simId, scenario, resultName, limit=self.limit)
+                if values is None:
+                    raise PygcamMcsUserError(
+                        'No results were found for sim %d, experiment %s, result %s' % (simId, scenario, resultName))
 
-                    resultDF = values if not resultDF else pd.concat([resultDF, values])
+                resultDF = values if resultDF is None else pd.concat([resultDF, values], axis=1)
 
             resultDict[scenario] = resultDF
 
@@ -1,17 +1,15 @@
-from .addexp_plugin import AddExpCommand
-from .analyze_plugin import AnalyzeCommand
-from .cluster_plugin import ClusterCommand
-from .delsim_plugin import DelSimCommand
-from .discrete_plugin import DiscreteCommand
-from .engine_plugin import EngineCommand
-from .explore_plugin import ExploreCommand
-from .gensim_plugin import GensimCommand
-from .ippsetup_plugin import IppSetupCommand
-from .iterate_plugin import IterateCommand
-from .parallelPlot_plugin import ParallelPlotCommand
-from .runsim_plugin import RunSimCommand
-
-MCSBuiltins = [AddExpCommand, AnalyzeCommand, ClusterCommand,
-               DiscreteCommand, GensimCommand, DelSimCommand,
-               EngineCommand, ExploreCommand, IppSetupCommand,
-               IterateCommand, ParallelPlotCommand, RunSimCommand]
+# Built-in MCS sub-commands, as (module, class) names. Modules are imported
+# only when the sub-command is used; see GcamTool.
+MCSBuiltins = [('addexp_plugin',        'AddExpCommand'),
+               ('analyze_plugin',       'AnalyzeCommand'),
+               ('cluster_plugin',       'ClusterCommand'),
+               ('discrete_plugin',      'DiscreteCommand'),
+               ('gensim_plugin',        'GensimCommand'),
+               ('delsim_plugin',        'DelSimCommand'),
+               ('engine_plugin',        'EngineCommand'),
+               ('explore_plugin',       'ExploreCommand'),
+               ('ippsetup_plugin',      'IppSetupCommand'),
+               ('iterate_plugin',       'IterateCommand'),
+               ('parallelPlot_plugin',  'ParallelPlotCommand'),
+               ('resultstore_plugin',   'ResultStoreCommand'),
+               ('runsim_plugin',        'RunSimCommand')]
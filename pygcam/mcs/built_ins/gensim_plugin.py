@@ -132,38 +132,40 @@ def genTrialData(simId, trials, paramFileObj, args):
 def saveTrialData(df, simId, start=0):
     """
     Save the trial data in `df` to the SQL database, for the given simId.
+    The DataFrame is melted once into (trialNum, inputId, varNum, value)
+    rows which are bulk-loaded into the database.
     """
+    import time
+    import numpy as np
     from ..Database import getDatabase
     from ..XMLParameterFile import XMLRandomVar
-    from six.moves import xrange
 
+    startTime = time.time()
     trials = df.shape[0]
-
-    # Delete all Trial entries for this simId and this range of trialNums
     db = getDatabase()
 
-    paramValues = []
+    instances = XMLRandomVar.getInstances()
+    pnames   = [var.getParameter().getName() for var in instances]
+    varNums  = np.array([var.getVarNum() for var in instances])
+    paramIds = np.array(db.getParamIds(pnames))
 
-    for trial in xrange(trials):
-        trialNum = trial + start
+    # One column per RV instance, named by position since several RVs can share a parameter name
+    data = df[pnames].copy()
+    data.columns = range(len(pnames))
+    data['trialNum'] = np.arange(trials) + start
 
-        # Save all RV values to the database
-        instances = XMLRandomVar.getInstances()
-        for var in instances:
-            varNum = var.getVarNum()
-            param = var.getParameter()
-            pname = param.getName()
-            value = df[pname][trial]
-            paramId = db.getParamId(pname)
-            paramValues.append((trialNum, paramId, value, varNum))
+    values = data.melt(id_vars='trialNum', var_name='varIndex', value_name='value')
+    varIndex = values.varIndex.values.astype(int)
+    values['inputId'] = paramIds[varIndex]
+    values['col'] = varNums[varIndex]
 
-    # Write the tuples (simId, trialNum, paramId, value) to the database
-    db.saveParameterValues(simId, paramValues)
+    db.saveParameterValuesDF(simId, values)
 
     # SALib methods may not create exactly the number of trials requested
     # so we update the database to set the record straight.
     db.updateSimTrials(simId, trials)
-    _logger.info('Saved %d trials for simId %d', trials, simId)
+    _logger.info('Saved %d values for %d trials for simId %d in %.2f sec',
+                 values.shape[0], trials, simId, time.time() - startTime)
 
 
 def runStaticSetup(runWorkspace, project, groupName):
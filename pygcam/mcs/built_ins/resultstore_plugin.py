@@ -0,0 +1,41 @@
+# Copyright (c) 2016  Richard Plevin
+# See the https://opensource.org/licenses/MIT for license details.
+
+from pygcam.log import getLogger
+from .McsSubcommandABC import McsSubcommandABC, clean_help
+
+_logger = getLogger(__name__)
+
+def driver(args, tool):
+    '''
+    Build the columnar result store for a simulation from the database.
+    '''
+    from ..resultStore import backfillResultStore, resultStoreEnabled
+
+    store = backfillResultStore(args.simId, delete=not args.keep)
+
+    if not resultStoreEnabled():
+        _logger.warning('Wrote %s, but it will not be used until MCS.ResultStore is set to True',
+                        store.storeDir)
+
+
+class ResultStoreCommand(McsSubcommandABC):
+    def __init__(self, subparsers):
+        kwargs = {'help' : '''Build the columnar (Parquet) result store for a simulation from 
+                  the results saved in the database. Requires the pyarrow package.'''}
+        super(ResultStoreCommand, self).__init__('resultstore', subparsers, kwargs)
+
+    def addArgs(self, parser):
+        parser.add_argument('-k', '--keep', action='store_true',
+                            help=clean_help('''Don't delete an existing result store for this
+                            simulation before writing; newly written rows replace older 
+                            rows for the same run when the store is read.'''))
+
+        parser.add_argument('-s', '--simId', type=int, default=1,
+                            help=clean_help('The id of the simulation. Default is 1.'))
+
+        return parser   # for auto-doc generation
+
+
+    def run(self, args, tool):
+        driver(args, tool)
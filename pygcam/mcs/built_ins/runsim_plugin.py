@@ -14,7 +14,7 @@ def driver(args, tool):
     from ..Database import getDatabase
     from ..util import parseTrialString
 
-    if not (args.runLocal or args.redoListOnly):
+    if not (args.runLocal or args.redoListOnly or args.dryRun):
         # If the pid file doesn't exist, we assume the cluster is
         # not running and we run it with the given profile and
         # cluster ID, relying on the config file for other parameters.
@@ -73,6 +73,7 @@ class RunSimCommand(McsSubcommandABC):
         defaultMaxEngines = getParamAsInt('IPP.MaxEngines')
         defaultMinutes    = getParamAsFloat('IPP.MinutesPerRun')
         defaultWaitSecs   = getParamAsFloat('IPP.ResultLoopWaitSecs')
+        defaultWorkers    = getParamAsInt('MCS.LocalWorkers')
 
         # TBD: document this variable
         defaultScenario = getParam('MCS.DefaultScenario', raiseError=False)
@@ -95,6 +96,12 @@ class RunSimCommand(McsSubcommandABC):
         parser.add_argument('-D', '--noDatabase', dest='updateDatabase', action='store_false',
                             help=clean_help('''Don't save query results to the SQL database.'''))
 
+        parser.add_argument('--dryRun', action='store_true',
+                            help=clean_help('''Print the order in which trials would be submitted, the
+                            experiment each depends on, and the estimated makespan, based on the mean
+                            duration of previous successful runs of each experiment, but don't run
+                            anything.'''))
+
         parser.add_argument('-e', '--maxEngines', type=int, default=defaultMaxEngines,
                             help=clean_help('''Set maximum number of engines to create. (Ignored 
                             unless -C flag is specified.
@@ -113,7 +120,8 @@ class RunSimCommand(McsSubcommandABC):
                             no outstanding tasks.'''))
 
         parser.add_argument('-l', '--runLocal', action='store_true',
-                            help=clean_help('''Runs the program locally instead of submitting a batch job.'''))
+                            help=clean_help('''Runs the program locally instead of submitting a batch job.
+                            See also --workers.'''))
 
         parser.add_argument('-m', '--minutesPerRun', type=int, default=defaultMinutes,
                             help=clean_help('''Set the number of minutes of walltime to allocate
@@ -170,8 +178,14 @@ class RunSimCommand(McsSubcommandABC):
                              defined trials.'''))
 
         parser.add_argument('-w', '--waitSecs', type=int, default=defaultWaitSecs,
-                            help=clean_help('''How many seconds to wait between queries to the ipyparallel
-                            controller for completed jobs. Default is %d.''' % defaultWaitSecs))
+                            help=clean_help('''How many seconds to wait for a task to complete before checking
+                            the status of the ipyparallel engines and task queue. Default is %d.''' % defaultWaitSecs))
+
+        parser.add_argument('-W', '--workers', type=int, default=defaultWorkers,
+                            help=clean_help('''With --runLocal, the number of local processes to run
+                            trials in. Policy trials start after the corresponding baseline trial
+                            completes. Default is the value of config variable MCS.LocalWorkers,
+                            currently %d.''' % defaultWorkers))
 
         return parser   # for auto-doc generation
 
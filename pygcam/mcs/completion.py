@@ -0,0 +1,243 @@
+"""
+.. Event-driven collection of completed tasks for the MCS master, and a local
+   stand-in for the parts of the ipyparallel client used by the master, which
+   allows trials to be run in local processes, and the result loop to be
+   tested, without a cluster.
+
+.. Copyright (c) 2016  Richard Plevin
+   See the https://opensource.org/licenses/MIT for license details.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+import itertools
+import threading
+from six.moves import queue
+
+from ..log import getLogger
+from ..utils import workerProcessPool
+from .error import PygcamMcsSystemError
+
+_logger = getLogger(__name__)
+
+
+class CompletionQueue(object):
+    """
+    Collects tasks as they complete. Tasks are futures, e.g., ipyparallel
+    AsyncResult instances. Each task registered with watch() adds itself to a
+    queue from its "done" callback, which runs on whichever thread completes the
+    task (for ipyparallel, the client's IO thread), so the consumer blocks on the
+    queue rather than polling each outstanding task.
+
+    Tasks that don't run "done" callbacks, e.g., the AsyncHubResult returned by
+    ipyparallel's Client.resubmit(), must be watched with poll=True; these are
+    checked with ready() each time poll() is called.
+    """
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.outstanding = 0
+        self.polled = []        # tasks checked by poll() rather than by callback
+
+    def __len__(self):
+        return self.outstanding
+
+    def watch(self, task, poll=False):
+        """
+        Add `task` to the set of tasks whose completion is reported by drain().
+
+        :param task: (Future or AsyncResult) the task to watch
+        :param poll: (bool) if True, the task is checked by poll() rather than
+            reporting its own completion.
+        :return: none
+        """
+        self.outstanding += 1
+        if poll:
+            self.polled.append(task)
+        else:
+            task.add_done_callback(self.queue.put)
+
+    def poll(self):
+        """
+        Check each task watched with poll=True, and queue those that have completed
+        so they're returned by drain().
+
+        :return: (int) the number of tasks found to have completed
+        """
+        ready = [task for task in self.polled if task.ready()]
+        for task in ready:
+            self.polled.remove(task)
+            self.queue.put(task)
+
+        return len(ready)
+
+    def drain(self, timeout=None, maxBatch=None):
+        """
+        Wait up to `timeout` seconds for a task to complete, then return a list
+        holding it and any other tasks that have completed, up to `maxBatch` tasks.
+
+        :param timeout: (float) seconds to wait, or None to wait indefinitely
+        :param maxBatch: (int) the maximum number of tasks to return, or None for no limit
+        :return: (list) the completed tasks, or an empty list if none completed in time
+        """
+        try:
+            batch = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+
+        while maxBatch is None or len(batch) < maxBatch:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        self.outstanding -= len(batch)
+        return batch
+
+
+class LocalAsyncResult(Future):
+    """
+    Stand-in for ipyparallel's AsyncMapResult for tasks run by LocalClient.
+    """
+    _counter = itertools.count()
+
+    def __init__(self):
+        super(LocalAsyncResult, self).__init__()
+        self.msg_ids = ['local-%d' % next(self._counter)]
+        self.engine_id = None
+        self.data = [{}]        # published data; not supported locally
+
+    @property
+    def msg_id(self):
+        return self.msg_ids
+
+    def ready(self):
+        return self.done()
+
+    def get(self, timeout=None):
+        return self.result(timeout=timeout)
+
+
+class LocalView(object):
+    """
+    Stand-in for ipyparallel's LoadBalancedView for tasks run by LocalClient.
+    """
+    def __init__(self, client):
+        self.client = client
+        self.after = None
+
+    @contextmanager
+    def temp_flags(self, after=None):
+        saved = self.after
+        self.after = after
+        try:
+            yield
+        finally:
+            self.after = saved
+
+    def map_async(self, func, *sequences):
+        return self.client.submit(func, list(zip(*sequences)), after=self.after)
+
+
+def _callMapped(func, argTuples):
+    return [func(*args) for args in argTuples]
+
+
+class LocalClient(object):
+    """
+    A local stand-in for the subset of ipyparallel.Client used by Master.
+    Tasks run on a pool of threads or processes, each representing an engine.
+    A task submitted with a dependency (see LocalView.temp_flags) is started
+    when the task it depends on completes, and fails if that task failed.
+
+    N.B. GCAM trials change the working directory, so they must be run in
+    processes; the thread pool is suitable only for testing.
+    """
+    def __init__(self, engines=1, processes=False, initializer=None, initargs=()):
+        """
+        :param engines: (int) the number of threads or processes to run tasks on
+        :param processes: (bool) if True, run tasks in a pool of processes,
+            otherwise in a pool of threads
+        :param initializer: (callable) if given, a function called with `initargs`
+            when each process starts. (Requires Python 3.7 or later.)
+        :param initargs: (tuple) arguments to pass to `initializer`
+        """
+        if processes:
+            self.executor = workerProcessPool(engines, initializer=initializer, initargs=initargs)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=engines)
+
+        self.ids = list(range(engines))
+        self.tasks = {}             # (func, argTuples, after) keyed by msg_id, for resubmit()
+        self.outstanding = set()    # msg_ids of tasks not yet completed
+        self.completed = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def load_balanced_view(self):
+        return LocalView(self)
+
+    def submit(self, func, argTuples, after=None):
+        ar = LocalAsyncResult()
+        msg_id = ar.msg_ids[0]
+
+        with self.lock:
+            self.tasks[msg_id] = (func, argTuples, after)
+            self.outstanding.add(msg_id)
+
+        def finish(future):
+            with self.lock:
+                self.outstanding.discard(msg_id)
+                self.completed += 1
+
+            exc = future.exception()
+            if exc is None:
+                ar.set_result(future.result())
+            else:
+                ar.set_exception(exc)
+
+        def start(dependency=None):
+            if dependency is not None and dependency.exception() is not None:
+                future = Future()
+                future.set_exception(PygcamMcsSystemError("Task %s: dependency failed" % msg_id))
+                finish(future)
+                return
+
+            self.executor.submit(_callMapped, func, argTuples).add_done_callback(finish)
+
+        if after is None:
+            start()
+        else:
+            after.add_done_callback(start)
+
+        return ar
+
+    def resubmit(self, msg_ids):
+        msg_id = msg_ids[0] if isinstance(msg_ids, list) else msg_ids
+        func, argTuples, after = self.tasks[msg_id]
+        return self.submit(func, argTuples, after=after)
+
+    def queue_status(self):
+        with self.lock:
+            status = {u'unassigned': 0}
+            for eid in self.ids:
+                status[eid] = {u'queue': 0, u'completed': 0, u'tasks': 0}
+
+            status[self.ids[0]].update(queue=len(self.outstanding), completed=self.completed)
+
+        return status
+
+    def purge_results(self, jobs=None):
+        jobs = jobs if isinstance(jobs, list) else [jobs]
+        with self.lock:
+            for msg_id in jobs:
+                self.tasks.pop(msg_id, None)
+
+    def shutdown(self, targets=None, hub=False, block=False):
+        if targets is None:
+            self.close()
+        else:
+            _logger.debug("LocalClient: ignoring shutdown of engines %s", targets)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
@@ -28,4 +28,5 @@ def getMainParser():
     setUsingMCS(True)
     getConfig(reload=True, allowMissing=True)
     tool = DummyTool().getInstance()
+    tool.loadAllPlugins()
     return tool.parser
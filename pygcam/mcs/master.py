@@ -14,17 +14,20 @@ from six import iteritems, string_types
 import os
 import stat
 import sys
-from time import sleep
+from time import sleep, time
 from IPython.paths import locate_profile
 
 import ipyparallel as ipp
 from ipyparallel.apps.ipclusterapp import ALREADY_STARTED, ALREADY_STOPPED, NO_CLUSTER
 
+from .completion import CompletionQueue, LocalClient
 from .context import Context
 from .Database import RUN_NEW, RUN_RUNNING, RUN_SUCCEEDED, RUN_QUEUED, RUN_KILLED, ENG_TERMINATE, getDatabase
 from .error import IpyparallelError, PygcamMcsSystemError, PygcamMcsUserError
+from .resultStore import ResultStore, resultStoreEnabled
+from .scheduler import TrialGraph
 from .util import parseTrialString, createTrialString
-from ..config import getParam, getParamAsInt
+from ..config import getParam, getParamAsInt, initWorkerConfig, setUsingMCS, workerConfigState
 from ..log import getLogger
 
 # Exit values for Master.processTrials()
@@ -33,6 +36,18 @@ EXIT = 2
 
 _logger = getLogger(__name__)
 
+def _initLocalWorker(section, overrides):
+    """
+    Initialize a local worker process started by "gt runsim --runLocal --workers N".
+
+    :param section: (str) the config file section (project) to read from
+    :param overrides: (list) the (section, name) and value of each parameter set
+        by calling setParam in the master process
+    :return: none
+    """
+    setUsingMCS(True)
+    initWorkerConfig(section, overrides)
+
 #
 # SLURM
 #
@@ -107,10 +122,15 @@ batchTemplates = {'slurm' : {'engine'     : _slurmEngineBatchTemplate,
 class Master(object):
     idleEngines = set()
 
-    def __init__(self, args):
+    def __init__(self, args, client=None):
+        """
+        :param args: (argparse.Namespace) arguments from the runsim plugin
+        :param client: (ipyparallel.Client or LocalClient) the client to use
+            to run tasks, or None to connect to the ipyparallel cluster
+        """
         self.args = args
         self.db = getDatabase(checkInit=False)
-        self.client = None
+        self.client = client
         self.finished = False
 
         projectName = args.projectName
@@ -131,7 +151,7 @@ class Master(object):
         seconds   = getParamAsInt('IPP.StartupWaitSecs')
         profile   = self.args.profile
         clusterId = self.args.clusterId
-        client = None
+        client = self.client
 
         for i in range(1, maxTries+1):
             if client and len(client) > 0:
@@ -287,123 +307,122 @@ class Master(object):
         cached.setVars(status=status)
         self.db.setRunStatus(context.runId, status, session=session)
 
-    def resubmit(self, task, context, reason):
+    def resubmit(self, ar, context, reason):
+        """
+        Resubmit the task for AsyncResult `ar` and return the new AsyncResult.
+        """
         _logger.info('Resubmitting task (%s) %s', reason, context)
-        self.client.resubmit(task)
+        newAR = self.client.resubmit(ar.msg_ids)
         self.setRunStatus(context, RUN_QUEUED)
+        return newAR
 
-    def processTask(self, client, task, results):
-        workerResult = None
-
-        try:
-            ar = client.get_result(task, block=False, owner=False)
-        except ipp.EngineError as e:
-            # Raised if an engine dies, e.g., walltime expired.
-            _logger.warning('processTask: %s', e)
-            return
-        except Exception as e:
-            _logger.debug('processTask: client.get_result() failed: %s', e)
-            return
+    def processCompleted(self, ars):
+        """
+        Process a batch of completed tasks.
 
-        try:
-            if not ar.ready():
-                return
-        except KeyError:  # stale message id can trigger KeyError
-            return
-        except Exception as e:
-            _logger.warning('processTask: ar.ready(): %s', e)
-            return
+        :param ars: (list of AsyncResult) completed tasks
+        :return: (tuple of lists) the WorkerResults to save, and the AsyncResults
+           for any tasks that were resubmitted.
+        """
+        client = self.client
+        results = []
+        resubmitted = []
 
-        try:
-            chunk = ar.get()
-        except Exception as e:
-            _logger.debug("processTask: ar.get(): %s", e)
-            return
+        for ar in ars:
+            workerResult = None
 
-        if chunk is None:
-            _logger.debug('processTask: ar.get() returned None')
-            return
+            try:
+                chunk = ar.get()
+            except ipp.EngineError as e:
+                # Raised if an engine dies, e.g., walltime expired.
+                _logger.warning('processCompleted: %s', e)
+                continue
+            except Exception as e:
+                _logger.debug("processCompleted: ar.get(): %s", e)
+                continue
+
+            if chunk is None:
+                _logger.debug('processCompleted: ar.get() returned None')
+                continue
 
-        try:
-            workerResult = chunk[0]
-            context = workerResult.context
-            status = context.status
+            try:
+                workerResult = chunk[0]
+                context = workerResult.context
+                status = context.status
 
-            if status == ENG_TERMINATE:
-                if ar.engine_id is not None:
-                    _logger.info("Terminating engine %s: insufficient time remaining", ar.engine_id)
-                    client.shutdown(ar.engine_id)
-                    sleep(2)
-                    self.resubmit(task, context, "engine terminated")
+                if status == ENG_TERMINATE:
+                    if ar.engine_id is not None:
+                        _logger.info("Terminating engine %s: insufficient time remaining", ar.engine_id)
+                        client.shutdown(ar.engine_id)
+                        sleep(2)
+                        resubmitted.append(self.resubmit(ar, context, "engine terminated"))
 
-            elif status == RUN_KILLED:
-                self.resubmit(task, context, "run killed")
+                elif status == RUN_KILLED:
+                    resubmitted.append(self.resubmit(ar, context, "run killed"))
 
-            else:
-                results.append(workerResult)
+                else:
+                    results.append(workerResult)
 
-        except Exception as e:
-            _logger.warning('processTask: %s', e)
-            _logger.debug('processTask: type(chunk)=%s; type(workerResult)=%s', type(chunk), type(workerResult))
+            except Exception as e:
+                _logger.warning('processCompleted: %s', e)
+                _logger.debug('processCompleted: type(chunk)=%s; type(workerResult)=%s', type(chunk), type(workerResult))
 
-    def getResults(self, tasks):
-        if not tasks:
-            return None
+        return results, resubmitted
 
-        client = self.client
-        results = []
+    def updateRunStatuses(self, ars):
+        """
+        Save the run status published by tasks that have started running, and
+        return the list of tasks that have neither started nor completed, which
+        are the only ones that need to be checked next time.
+        """
+        waiting = []
+        for ar in ars:
+            if ar.done():
+                continue
+
+            data = ar.data[0]
+            context = data.get('context') if data else None
+            if context:
+                self.setRunStatus(context)
+            else:
+                waiting.append(ar)
 
-        for task in tasks:
-            self.processTask(client, task, results)
-            client.purge_results(jobs=task)
+        return waiting
 
-        return results
+    def reportProgress(self, ars):
+        """
+        Log the most recent GCAM progress published by each running task, and
+        return the tasks that haven't completed.
+        """
+        pending = []
+        for ar in ars:
+            if ar.done():
+                continue
+
+            pending.append(ar)
+            data = ar.data[0]
+            progress = data.get('progress') if data else None
+            if progress:
+                context = data['context']
+                _logger.info("Trial %d, %s: period %d (%d) completed, %s iterations, %.1f sec",
+                             context.trialNum, context.scenario, progress['period'],
+                             progress['year'], progress['iterations'], progress['elapsed'])
+        return pending
 
     def saveResults(self, results):
         '''
         Called on the master to save results to the database that were prepared by the worker.
+        Run statuses and all result values are written in a single transaction using the
+        database's bulk-insert path.
         '''
         db = getDatabase()
         session = db.Session()
 
         try:
-            # Delete all old values in first transaction
-            for result in results:
-                context = result.context
-                resultsList = result.resultsList
-
-                if resultsList:
-                    # Delete any stale results for this runId (i.e., if re-running a given runId)
-                    names = [resultDict['paramName'] for resultDict in resultsList]
-                    ids = db.getOutputIds(names)
-                    db.deleteRunResults(context.runId, outputIds=ids, session=session)
-
-            db.commitWithRetry(session)
-
-            # Add all new values in a second transaction
             for result in results:
-                context = result.context
-                resultsList = result.resultsList or []
-                runId   = context.runId
-
-                self.setRunStatus(context, session=session)
-
-                if context.status != RUN_SUCCEEDED:
-                    continue
-
-                for resultDict in resultsList:
-                    paramName  = resultDict['paramName']
-                    value      = resultDict['value']
-                    regionName = resultDict['regionName']
-
-                    # Save the values to the database
-                    if resultDict['isScalar']:
-                        db.setOutValue(runId, paramName, value, session=session)
-                    else:
-                        regionId = db.getRegionId(regionName)   # cached; not a DB query
-                        units = resultDict['units']
-                        db.saveTimeSeries(runId, regionId, paramName, value, units=units, session=session)
+                self.setRunStatus(result.context, session=session)
 
+            db.saveWorkerResults(results, session=session)
             db.commitWithRetry(session)
 
         except Exception as e:
@@ -414,6 +433,13 @@ class Master(object):
         finally:
             db.endSession(session)
 
+        if resultStoreEnabled():
+            ResultStore.getInstance(self.args.simId).addWorkerResults(results)
+
+    def flushResultStore(self):
+        if resultStoreEnabled():
+            ResultStore.getInstance(self.args.simId).flush()
+
     def checkEngines(self):
         from .slurm import Slurm
 
@@ -451,87 +477,101 @@ class Master(object):
         """
         args = self.args
 
-        if args.runLocal:
-            self.runTrials()
+        if getattr(args, 'dryRun', False):
+            self.runTrials()    # prints the plan without running anything
             return
 
         if args.redoListOnly and args.statuses:
             listTrialsToRedo(self.db, args.simId, args.scenarios, args.statuses)
             return
 
+        if args.runLocal:
+            workers = getattr(args, 'workers', 1)
+            if workers <= 1:
+                self.runTrials()
+                self.flushResultStore()
+                return
+
+            # Run trials in a pool of local processes using the same loop as for engines
+            _logger.info('Running trials in %d local worker processes', workers)
+            self.client = LocalClient(engines=workers, processes=True,
+                                      initializer=_initLocalWorker, initargs=workerConfigState())
+
         self.waitForWorkers()    # wait for engines to spin up
 
         shutdownWhenIdle = not args.dontShutdownWhenIdle
+        isLocal = isinstance(self.client, LocalClient)
 
         ars = self.runTrials()
 
-        pending = copy.copy(self.client.outstanding)
-
-        counter = 0         # for occasionally displaying queue status
-
-        while pending:
+        # Tasks add themselves to the queue as they complete; we block on the
+        # queue and save results in batches as they arrive. Engine and queue
+        # status are checked when no tasks complete within args.waitSecs, or
+        # at most once every args.waitSecs while tasks are completing.
+        completed = CompletionQueue()
+        for ar in ars:
+            completed.watch(ar)
 
-            if not self.checkEngines():
-                return
+        running = list(ars)     # tasks that may report progress
 
-            state = 'nominal'   # set to 'completed' when some are completed, to set shorter sleep
+        batchSize = getParamAsInt('IPP.ResultBatchSize')
+        lastCheck = time()
 
-            # check for status updates
-            for ar in ars:
-                data = ar.data[0]
-                if data:
-                    context = data.get('context')
-                    if context:
-                        self.setRunStatus(context)
+        total = len(completed)
+        finished = 0
 
-            # finished is the set of msg_ids that are complete
-            finished = pending.difference(self.client.outstanding)
+        while len(completed):
+            batch = completed.drain(timeout=args.waitSecs, maxBatch=batchSize)
 
-            # update pending to exclude those that finished
-            pending = pending.difference(finished)
+            if batch:
+                _logger.debug('%d completed tasks', len(batch))
 
-            if finished:
-                state = 'completed'
-                _logger.debug('%d completed tasks', len(finished))
+                results, resubmitted = self.processCompleted(batch)
+                for ar in resubmitted:
+                    # Results of resubmitted tasks come from the hub and don't run
+                    # "done" callbacks, so these are polled in the periodic check.
+                    completed.watch(ar, poll=True)
+                    ars.append(ar)
+                    running.append(ar)
 
-                results = self.getResults(finished)
                 if results:
                     self.saveResults(results)
                 else:
-                    _logger.debug('Purging %d completed tasks with no results (engine died?)', len(finished))
-                    self.client.purge_results(jobs=finished)
+                    _logger.debug('Purging %d completed tasks with no results (engine died?)', len(batch))
 
-                # drop finished tasks from list to avoid checking status needlessly
-                toDelete = []
-                for ar in ars:
-                    id = ar.msg_id[0]
-                    if id in finished:
-                        toDelete.append(ar)
-                        finished.remove(id)
+                self.client.purge_results(jobs=[msg_id for ar in batch for msg_id in ar.msg_ids])
 
-                for ar in toDelete:
-                    ars.remove(ar)
+                finished += len(batch) - len(resubmitted)
+                _logger.info('Completed %d of %d tasks', finished, total)
 
-                if shutdownWhenIdle:
-                    self.shutdownIdleEngines()
+            now = time()
+            if batch and now - lastCheck < args.waitSecs:
+                continue
 
-            if counter % 5 == 0:
-                totals = self.queueTotals()
-                _logger.info("%d clients; totals: %s", len(self.client), totals)
+            lastCheck = now
+            completed.poll()
 
-            secs = args.waitSecs if state == 'nominal' else 2
-            _logger.debug('sleep(%d)', secs)
-            sleep(secs)
+            if not self.checkEngines():
+                self.flushResultStore()
+                return
+
+            ars = self.updateRunStatuses(ars)
+            running = self.reportProgress(running)
 
-            # handle the case of initial over-allocation
-            if counter == 0 and shutdownWhenIdle:
+            totals = self.queueTotals()
+            _logger.info("%d clients; totals: %s", len(self.client), totals)
+
+            if shutdownWhenIdle:
                 self.shutdownIdleEngines()
 
-            counter += 1
+        self.flushResultStore()
 
-        _logger.info("Shutting down hub")
-        # self.client.shutdown(hub=False, block=False)    # doesn't seem to work any more
-        stopCluster()
+        if isLocal:
+            self.client.close()
+        else:
+            _logger.info("Shutting down hub")
+            # self.client.shutdown(hub=False, block=False)    # doesn't seem to work any more
+            stopCluster()
 
     def runTrials(self):
         from . import worker
@@ -543,6 +583,8 @@ class Master(object):
         for key in ('runLocal', 'noGCAM', 'noBatchQueries', 'noPostProcessor'):
             argDict[key] = args.get(key, False)
 
+        argDict['localWorkers'] = args.get('workers', 1)
+
         simId       = args['simId']
         statuses    = args['statuses']
         scenarios   = args['scenarios']
@@ -551,25 +593,20 @@ class Master(object):
         trialStr    = args['trials']
         runLocal    = args['runLocal']
 
+        # With --runLocal, trials run serially in this process unless a LocalClient was created
+        serial = runLocal and self.client is None
+
         asyncResults = []
 
-        view = None if runLocal else self.client.load_balanced_view() # retries=2)
+        dryRun = args.get('dryRun', False)
+        view = None if (serial or dryRun) else self.client.load_balanced_view() # retries=2)
 
         db = getDatabase()
         exps = {e.expName: e.parent for e in db.getExps()}
 
-        def isBaseline(scenario):
-            return (not exps.get(scenario))
-
-        def notBaseline(scenario):
-            return exps.get(scenario)
-
-        # sort so baselines come first
-        baselines = list(filter(isBaseline,  scenarios))
-        policies  = list(filter(notBaseline, scenarios))
-        scenarios = baselines + policies
-
-        baselineARs = {}      # baseline async_result objects keyed by trialnum
+        durations = db.getMeanDurations()
+        defaultMinutes = args.get('minutesPerRun') or getParamAsInt('IPP.MinutesPerRun')
+        graph = TrialGraph(exps, durations=durations, defaultDuration=defaultMinutes)
 
         for scenario in scenarios:
 
@@ -602,40 +639,53 @@ class Master(object):
                     # if trials aren't specified, queue all of them
                     trialNums = list(range(trialCount))
 
-                contexts = self.createRuns(simId, scenario, trialNums)
-
-            statusPairs = []
+                if dryRun:
+                    # don't create run records when only printing the plan
+                    contexts = [Context(projectName=projectName, simId=simId, trialNum=trialNum,
+                                        scenario=scenario, groupName=groupName,
+                                        baseline=exps.get(scenario), store=False) for trialNum in trialNums]
+                else:
+                    contexts = self.createRuns(simId, scenario, trialNums)
 
             for context in contexts:
-                try:
-                    if runLocal:
-                        self.setRunStatus(context, status=RUN_RUNNING)
-                        ctx = copy.copy(context)    # use a copy to simulate what happens with remote call...
-                        result = worker.runTrial(ctx, argDict)
-                        self.saveResults([result])
+                graph.addTrial(context)
+
+        if dryRun:
+            engines = args.get('workers', 1) if runLocal else args.get('maxEngines') or getParamAsInt('IPP.MaxEngines')
+            graph.printPlan(engines)
+            return asyncResults
+
+        # Each trial is submitted after the trial of its nearest ancestor experiment, on which
+        # it depends, with trials on the longest chains of dependent experiments first.
+        nodeARs = {}        # async_result objects keyed by TrialNode key
+        statusPairs = []
 
+        for node in graph.submissionOrder():
+            context = node.context
+            try:
+                if serial:
+                    self.setRunStatus(context, status=RUN_RUNNING)
+                    ctx = copy.copy(context)    # use a copy to simulate what happens with remote call...
+                    result = worker.runTrial(ctx, argDict)
+                    self.saveResults([result])
+
+                else:
+                    parentAR = nodeARs.get(node.parent.key) if node.parent else None
+                    if parentAR is None:
+                        result = view.map_async(worker.runTrial, [context], [argDict])
                     else:
-                        if isBaseline(scenario):
+                        # Create a dependency on the parent trial that we've already submitted
+                        with view.temp_flags(after=parentAR):
                             result = view.map_async(worker.runTrial, [context], [argDict])
-                            baselineARs[context.trialNum] = result
 
-                        else:
-                            baselineAR = baselineARs.get(context.trialNum, None)
-                            if baselineAR is None:
-                                result = view.map_async(worker.runTrial, [context], [argDict])
-                            else:
-                                # Create a dependency on the baseline that we've already submitted
-                                # TBD: looks like this should work ok if after=None...
-                                with view.temp_flags(after=baselineAR):
-                                    result = view.map_async(worker.runTrial, [context], [argDict])
+                    nodeARs[node.key] = result
+                    statusPairs.append((context, RUN_QUEUED))
+                    asyncResults.append(result)
 
-                        statusPairs.append((context, RUN_QUEUED))
-                        asyncResults.append(result)
-
-                except Exception as e:
-                    _logger.error("Exception running 'runTrial': %s", e)
+            except Exception as e:
+                _logger.error("Exception running 'runTrial': %s", e)
 
-            self.setRunStatuses(statusPairs)
+        self.setRunStatuses(statusPairs)
 
         return asyncResults
 
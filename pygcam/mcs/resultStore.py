@@ -0,0 +1,278 @@
+'''
+An optional columnar (Parquet) store of MCS results, kept alongside the SQL
+database in ``{simDir}/resultStore``. Scalar results are stored in the "outvalue"
+dataset and timeseries results in the "timeseries" dataset, each partitioned by
+experiment and output name so readers load only the files and columns they need.
+
+The store is enabled by setting config variable ``MCS.ResultStore`` to True. When
+enabled, the master writes results to the store as they are saved to the database,
+and :py:meth:`GcamDatabase.getOutValues`, :py:meth:`GcamDatabase.getTimeSeriesDF`,
+and :py:meth:`Analysis.getResults` read from it rather than from SQL. The store for
+an existing simulation can be (re)built from the database with "gt resultstore".
+
+Requires the ``pyarrow`` package.
+'''
+import os
+import time
+from six import string_types
+
+from ..config import getParamAsBoolean, getParamAsInt
+from ..log import getLogger
+from ..utils import mkdirs, removeTreeSafely
+from .context import getSimDir
+from .error import PygcamMcsUserError
+
+_logger = getLogger(__name__)
+
+STORE_DIR_NAME   = 'resultStore'
+OUTVALUE_DATASET = 'outvalue'
+TIMESERIES_DATASET = 'timeseries'
+
+PARTITION_COLS = ['expName', 'outputName']
+
+# Rows are appended to the store, so re-saving a run adds new rows. Each write
+# records a sequence number so readers can keep only the latest row for a run.
+SEQ_COL = 'seq'
+
+
+def resultStoreEnabled():
+    return getParamAsBoolean('MCS.ResultStore')
+
+def _importParquet():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise PygcamMcsUserError("The result store requires the 'pyarrow' package")
+
+    return pa, pq
+
+
+class ResultStore(object):
+    '''
+    Reads and writes the Parquet result store for a single simulation.
+    '''
+    instances = {}      # keyed by simId
+
+    @classmethod
+    def getInstance(cls, simId):
+        obj = cls.instances.get(simId)
+        if obj is None:
+            obj = cls.instances[simId] = cls(simId)
+
+        return obj
+
+    @classmethod
+    def forReading(cls, simId):
+        '''
+        Return the ResultStore for `simId` if the store is enabled and has been
+        written for this simulation, else None.
+        '''
+        if not resultStoreEnabled():
+            return None
+
+        obj = cls.getInstance(simId)
+        return obj if obj.exists() else None
+
+    def __init__(self, simId):
+        self.simId = simId
+        self.storeDir = os.path.join(getSimDir(simId), STORE_DIR_NAME)
+        self.flushRows = getParamAsInt('MCS.ResultStoreFlushRows')
+        self.buffers = {OUTVALUE_DATASET: [], TIMESERIES_DATASET: []}
+
+    def datasetDir(self, dataset):
+        return os.path.join(self.storeDir, dataset)
+
+    def exists(self):
+        return os.path.isdir(self.storeDir)
+
+    def delete(self):
+        self.buffers = {OUTVALUE_DATASET: [], TIMESERIES_DATASET: []}
+        if self.exists():
+            removeTreeSafely(self.storeDir)
+
+    #
+    # Writing
+    #
+    def addWorkerResults(self, results):
+        '''
+        Buffer the results for the given WorkerResult instances, writing them to
+        the store when the buffer exceeds MCS.ResultStoreFlushRows rows.
+
+        :param results: (list of WorkerResult) results returned by worker tasks
+        :return: none
+        '''
+        from .Database import RUN_SUCCEEDED
+
+        for result in results:
+            context = result.context
+            if context.status != RUN_SUCCEEDED or not result.resultsList:
+                continue
+
+            for resultDict in result.resultsList:
+                self.addResult(context.runId, context.trialNum, context.scenario, resultDict)
+
+        if sum(map(len, self.buffers.values())) >= self.flushRows:
+            self.flush()
+
+    def addResult(self, runId, trialNum, expName, resultDict):
+        '''
+        Buffer a single result dict, as produced by XMLResultFile.collectResults().
+        '''
+        row = dict(runId=runId, trialNum=trialNum, expName=expName, outputName=resultDict['paramName'])
+        value = resultDict['value']
+
+        if resultDict['isScalar']:
+            row['value'] = value
+            self.buffers[OUTVALUE_DATASET].append(row)
+        else:
+            row['regionName'] = resultDict['regionName']
+            row['units'] = resultDict['units']
+            row.update(value)
+            self.buffers[TIMESERIES_DATASET].append(row)
+
+    def flush(self):
+        '''
+        Write any buffered rows to the store.
+        '''
+        import pandas as pd
+
+        for dataset, rows in self.buffers.items():
+            if rows:
+                self.writeDataFrame(dataset, pd.DataFrame.from_records(rows))
+
+        self.buffers = {OUTVALUE_DATASET: [], TIMESERIES_DATASET: []}
+
+    def writeDataFrame(self, dataset, df):
+        '''
+        Append the rows in `df` to the given dataset, partitioned by experiment
+        and output name.
+        '''
+        pa, pq = _importParquet()
+
+        df = df.copy()
+        df[SEQ_COL] = time.time()
+
+        path = self.datasetDir(dataset)
+        mkdirs(path)
+
+        _logger.debug("Writing %d rows to result store %s", df.shape[0], path)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_to_dataset(table, path, partition_cols=PARTITION_COLS)
+
+    #
+    # Reading
+    #
+    def _read(self, dataset, columns, filters, keys):
+        pa, pq = _importParquet()
+
+        path = self.datasetDir(dataset)
+        if not os.path.isdir(path):
+            return None
+
+        table = pq.read_table(path, columns=columns + [SEQ_COL], filters=filters)
+        if table.num_rows == 0:
+            return None
+
+        df = table.to_pandas()
+
+        # Partition columns are returned as categoricals; convert to plain strings
+        for col in PARTITION_COLS:
+            if col in df.columns:
+                df[col] = df[col].astype(str)
+
+        # keep only the most recently written row for each key
+        df = df.sort_values(SEQ_COL).drop_duplicates(subset=keys, keep='last')
+        return df.drop(SEQ_COL, axis=1)
+
+    def getOutValues(self, expName, outputNames, limit=None):
+        '''
+        Return a DataFrame indexed by trialNum with one column per named output,
+        for the given experiment, or None if no values are found.
+
+        :param expName: (str) the experiment name
+        :param outputNames: (str or list of str) the output(s) to read
+        :param limit: (int) if > 0, return only the first `limit` trials
+        :return: (pandas.DataFrame or None) the values
+        '''
+        if isinstance(outputNames, string_types):
+            outputNames = [outputNames]
+
+        filters = [('expName', '=', expName), ('outputName', 'in', list(outputNames))]
+        df = self._read(OUTVALUE_DATASET, ['trialNum', 'outputName', 'value'], filters,
+                        ['trialNum', 'outputName'])
+        if df is None:
+            return None
+
+        df = df.pivot(index='trialNum', columns='outputName', values='value').sort_index()
+        df.columns.name = None
+
+        if limit and limit > 0:
+            df = df.iloc[:limit]
+
+        return df
+
+    def getTimeSeries(self, outputName, expList, yearCols):
+        '''
+        Return a DataFrame with columns runId, units, expName and the given year
+        columns, for the named output and list of experiments, or None if no values
+        are found.
+        '''
+        filters = [('expName', 'in', list(expList)), ('outputName', '=', outputName)]
+        columns = ['runId', 'trialNum', 'regionName', 'units', 'expName'] + list(yearCols)
+        df = self._read(TIMESERIES_DATASET, columns, filters, ['runId', 'regionName'])
+        if df is None:
+            return None
+
+        return df.drop(['trialNum', 'regionName'], axis=1).reset_index(drop=True)
+
+
+def backfillResultStore(simId, delete=True):
+    '''
+    Build the result store for `simId` from the SQL database.
+
+    :param simId: (int) the simulation ID
+    :param delete: (bool) if True, delete any existing store for this simulation first
+    :return: (ResultStore) the store
+    '''
+    import pandas as pd
+    from .Database import RUN_SUCCEEDED, getDatabase
+    from .schema import Experiment, Output, OutValue, Region, Run, TimeSeries
+
+    db = getDatabase()
+    store = ResultStore.getInstance(simId)
+
+    if delete:
+        store.delete()
+
+    with db.sessionScope() as session:
+        query = session.query(Run.runId, Run.trialNum, Experiment.expName, Output.name.label('outputName'),
+                              OutValue.value).\
+            filter(Run.simId == simId, Run.status == RUN_SUCCEEDED).\
+            join(Experiment, Run.expId == Experiment.expId).\
+            join(OutValue, OutValue.runId == Run.runId).\
+            join(Output, Output.outputId == OutValue.outputId)
+
+        rows = query.all()
+        cols = [d['name'] for d in query.column_descriptions]
+        outValues = pd.DataFrame.from_records(rows, columns=cols)
+
+        yearCols = [getattr(TimeSeries, col) for col in db.yearCols()]
+        query = session.query(Run.runId, Run.trialNum, Experiment.expName, Output.name.label('outputName'),
+                              Region.displayName.label('regionName'), TimeSeries.units, *yearCols).\
+            filter(Run.simId == simId, Run.status == RUN_SUCCEEDED).\
+            join(Experiment, Run.expId == Experiment.expId).\
+            join(TimeSeries, TimeSeries.runId == Run.runId).\
+            join(Output, Output.outputId == TimeSeries.outputId).\
+            join(Region, Region.regionId == TimeSeries.regionId)
+
+        rows = query.all()
+        cols = [d['name'] for d in query.column_descriptions]
+        timeSeries = pd.DataFrame.from_records(rows, columns=cols)
+
+    for dataset, df in ((OUTVALUE_DATASET, outValues), (TIMESERIES_DATASET, timeSeries)):
+        _logger.info("Writing %d %s rows for simId %d to %s", df.shape[0], dataset, simId, store.storeDir)
+        if df.shape[0]:
+            store.writeDataFrame(dataset, df)
+
+    return store
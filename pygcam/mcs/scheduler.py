@@ -0,0 +1,215 @@
+"""
+.. Scheduling of MCS trials as a directed acyclic graph (DAG) of (trial, experiment)
+   nodes, in which each experiment's trial depends on the same trial of its parent
+   experiment. Nodes are submitted in critical-path order, so trials at the head of
+   long chains of dependent experiments start first, and the makespan of a set of
+   trials can be estimated from the durations of previous runs.
+
+.. Copyright (c) 2016  Richard Plevin
+   See the https://opensource.org/licenses/MIT for license details.
+"""
+from __future__ import division, print_function
+import heapq
+import sys
+
+from ..log import getLogger
+from .error import PygcamMcsUserError
+
+_logger = getLogger(__name__)
+
+
+class TrialNode(object):
+    """
+    A single trial of a single experiment (scenario).
+    """
+    __slots__ = ['context', 'parent', 'children', 'duration', 'priority', 'seq']
+
+    def __init__(self, context, duration, seq):
+        self.context  = context
+        self.parent   = None        # the TrialNode this one depends on, if any
+        self.children = []
+        self.duration = duration    # estimated minutes
+        self.priority = None        # minutes on the longest path from the start of this node
+        self.seq      = seq         # preserves the order in which nodes were added
+
+    @property
+    def key(self):
+        return (self.context.trialNum, self.context.scenario)
+
+    def __str__(self):
+        return "<TrialNode trial=%s scn=%s dur=%s pri=%s>" % \
+               (self.context.trialNum, self.context.scenario, self.duration, self.priority)
+
+
+class TrialGraph(object):
+    """
+    A DAG of TrialNodes. An experiment's trial depends on the same trial of its
+    nearest ancestor experiment (following Experiment.parent) that is also in the
+    graph. If no ancestor is in the graph, the ancestors are assumed to have been
+    run previously, so the trial has no dependencies.
+    """
+    def __init__(self, parents, durations=None, defaultDuration=20):
+        """
+        :param parents: (dict) the name of each experiment's parent, or None,
+            keyed by experiment name
+        :param durations: (dict) the estimated minutes to run a trial of each
+            experiment, keyed by experiment name
+        :param defaultDuration: (number) the estimated minutes to run a trial of
+            an experiment not found in `durations`
+        """
+        self.parents = parents
+        self.durations = durations or {}
+        self.defaultDuration = defaultDuration
+        self.nodes = {}         # keyed by (trialNum, scenario)
+        self.linked = False
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def addTrial(self, context):
+        duration = self.durations.get(context.scenario) or self.defaultDuration
+        node = TrialNode(context, duration, len(self.nodes))
+        self.nodes[node.key] = node
+        self.linked = False
+        return node
+
+    def ancestors(self, expName):
+        """
+        Return the list of ancestors of `expName`, nearest first.
+        """
+        result = []
+        parent = self.parents.get(expName)
+        while parent:
+            if parent in result or parent == expName:
+                raise PygcamMcsUserError("Experiment '%s' has a circular parent chain: %s" % (expName, result))
+
+            result.append(parent)
+            parent = self.parents.get(parent)
+
+        return result
+
+    def link(self):
+        """
+        Connect each node to the node it depends on, and compute priorities.
+        """
+        if self.linked:
+            return
+
+        ancestorMap = {}
+        for node in self.nodes.values():
+            node.parent = None
+            node.children = []
+
+        for node in self.nodes.values():
+            trialNum, scenario = node.key
+            if scenario not in ancestorMap:
+                ancestorMap[scenario] = self.ancestors(scenario)
+
+            for ancestor in ancestorMap[scenario]:
+                parent = self.nodes.get((trialNum, ancestor))
+                if parent:
+                    node.parent = parent
+                    parent.children.append(node)
+                    break
+
+        self.computePriorities()
+        self.linked = True
+
+    def computePriorities(self):
+        """
+        Set each node's priority to its "bottom level": the length of the longest
+        path from the start of the node to the end of any of its descendants.
+        """
+        # Children have priorities computed before their parents
+        for node in reversed(self._topologicalOrder()):
+            longest = max([child.priority for child in node.children]) if node.children else 0
+            node.priority = node.duration + longest
+
+    def _topologicalOrder(self):
+        order = []
+        stack = [node for node in self.nodes.values() if node.parent is None]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node.children)
+
+        return order
+
+    def submissionOrder(self):
+        """
+        Return the nodes in the order they should be submitted: each node after
+        its parent, and among those whose parent has been submitted, those with
+        the longest remaining critical path first.
+        """
+        self.link()
+
+        ready = [(-node.priority, node.seq, node) for node in self.nodes.values() if node.parent is None]
+        heapq.heapify(ready)
+        order = []
+
+        while ready:
+            _, _, node = heapq.heappop(ready)
+            order.append(node)
+            for child in node.children:
+                heapq.heappush(ready, (-child.priority, child.seq, child))
+
+        return order
+
+    def criticalPath(self):
+        """
+        Return the estimated minutes on the longest chain of dependent trials.
+        """
+        self.link()
+        roots = [node.priority for node in self.nodes.values() if node.parent is None]
+        return max(roots) if roots else 0
+
+    def makespan(self, engines):
+        """
+        Estimate the minutes required to run all trials on `engines` engines by
+        simulating list scheduling in which each free engine runs the ready
+        trial with the highest priority.
+
+        :param engines: (int) the number of engines
+        :return: (float) the estimated makespan in minutes
+        """
+        self.link()
+        engines = max(engines, 1)
+
+        ready = [(-node.priority, node.seq, node) for node in self.nodes.values() if node.parent is None]
+        heapq.heapify(ready)
+
+        running = []    # (finishTime, seq, node)
+        now = 0
+        free = engines
+
+        while ready or running:
+            while ready and free:
+                _, _, node = heapq.heappop(ready)
+                heapq.heappush(running, (now + node.duration, node.seq, node))
+                free -= 1
+
+            now, _, node = heapq.heappop(running)
+            free += 1
+            for child in node.children:
+                heapq.heappush(ready, (-child.priority, child.seq, child))
+
+        return now
+
+    def printPlan(self, engines, file=None):
+        """
+        Print the submission order, critical path and estimated makespan.
+        """
+        file = file or sys.stdout
+        order = self.submissionOrder()
+
+        print("%5s  %-30s  %-30s  %8s  %8s" % ('Trial', 'Scenario', 'Depends on', 'Minutes', 'Priority'), file=file)
+        for node in order:
+            context = node.context
+            parent = node.parent.context.scenario if node.parent else ''
+            print("%5d  %-30s  %-30s  %8.1f  %8.1f" % (context.trialNum, context.scenario, parent,
+                                                       node.duration, node.priority), file=file)
+
+        totalMinutes = sum(node.duration for node in order)
+        print("\n%d trials; %.1f total minutes" % (len(order), totalMinutes), file=file)
+        print("Critical path: %.1f minutes" % self.criticalPath(), file=file)
+        print("Estimated makespan on %d engines: %.1f minutes" % (engines, self.makespan(engines)), file=file)
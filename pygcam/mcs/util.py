@@ -42,12 +42,10 @@ def writeTrialDataFile(simId, df):
     df.to_csv(dataFile, index_label='trialNum')
 
 
-def readTrialDataFile(simId):
+def getTrialDataFile(simId):
     """
-    Load trial data (e.g., saved by writeTrialDataFile) and return a DataFrame
+    Return the pathname of the trial data file for the given simId.
     """
-    import pandas as pd
-
     simDir = getSimDir(simId)
 
     # If SALib version exists, use it; otherwise use legacy file
@@ -55,6 +53,15 @@ def readTrialDataFile(simId):
     if not os.path.lexists(dataFile):
         dataFile = os.path.join(simDir, 'trialData.csv')
 
+    return dataFile
+
+def readTrialDataFile(simId):
+    """
+    Load trial data (e.g., saved by writeTrialDataFile) and return a DataFrame
+    """
+    import pandas as pd
+
+    dataFile = getTrialDataFile(simId)
     df = pd.read_table(dataFile, sep=',', index_col='trialNum')
     return df
     # return df.as_matrix()
@@ -4,8 +4,10 @@ import os
 import time
 import ipyparallel as ipp
 
-from pygcam.config import getConfig, getParam, setParam, getParamAsFloat, getParamAsBoolean
+from pygcam.config import (getConfig, getParam, setParam, getParamAsFloat, getParamAsBoolean,
+                           setSection, setUsingMCS)
 from pygcam.error import GcamError, GcamSolverError
+from pygcam.gcam import setProgressCallback
 from pygcam.log import getLogger, configureLogs
 from pygcam.signals import (catchSignals, TimeoutSignalException, UserInterruptException)
 from pygcam.utils import mkdirs
@@ -15,8 +17,8 @@ from pygcam.mcs.context import Context
 from pygcam.mcs.error import PygcamMcsUserError, GcamToolError
 from pygcam.mcs.Database import (RUN_SUCCEEDED, RUN_FAILED, RUN_KILLED, RUN_ABORTED,
                                  RUN_UNSOLVED, RUN_GCAMERROR, RUN_RUNNING)
-from pygcam.mcs.util import readTrialDataFile, symlink
-from pygcam.mcs.XMLParameterFile import XMLParameter, XMLParameterFile, decache
+from pygcam.mcs.util import getTrialDataFile, readTrialDataFile, symlink
+from pygcam.mcs.XMLParameterFile import XMLParameter, loadParameterFile, decache
 
 _logger = getLogger(__name__)
 
@@ -55,18 +57,39 @@ def _runPygcamSteps(steps, context, runWorkspace=None, raiseError=True):
     _logger.info("_runSteps: " + msg)
     return status
 
-def _readParameterInfo(context, paramPath):
+def _readParameterInfo(context, paramPath, useCache=True):
     from pygcam.xmlSetup import ScenarioSetup
 
     scenarioFile  = getParam('GCAM.ScenarioSetupFile')
     scenarioSetup = ScenarioSetup.parse(scenarioFile)
     scenarioNames = scenarioSetup.scenariosInGroup(context.groupName)
 
-    paramFile = XMLParameterFile(paramPath)
-    paramFile.loadInputFiles(context, scenarioNames, writeConfigFiles=False)
-    paramFile.runQueries()
+    # Reuses the parsed files from this engine's previous trial if none have changed
+    paramFile = loadParameterFile(context, paramPath, scenarioNames, useCache=useCache)
     return paramFile
 
+# The (pathname, mtime, DataFrame) for the trial data last read by this engine
+_trialDataCache = None
+
+def _readTrialData(simId, useCache=True):
+    """
+    Return the trial data DataFrame for `simId`, reading the file only if
+    it has changed since the previous call.
+    """
+    global _trialDataCache
+
+    dataFile = getTrialDataFile(simId)
+    mtime = os.path.getmtime(dataFile)
+
+    if useCache and _trialDataCache:
+        path, cachedTime, df = _trialDataCache
+        if path == dataFile and cachedTime == mtime:
+            return df
+
+    df = readTrialDataFile(simId)
+    _trialDataCache = (dataFile, mtime, df)
+    return df
+
 def _applySingleTrialData(df, context, paramFile):
     simId    = context.simId
     trialNum = context.trialNum
@@ -88,8 +111,11 @@ def _runGcamTool(context, noGCAM=False, noBatchQueries=False,
     '''
     _logger.debug("_runGcamTool: %s", context)
 
-    # For running in an ipyparallel engine, forget instances from last run
-    decache()
+    # For running in an ipyparallel engine, instances from the last run are
+    # reused if the files they were read from are unchanged, else decached.
+    useCache = getParamAsBoolean('MCS.CacheParameterInfo')
+    if not useCache:
+        decache()
 
     # TBD: #### set to True to help debug ipyparallel issues ####
     debuggingOnly = False
@@ -103,9 +129,9 @@ def _runGcamTool(context, noGCAM=False, noBatchQueries=False,
 
     if isBaseline and not noGCAM:
         paramPath = getParam('MCS.ParametersFile')      # TBD: gensim has optional override of param file. Keep it?
-        paramFile = _readParameterInfo(context, paramPath)
+        paramFile = _readParameterInfo(context, paramPath, useCache=useCache)
 
-        df = readTrialDataFile(simId)
+        df = _readTrialData(simId, useCache=useCache)
         columns = df.columns
 
         # add data for linked columns if not present
@@ -194,6 +220,7 @@ class Worker(object):
         self.context  = context
         self.argDict  = argDict
         self.runLocal = argDict.get('runLocal', False)
+        self.logToFile = not self.runLocal or argDict.get('localWorkers', 1) > 1
 
     def runTrial(self):
         """
@@ -210,17 +237,32 @@ class Worker(object):
         logDir = os.path.join(trialDir, 'log')
         mkdirs(logDir)
 
-        if not self.runLocal:
+        # Remote engines and local worker processes log to a file for each trial
+        if self.logToFile:
             logFile = os.path.join(logDir, context.scenario + '.log')
             setParam('GCAM.LogFile', logFile)
             setParam('GCAM.LogConsole', 'False')    # avoids duplicate output to file
             configureLogs(force=True)
 
+        if not self.runLocal:
             self.setStatus(RUN_RUNNING)
+            setProgressCallback(self.publishProgress)
+
+        try:
+            result = self._runTrial()
+        finally:
+            setProgressCallback(None)
 
-        result = self._runTrial()
         return result
 
+    def publishProgress(self, event):
+        """
+        Publish a ProgressEvent from the GCAM wrapper so the master can report it.
+        """
+        from ipyparallel.datapub import publish_data
+
+        publish_data(dict(context=self.context, progress=dict(event._asdict())))
+
     def setStatus(self, status):
         from ipyparallel.datapub import publish_data
 
@@ -309,11 +351,16 @@ def runTrial(context, argDict):
 
     :param context: (Context) information describing the run
     :param argDict: (dict) with bool values for keys 'runLocal',
-        'noGCAM', 'noBatchQueries', and 'noPostProcessor'
+        'noGCAM', 'noBatchQueries', and 'noPostProcessor', and optionally,
+        the int value 'localWorkers'
     :return: (WorkerResult) run identification info and completion status
     '''
     global latestStartTime
 
+    # The XML files were validated when the simulation was generated
+    if not getParamAsBoolean('MCS.WorkerValidateXML'):
+        setParam('GCAM.ValidateXML', 'False')
+
     if not argDict.get('runLocal', False):
         # On the first run, compute the latest time we should start a new trial.
         # On subsequent runs, check that there's adequate time still left.
@@ -13,14 +13,15 @@ import os
 import re
 import shlex
 import sys
+import time
 
 from lxml import etree as ET
 
-from .config import getParam, setParam, getConfigDict, unixPath, pathjoin
+from .config import getParam, getParamAsInt, setParam, getConfigDict, unixPath, pathjoin
 from .constants import LOCAL_XML_NAME, XML_SRC_NAME
-from .error import PygcamException, CommandlineError, FileFormatError
+from .error import PygcamException, CommandlineError, FileFormatError, SetupException
 from .log import getLogger
-from .utils import flatten, shellCommand, getBooleanXML, simpleFormat, QueryResultsDir
+from .utils import flatten, shellCommand, getBooleanXML, simpleFormat, QueryResultsDir, workerProcessPool
 from .temp_file import getTempFile
 from .XMLFile import XMLFile
 from .xmlSetup import ScenarioSetup
@@ -29,6 +30,8 @@ _logger = getLogger(__name__)
 
 DefaultProjectFile = './project.xml'
 
+SETUP_STEP = 'setup'     # name of the steps run in parallel with --setupJobs
+
 def minWhitespace(text):
     text = text.strip().replace('\n', ' ')
     text = re.sub('\s\s+', ' ', text)
@@ -194,33 +197,80 @@ class Step(object):
         return "<Step name='%s' seq='%s' runFor='%s'>%s</Step>" % \
                (self.name, self.seq, self.runFor, self.command)
 
-    def run(self, project, baseline, scenario, argDict, tool, noRun=False):
+    def appliesTo(self, baseline, scenario):
+        """
+        Return True if this step should be run for `scenario`, given its runFor
+        attribute and the name of the `baseline` scenario.
+        """
         runFor = self.runFor
         isBaseline = (baseline == scenario.name)
         isPolicy = not isBaseline
 
-        # See if this step should be run.
         if runFor != 'all' and ((isBaseline and runFor != 'baseline') or (isPolicy and runFor != 'policy')):
-            return
+            return False
 
         # User can substitute an empty command to delete a default step
-        if not self.command:
-            return
+        return bool(self.command)
 
+    def formatCommand(self, scenario, argDict):
         try:
             command = simpleFormat(self.command, argDict)    # replace vars in template
         except KeyError as e:
             raise FileFormatError("%s -- No such variable exists in the project XML file" % e)
 
         _logger.info("[%s, %s, %s] %s", scenario.name, self.seq, self.name, command)
+        return command
+
+    def run(self, project, baseline, scenario, argDict, tool, noRun=False):
+        # See if this step should be run.
+        if not self.appliesTo(baseline, scenario):
+            return
+
+        command = self.formatCommand(scenario, argDict)
 
         if not noRun:
-            if command[0] == '@':       # run internally in gt
-                argList = shlex.split(command[1:])
-                argList = flatten(map(lambda s: glob.glob(s) or [s], argList))  # expand shell wildcards
-                tool.run(argList=argList)
-            else:
-                shellCommand(command, shell=True)   # shell=True to expand shell wildcards and so on
+            runCommand(command, tool)
+
+def runCommand(command, tool):
+    """
+    Run a step's command, which has had variables substituted. Commands starting
+    with '@' are run internally in gt; others are run in a shell.
+    """
+    if command[0] == '@':       # run internally in gt
+        argList = shlex.split(command[1:])
+        argList = flatten(map(lambda s: glob.glob(s) or [s], argList))  # expand shell wildcards
+        tool.run(argList=argList)
+    else:
+        shellCommand(command, shell=True)   # shell=True to expand shell wildcards and so on
+
+def _runSetupCommands(scenarioName, commands):
+    """
+    Run the setup `commands` for one scenario in a worker process, starting with
+    an empty cache of XML files so nothing is shared with other scenarios.
+
+    :return: (tuple of (str, float, list of str)) the scenario name, the number of
+        seconds taken, and the pathnames of the files written.
+    """
+    from .tool import GcamTool
+    from .xmlEditor import CachedFile
+
+    CachedFile.cache.clear()
+    CachedFile.written.clear()
+
+    startTime = time.time()
+    tool = GcamTool.getInstance()
+    try:
+        for command in commands:
+            runCommand(command, tool)
+
+    except PygcamException:
+        raise
+
+    except Exception as e:
+        # Some exceptions (e.g., lxml's) can't be pickled to return them to the parent process
+        raise PygcamException("%s: %s" % (e.__class__.__name__, e))
+
+    return scenarioName, time.time() - startTime, sorted(CachedFile.written)
 
 class SimpleVariable(object):
     """
@@ -574,6 +624,11 @@ class Project(XMLFile):
 
         baselineJobId = None
 
+        # Set up policy scenarios in parallel after the baseline's steps have run
+        setupJobs = args.setupJobs or getParamAsInt('GCAM.SetupJobs')
+        parallelSetup = setupJobs > 1 and not (args.distribute or args.noRun)
+        setupDone = {}      # scenario names mapped to True if setup succeeded, else False
+
         for scenarioName in scenarios:
             scenario = self.scenarioDict[scenarioName]
 
@@ -593,41 +648,171 @@ class Project(XMLFile):
 
                 continue
 
-            # These get reset as each scenario is processed
-            argDict['scenario']       = scenarioName
-            argDict['scenarioSubdir'] = scenario.subdir or scenarioName
-            argDict['sandboxDir']     = sandboxDir
-            argDict['scenarioDir']    = scenarioDir = pathjoin(sandboxDir, scenarioName)
-            argDict['diffsDir']       = pathjoin(scenarioDir, 'diffs')
-            argDict['batchDir']       = pathjoin(scenarioDir, QueryResultsDir)
-            # set in case it wasn't already
-            setParam('GCAM.SandboxDir', sandboxDir, section=projectName)
-
-            # Evaluate dynamic variables and re-generate temporary files, saving paths in
-            # variables indicated in <tmpFile> or <queries> elements. This is in the scenario
-            # loop so run-time variables are handled correctly, though it does result in the
-            # files being written multiple times (though with different values.)
-            Variable.evaluateVars(argDict)
-            _TmpFileBase.writeFiles(argDict)
+            if parallelSetup and not scenario.isBaseline:
+                parallelSetup = False   # set up all remaining policy scenarios at once
+                policies = [self.scenarioDict[name] for name in scenarios[scenarios.index(scenarioName):]]
+                policies = [obj for obj in policies if obj.isActive and not obj.isBaseline]
+                setupDone = self.runParallelSetup(policies, steps, explicitSteps, sandboxDir,
+                                                  setupJobs, quitProgram)
+
+            if setupDone.get(scenarioName) is False:
+                _logger.warning("Skipping scenario '%s' since its setup failed", scenarioName)
+                continue
+
+            self.setScenarioArgs(scenario, sandboxDir)
 
             try:
                 # Loop over all steps and run those that user has requested
-                for step in self.sortedSteps:
-                    group = step.group
-                    if step.name in steps and (not group or                            # no group specified
-                                               group == scenarioGroupName or           # exact match
-                                               re.match(group, scenarioGroupName)):    # pattern match
-                        # Skip optional steps unless explicitly mentioned
-                        if (step.optional and step.name not in explicitSteps):
-                            continue
-
-                        argDict['step'] = step.name
-                        step.run(self, baseline, scenario, argDict, tool, noRun=args.noRun)
+                for step in self.selectedSteps(steps, explicitSteps):
+                    if step.name == SETUP_STEP and scenarioName in setupDone:
+                        continue
+
+                    argDict['step'] = step.name
+                    step.run(self, baseline, scenario, argDict, tool, noRun=args.noRun)
             except PygcamException as e:
                 if quitProgram:
                     raise
                 _logger.error("Error running step '%s': %s", step.name, e)
 
+    def selectedSteps(self, steps, explicitSteps):
+        """
+        Return the steps, in order of execution, that are named in `steps` and
+        apply to the current scenario group. Optional steps are included only
+        if named in `explicitSteps`.
+        """
+        scenarioGroupName = self.scenarioGroupName
+        selected = []
+
+        for step in self.sortedSteps:
+            group = step.group
+            if step.name in steps and (not group or                            # no group specified
+                                       group == scenarioGroupName or           # exact match
+                                       re.match(group, scenarioGroupName)):    # pattern match
+                # Skip optional steps unless explicitly mentioned
+                if (step.optional and step.name not in explicitSteps):
+                    continue
+
+                selected.append(step)
+
+        return selected
+
+    def setScenarioArgs(self, scenario, sandboxDir):
+        """
+        Set the variables that depend on the scenario being processed, evaluate
+        dynamic variables, and re-generate temporary files.
+        """
+        argDict = self.argDict
+        scenarioName = scenario.name
+
+        # These get reset as each scenario is processed
+        argDict['scenario']       = scenarioName
+        argDict['scenarioSubdir'] = scenario.subdir or scenarioName
+        argDict['sandboxDir']     = sandboxDir
+        argDict['scenarioDir']    = scenarioDir = pathjoin(sandboxDir, scenarioName)
+        argDict['diffsDir']       = pathjoin(scenarioDir, 'diffs')
+        argDict['batchDir']       = pathjoin(scenarioDir, QueryResultsDir)
+        # set in case it wasn't already
+        setParam('GCAM.SandboxDir', sandboxDir, section=self.projectName)
+
+        # Evaluate dynamic variables and re-generate temporary files, saving paths in
+        # variables indicated in <tmpFile> or <queries> elements. This is in the scenario
+        # loop so run-time variables are handled correctly, though it does result in the
+        # files being written multiple times (though with different values.)
+        Variable.evaluateVars(argDict)
+        _TmpFileBase.writeFiles(argDict)
+
+    def runParallelSetup(self, scenarios, steps, explicitSteps, sandboxDir, jobs, quitProgram=True):
+        """
+        Run the selected "setup" steps for the given policy `scenarios` in a pool of
+        up to `jobs` processes, each with its own cache of XML files. Raises
+        SetupException if any file was written in the setup of more than one scenario,
+        since the result would depend on which process wrote it last.
+
+        The setups of all these scenarios run before any other step of the first of
+        them, so a scenario's setup must not depend on the results of another policy
+        scenario. A scenario is set up here only if its "setup" steps precede its
+        other selected steps; otherwise it's set up in order with its other steps.
+
+        :param scenarios: (list of Scenario) the scenarios to set up
+        :param steps: (set of str) the names of the steps the user requested
+        :param explicitSteps: (list of str) the names of steps given on the command-line
+        :param sandboxDir: (str) the sandbox directory for the scenario group
+        :param jobs: (int) the maximum number of processes to use
+        :param quitProgram: (bool) if True, raise the first error reported by a
+            scenario's setup, otherwise log it and continue with the others.
+        :return: (dict) the names of the scenarios set up here, mapped to True
+            if setup ran successfully, else False.
+        """
+        from concurrent.futures import wait, FIRST_COMPLETED
+
+        baseline = self.baselineName
+        selected = self.selectedSteps(steps, explicitSteps)
+
+        # Format the commands here, since variables are evaluated per scenario
+        commands = []
+        for scenario in scenarios:
+            applicable = [step for step in selected if step.appliesTo(baseline, scenario)]
+            names = [step.name for step in applicable]
+            count = names.count(SETUP_STEP)
+
+            if count and names[:count] != [SETUP_STEP] * count:
+                other = next(name for name in names if name != SETUP_STEP)
+                _logger.info("Setting up scenario '%s' in sequence, since step '%s' precedes a setup step",
+                             scenario.name, other)
+                continue
+
+            applicable = applicable[:count]
+            if applicable:
+                self.setScenarioArgs(scenario, sandboxDir)
+                self.argDict['step'] = SETUP_STEP
+                commands.append((scenario.name, [step.formatCommand(scenario, self.argDict)
+                                                 for step in applicable]))
+
+        if not commands:
+            return {}
+
+        jobs = max(1, min(jobs, len(commands)))
+        startTime = time.time()
+        results = []
+        done = {}
+
+        with workerProcessPool(jobs) as pool:
+            # Submit only as many scenarios as can run at once, so that none are left
+            # pending after an error. (Cancelling a pending future doesn't stop it if
+            # the pool has already passed it to a worker.)
+            queue = list(commands)
+            running = {}
+
+            while queue or running:
+                while queue and len(running) < jobs:
+                    name, cmds = queue.pop(0)
+                    running[pool.submit(_runSetupCommands, name, cmds)] = name
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        results.append(future.result())
+                        done[name] = True
+                    except Exception as e:
+                        if quitProgram:
+                            raise       # the scenarios still running are allowed to finish
+                        _logger.error("Error running setup for scenario '%s': %s", name, e)
+                        done[name] = False
+
+        writers = {}
+        for name, secs, written in results:
+            _logger.info("%6.2f sec  %s", secs, name)
+            for path in written:
+                writers.setdefault(path, []).append(name)
+
+        conflicts = ["'%s' (%s)" % (path, ', '.join(names)) for path, names in sorted(writers.items()) if len(names) > 1]
+        if conflicts:
+            raise SetupException("Files were written by the setup of more than one scenario: %s" % '; '.join(conflicts))
+
+        _logger.info("Set up %d scenarios in %.2f sec using %d process(es)",
+                     len(results), time.time() - startTime, jobs)
+        return done
 
     def dump(self, steps, scenarios):
         print("Scenario group:", self.scenarioGroupName)
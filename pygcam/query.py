@@ -12,13 +12,13 @@ from lxml import etree as ET
 from semver import VersionInfo
 
 from .Xvfb import Xvfb
-from .config import getParam, getParamAsBoolean, parse_version_info, pathjoin, unixPath
+from .config import getParam, getParamAsBoolean, getParamAsInt, parse_version_info, pathjoin, unixPath
 from .constants import NUM_AEZS
 from .error import PygcamException, ConfigFileError, FileFormatError, CommandlineError
 from .log import getLogger
 from .queryFile import QueryFile, RewriteSetParser, Query
 from .utils import (mkdirs, deleteFile, ensureExtension, ensureCSV, saveToFile, getRegionList,
-                    getExeDir, writeXmldbDriverProperties, digitColumns)
+                    getExeDir, writeXmldbDriverProperties, digitColumns, workerProcessPool)
 from .temp_file import TempFile, getTempFile
 
 _logger = getLogger(__name__)
@@ -62,20 +62,10 @@ def interp(df):
     return df
 
 
-def interpolateYears(df, startYear=0, inplace=False):
+def _interpolateYearsByColumn(df, startYear=0):
     """
-    Interpolate linearly between each pair of years in the GCAM output. The
-    time-step is calculated from the numerical (string) column headings given
-    in the `DataFrame`_ `df`, which are assumed to represent years in the time-series.
-    The years to interpolate between are read from `df`, so there's no dependency
-    on any particular time-step, or even on the time-step being constant.
-
-    :param df: (DataFrame) Data of the format returned by batch queries
-        on the GCAM XML database
-    :param startYear: (int) If non-zero, begin interpolation at this year.
-    :param inplace: (bool) If True, modify `df` in place; otherwise modify a copy.
-    :return: if `inplace` is True, `df` is returned; otherwise a copy
-      of `df` with interpolated values is returned.
+    The original implementation of interpolateYears(), which adds one column
+    to `df` per interpolated year. Retained for testing and benchmarking.
     """
     yearCols = digitColumns(df)
     years = [int(y) for y in yearCols]
@@ -105,10 +95,70 @@ def interpolateYears(df, startYear=0, inplace=False):
     yearCols = [str(y) for y in years]       # convert back to strings, now sorted
 
     nonYearCols = list(set(df.columns) - set(yearCols))
-    result = df.reindex(nonYearCols + yearCols, axis=1, copy=(not inplace))
+    result = df.reindex(nonYearCols + yearCols, axis=1)
     return result
 
-def readCsv(filename, skiprows=1, years=None, interpolate=False, startYear=0, cache=False):
+def interpolateYears(df, startYear=0, inplace=False):
+    """
+    Interpolate linearly between each pair of years in the GCAM output. The
+    time-step is calculated from the numerical (string) column headings given
+    in the `DataFrame`_ `df`, which are assumed to represent years in the time-series.
+    The years to interpolate between are read from `df`, so there's no dependency
+    on any particular time-step, or even on the time-step being constant.
+
+    :param df: (DataFrame) Data of the format returned by batch queries
+        on the GCAM XML database
+    :param startYear: (int) If non-zero, begin interpolation at this year. Values
+        for years prior to `startYear` are those of the preceding GCAM year.
+    :param inplace: (bool) If True, the interpolated columns are also added to `df`.
+    :return: a DataFrame with the non-year columns of `df` followed by annual
+      columns, in year order, holding the interpolated values.
+    """
+    import numpy as np
+    import pandas as pd
+
+    years = sorted(digitColumns(df, asInt=True))
+    if not years:
+        return df if inplace else df.copy()
+
+    allYears = np.arange(years[0], years[-1] + 1)
+    offsets = np.array(years) - years[0]     # column position of each GCAM year
+
+    values = df[[str(y) for y in years]].to_numpy(dtype=float)
+    matrix = np.empty((len(df), len(allYears)))
+    matrix[:, offsets] = values
+
+    # Fill each interval with a running sum of the annual delta, which produces
+    # exactly the values computed by adding one year at a time.
+    for i in range(len(years) - 1):
+        start, end = offsets[i], offsets[i+1]
+        timestep = end - start
+        if timestep == 1:
+            continue
+
+        delta = (values[:, i+1] - values[:, i]) / timestep
+        steps = np.empty((len(df), timestep))
+        steps[:, 0] = values[:, i]
+        steps[:, 1:] = delta[:, np.newaxis]
+
+        # don't interpolate before the start year
+        steps[:, 1:][:, allYears[start+1:end] < startYear] = 0
+        matrix[:, start+1:end] = np.cumsum(steps, axis=1)[:, 1:]
+
+    yearCols = [str(y) for y in allYears]
+    nonYearCols = [col for col in df.columns if not col.isdigit()]
+
+    newCols = [col for col in yearCols if col not in df.columns]
+    if inplace and newCols:
+        positions = [int(col) - years[0] for col in newCols]
+        df[newCols] = matrix[:, positions]
+
+    annual = pd.DataFrame(matrix, index=df.index, columns=yearCols)
+    result = pd.concat([df[nonYearCols], annual], axis=1)
+    return result
+
+def readCsv(filename, skiprows=1, years=None, interpolate=False, startYear=0, cache=False,
+            mutable=True):
     """
     Read a CSV file of the form generated by GCAM batch queries, i.e., skip one
     row and then read column headings and data. Optionally drop all years outside
@@ -124,11 +174,14 @@ def readCsv(filename, skiprows=1, years=None, interpolate=False, startYear=0, ca
     :param cache: (bool) If True, file will be sought in, and saved to, a CSV cache.
        The "raw" file data is cached, so if called with different processing args,
        the same initial DataFrame is used, but it will be processed correctly.
+    :param mutable: (bool) If False, the caller promises not to modify the DataFrame
+       returned, which avoids copying data held in the cache.
     :return: (DataFrame) the data read in, processed as per arguments
     """
     from .csvCache import readCachedCsv
 
-    df = readCachedCsv(filename, skiprows=skiprows, cache=cache)
+    # limitYears() modifies the DataFrame in place
+    df = readCachedCsv(filename, skiprows=skiprows, cache=cache, mutable=(mutable or bool(years)))
 
     if years:
         limitYears(df, years)
@@ -162,7 +215,8 @@ def writeCsv(df, filename, header='', float_format="%.4f", index=None):
         f.write(txt)
 
 # TBD: This belongs with gcamtool. Currently used only by constraints.py
-def  readQueryResult(batchDir, baseline, queryName, years=None, interpolate=False, startYear=0, cache=False):
+def  readQueryResult(batchDir, baseline, queryName, years=None, interpolate=False, startYear=0, cache=False,
+                     mutable=True):
     """
     Compose the name of the 'standard' result file, read it into a DataFrame and
     return the DataFrame. Data is read from the computed filename
@@ -176,10 +230,13 @@ def  readQueryResult(batchDir, baseline, queryName, years=None, interpolate=Fals
     :param interpolate: (bool) If True, interpolate annual values between time-steps
     :param startYear: (int) If interpolating, the year to begin interpolation
     :param cache: (bool) If True, files will be sought in and saved to a CSV cache
+    :param mutable: (bool) If False, the caller promises not to modify the DataFrame
+       returned, which avoids copying data held in the cache.
     :return: (DataFrame) the data in the computed filename.
     """
     pathname = pathjoin(batchDir, '%s-%s.csv' % (queryName, baseline))
-    df= readCsv(pathname, years=years, interpolate=interpolate, startYear=startYear, cache=cache)
+    df= readCsv(pathname, years=years, interpolate=interpolate, startYear=startYear, cache=cache,
+                mutable=mutable)
     return df
 
 def readRegionMap(filename):
@@ -311,6 +368,78 @@ def _addRewriteSet(rewriteSetList, rewriteParser, rewriteList, title):
 
     rewriteList.set('append-values', 'true' if appendValues else 'false')
 
+def _titleVariants(title):
+    """
+    Return the title and variations thereof, in the order they should be tried.
+    """
+    patterns = (None, '_', '-', '[-_]')
+    return [re.sub(pattern, ' ', title) if pattern else title for pattern in patterns]
+
+class QueryLibrary(object):
+    """
+    An index of the queries in an XML query file (e.g., Main_Queries.xml or a
+    batch query file), keyed by query title. Each file is parsed once per process,
+    and again only if its modification time or size changes, rather than once per
+    query extracted from it.
+    """
+    instances = {}      # keyed by absolute pathname
+
+    # Supports both Main_Queries-type files and batch query files
+    xpath = '/queries//queryGroup/*[@title]|/queries/aQuery/*[@title]'
+
+    @classmethod
+    def getInstance(cls, filename):
+        path = os.path.abspath(filename)
+        st = os.stat(path)
+        stamp = (st.st_mtime, st.st_size)
+
+        obj = cls.instances.get(path)
+        if obj is None or obj.stamp != stamp:
+            obj = cls.instances[path] = cls(path, stamp)
+
+        return obj
+
+    @classmethod
+    def decache(cls):
+        cls.instances.clear()
+
+    def __init__(self, filename, stamp=None):
+        self.filename = filename
+        self.stamp = stamp
+
+        _logger.debug("Indexing queries in '%s'", filename)
+        parser = ET.XMLParser(remove_blank_text=True)
+        tree = ET.parse(filename, parser=parser)
+
+        self.queries = {}
+        for elt in tree.xpath(self.xpath):  # in document order, so the first of duplicate titles wins
+            self.queries.setdefault(elt.get('title'), elt)
+
+    def __contains__(self, title):
+        return self.find(title, copy=False) is not None
+
+    def titles(self):
+        return list(self.queries.keys())
+
+    def find(self, title, copy=True):
+        """
+        Find the query with the given title, or with "_", "-", or both
+        replaced by spaces.
+
+        :param title: (str) the title of the query
+        :param copy: (bool) if True, return a copy of the query element
+            that the caller may modify.
+        :return: (lxml.etree.Element) the query element, or None if not found
+        """
+        from copy import deepcopy
+
+        for altTitle in _titleVariants(title):
+            elt = self.queries.get(altTitle)
+            if elt is not None:
+                return deepcopy(elt) if copy else elt
+
+        return None
+
 def _findQueryByName(tree, title):
     """
     Try the title and variations thereof to locate the query by name
@@ -318,10 +447,7 @@ def _findQueryByName(tree, title):
     # This Xpath supports both Main_Queries-type files and batch query files
     xpathPattern = '/queries//queryGroup/*[@title="{title}"]|/queries/aQuery/*[@title="{title}"]'
 
-    patterns = (None, '_', '-', '[-_]')
-
-    for pattern in patterns:
-        altTitle = re.sub(pattern, ' ', title) if pattern else title
+    for altTitle in _titleVariants(title):
         xpath = xpathPattern.format(title=altTitle)
         elts = tree.xpath(xpath)  # returns empty list or list of elements found
         if len(elts) != 0:
@@ -342,8 +468,6 @@ def _findOrCreateQueryFile(title, queryPath, regions, outputDir=None, tmpFiles=T
     sep = os.path.pathsep           # ';' on Windows, ':' on Unix
     items = queryPath.split(sep)
 
-    parser = ET.XMLParser(remove_blank_text=True)
-
     for item in items:
         if os.path.isdir(item):
             pathname = pathjoin(item, title + '.xml')
@@ -353,10 +477,9 @@ def _findOrCreateQueryFile(title, queryPath, regions, outputDir=None, tmpFiles=T
                 continue
 
         # Find the query within an XML query file
-        tree = ET.parse(item, parser=parser)
-        elts = _findQueryByName(tree, title)
+        queryElt = QueryLibrary.getInstance(item).find(title)
 
-        if elts is None or len(elts) == 0:
+        if queryElt is None:
             continue # to next item in QueryPath
 
         _logger.debug("Found query '{}' in {}".format(title, item))
@@ -367,7 +490,6 @@ def _findOrCreateQueryFile(title, queryPath, regions, outputDir=None, tmpFiles=T
         for region in regions:
             aQuery.append(ET.Element('region', name=region))
 
-        queryElt = elts[0]
         aQuery.append(queryElt)
 
         if regionMap or rewriteSetList:
@@ -465,6 +587,29 @@ def _copyToLogFile(logFile, filename, msg=''):
                 m.write(line)
 
 
+def _queryCsvFile(queryName, scenario, saveAs=None):
+    """
+    Return the default name of the CSV file holding results for the given query and scenario.
+    """
+    mainPart, extension = os.path.splitext(os.path.basename(queryName))   # strip extension, if any
+    csvFile = "%s-%s.csv" % (saveAs or mainPart, scenario)
+    return csvFile.replace(' ', '_')    # eliminate spaces for convenience
+
+def _queryFailed(csvPath):
+    """
+    The java program always exits with 0 status, but when the query fails,
+    it writes an error message to the CSV file. Return True if this occurred
+    or the file wasn't written.
+    """
+    try:
+        with open(csvPath, 'r') as f:
+            line = f.readline()
+
+        return bool(re.search('java.*Exception', line, flags=re.IGNORECASE))
+
+    except Exception:
+        return True
+
 def _createBatchCommandElement(scenario, queryName, queryPath, outputDir=None, tmpFiles=True,
                                xmldb='', csvFile=None, regions=None, regionMap=None,
                                rewriters=None, rewriteParser=None, noDelete=False, saveAs=None):
@@ -496,7 +641,6 @@ def _createBatchCommandElement(scenario, queryName, queryPath, outputDir=None, t
     :return: (str) the generated batch command string
     """
     basename = os.path.basename(queryName)
-    mainPart, extension = os.path.splitext(basename)   # strip extension, if any
 
     # set default here so sphinx doc doesn't list all regions
     regions = regions or getRegionList()
@@ -513,8 +657,7 @@ def _createBatchCommandElement(scenario, queryName, queryPath, outputDir=None, t
                               (basename, queryPath))
 
     if not csvFile:
-        csvFile = "%s-%s.csv" % (saveAs or mainPart, scenario)    # compute default filename
-        csvFile = csvFile.replace(' ', '_')                       # eliminate spaces for convenience
+        csvFile = _queryCsvFile(basename, scenario, saveAs=saveAs)
 
     outputDir = outputDir or getParam('GCAM.OutputDir')
     mkdirs(outputDir)
@@ -654,6 +797,102 @@ def runMultiQueryBatch(scenario, queries, xmldb='', queryPath=None, outputDir=No
                       miLogFile=miLogFile, noDelete=noDelete, noRun=noRun)
 
 
+def _shardLogFile(miLogFile, shard):
+    if not miLogFile:
+        return miLogFile
+
+    base, ext = os.path.splitext(miLogFile)
+    return '%s-%d%s' % (base, shard, ext)
+
+def runParallelQueryBatches(scenario, queries, jobs, xmldb='', queryPath=None, outputDir=None,
+                            miLogFile=None, regions=None, regionMap=None, rewriteParser=None,
+                            batchFileIn=None, batchFileOut=None, noRun=False, noDelete=False):
+    """
+    Divide the queries among up to `jobs` batch files and run ModelInterface on
+    these concurrently in a pool of processes. Queries are assigned to batch files
+    round-robin, so the assignment is deterministic, and results are written to
+    the same files as by runMultiQueryBatch. ModelInterface output for batch file
+    N is written to `miLogFile` with "-N" appended to the basename.
+
+    :param scenario: (str) the name of the scenario to perform the query on
+    :param queries: (list of str query names and/or Query instances)
+    :param jobs: (int) the maximum number of batch files to run at once
+    :param xmldb: (str) path to XMLDB
+    :param queryPath: (str) a list of directories or XML filenames, separated
+        by a colon (on Unix) or a semi-colon (on Windows)
+    :param outputDir: (str) the directory in which to write the .CSV
+        with query results, default is value of GCAM.OutputDir.
+    :param miLogFile: (str) optional name of a log file to write ModelInterface output to.
+    :param regions: (iterable of str) the regions you want to include in the query
+    :param regionMap: (dict-like) keys are the names of regions that should be rewritten.
+        The value is the name of the aggregate region to map into.
+    :param rewriteParser: (RewriteSetParser instance) parsed representation of
+        rewriteSets.xml
+    :param batchFileIn: (str) the name of a pre-formed batch file to run
+    :param batchFileOut: (str) where to write output from batchFileIn, if given
+    :param noRun: (bool) if True, print the commands that would be executed, but
+        don't run them.
+    :param noDelete: (bool) if True, temporary files created by this function are
+        not deleted (use for debugging)
+    :return: (list of str) the names of the queries that failed
+    """
+    outputDir = outputDir or getParam('GCAM.OutputDir')
+    mkdirs(outputDir)
+
+    csvPaths = []
+    selected = []
+    for obj in queries:
+        queryName, saveAs = (obj.name, obj.saveAs) if isinstance(obj, Query) else (obj, None)
+        queryName = queryName.strip()
+        if not queryName or queryName[0] == '#':    # ignore blank lines and comments
+            continue
+
+        selected.append(obj)
+        csvPath = pathjoin(outputDir, _queryCsvFile(queryName, scenario, saveAs=saveAs), abspath=True)
+        csvPaths.append((queryName, csvPath))
+        deleteFile(csvPath)     # so results of earlier runs aren't mistaken for success
+
+    jobs = max(1, min(jobs, len(selected)))
+    shards = [selected[i::jobs] for i in range(jobs)]
+
+    batchFiles = []
+    for i, shard in enumerate(shards):
+        # the pre-formed batch file, if any, is run with the first shard
+        batchFile = createBatchFile(scenario, shard, xmldb=xmldb, queryPath=queryPath,
+                                    outputDir=outputDir, regions=regions, regionMap=regionMap,
+                                    rewriteParser=rewriteParser, noDelete=noDelete,
+                                    batchFileIn=batchFileIn if i == 0 else None,
+                                    batchFileOut=batchFileOut if i == 0 else None)
+        batchFiles.append(batchFile)
+
+        if miLogFile:
+            deleteFile(_shardLogFile(miLogFile, i))     # start fresh, as for miLogFile
+
+    _logger.info("Running %d queries in %d batch files", len(selected), len(batchFiles))
+
+    with workerProcessPool(jobs) as pool:
+        futures = [pool.submit(runModelInterface, scenario, outputDir, xmldb=xmldb, batchFile=batchFile,
+                               miLogFile=_shardLogFile(miLogFile, i), noDelete=noDelete, noRun=noRun)
+                   for i, batchFile in enumerate(batchFiles)]
+
+        for i, future in enumerate(futures):
+            try:
+                future.result()
+            except Exception as e:
+                _logger.error("Batch file '%s' failed: %s", batchFiles[i], e)
+
+    if noRun:
+        return []
+
+    failed = []
+    for queryName, csvPath in csvPaths:
+        if _queryFailed(csvPath):
+            _logger.error("Query '%s' failed for scenario '%s'", queryName, scenario)
+            deleteFile(csvPath)
+            failed.append(queryName)
+
+    return failed
+
 # TBD: Test queryText and asDataFrame.
 def runModelInterface(scenario, outputDir, csvFile=None, batchFile=None,
                       queryFile=None, queryText=None,  xmldb='',
@@ -754,24 +993,11 @@ def runModelInterface(scenario, outputDir, csvFile=None, batchFile=None,
         else:
             subprocess.call(command, shell=True)
 
-        # The java program always exits with 0 status, but when the query fails,
-        # it writes an error message to the CSV file. If this occurs, we delete
-        # the file.
-        if csvPath:
-            try:
-                with open(csvPath, 'r') as f:
-                    line = f.readline()
-
-                if re.search('java.*Exception', line, flags=re.IGNORECASE):
-                    failed = True
-
-            except Exception:
-                failed = True
-
-            finally:
-                if failed:
-                    _logger.error("Batch file '%s' failed. Deleting '%s'", queryFile, csvPath)
-                    deleteFile(csvPath)
+        # If the query failed, we delete the file.
+        if csvPath and _queryFailed(csvPath):
+            failed = True
+            _logger.error("Batch file '%s' failed. Deleting '%s'", queryFile, csvPath)
+            deleteFile(csvPath)
     except:
         raise
 
@@ -819,7 +1045,6 @@ def runBatchQuery(scenario, queryName, queryPath, outputDir, xmldb='',
     :return: (str) the absolute path to the generated .CSV file, or None
     """
     basename = os.path.basename(queryName)
-    mainPart, extension = os.path.splitext(basename)   # strip extension, if any
 
     regions = regions or getRegionList() # set default here so it doesn't mess up doc for this method
 
@@ -833,8 +1058,7 @@ def runBatchQuery(scenario, queryName, queryPath, outputDir, xmldb='',
         raise PygcamException("runBatchQuery: file for query '%s' was not found." % basename)
 
     if not csvFile:
-        csvFile = "%s-%s.csv" % (saveAs or mainPart, scenario)    # compute default filename
-        csvFile = csvFile.replace(' ', '_')                       # eliminate spaces for convenience
+        csvFile = _queryCsvFile(basename, scenario, saveAs=saveAs)
 
     csvPath = runModelInterface(scenario, filename, outputDir, csvFile, xmldb=xmldb,
                                 miLogFile=miLogFile, noDelete=noDelete, noRun=noRun)
@@ -1035,6 +1259,7 @@ def queryMain(args):
     rewriteSetsFile = args.rewriteSetsFile or getParam('GCAM.RewriteSetsFile')
     batchFileIn  = args.batchFile
     batchFileOut = pathjoin(outputDir, args.batchOutput, abspath=True)
+    jobs         = args.jobs or getParamAsInt('GCAM.QueryJobs')
 
     # Post-GCAM queries are not possible when using in-memory database.
     # The 'prequery' step writes the XMLDBDriver.properties file used
@@ -1095,7 +1320,13 @@ def queryMain(args):
     # If not a prequery step, we're running queries post-GCAM, which means a database on disk
     # For now, we support running multiple queries in a single batch file, or the old way,
     # running each one individually. The latter is probably not needed, except for debugging.
-    if batchMultiple:
+    # Either is superseded by running multiple batch files in parallel.
+    if jobs > 1:
+        runParallelQueryBatches(scenario, queries, jobs, xmldb=xmldb, queryPath=queryPath,
+                                outputDir=outputDir, miLogFile=miLogFile, regions=regions,
+                                regionMap=regionMap, batchFileIn=batchFileIn, batchFileOut=batchFileOut,
+                                rewriteParser=rewriteParser, noRun=args.noRun, noDelete=noDelete)
+    elif batchMultiple:
         runMultiQueryBatch(scenario, queries, xmldb=xmldb, queryPath=queryPath, outputDir=outputDir,
                            miLogFile=miLogFile, regions=regions, regionMap=regionMap,
                            batchFileIn=batchFileIn, batchFileOut=batchFileOut,
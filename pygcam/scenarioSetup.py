@@ -5,6 +5,7 @@
    See the https://opensource.org/licenses/MIT for license details.
 '''
 import os
+import shutil
 
 from .config import getParam, getParamAsBoolean, pathjoin, parse_version_info
 from .constants import LOCAL_XML_NAME, DYN_XML_NAME
@@ -73,6 +74,203 @@ def _workspaceLinkOrCopy(src, srcWorkspace, dstWorkspace, copyFiles=False):
             symlinkOrCopyFile(srcPath, dstPath)
 
 
+SANDBOX_TEMPLATE_NAME = '.sandbox-template'
+TEMPLATE_STAMP_NAME = '.template-stamp'
+
+# Linux ioctl to clone a file's extents (see "man ioctl_ficlone")
+_FICLONE = 0x40049409
+
+def _reflinkFile(src, dst):
+    import fcntl
+
+    try:
+        with open(src, 'rb') as srcFile, open(dst, 'wb') as dstFile:
+            fcntl.ioctl(dstFile.fileno(), _FICLONE, srcFile.fileno())
+    except Exception:
+        if os.path.lexists(dst):
+            os.remove(dst)
+        raise OSError("reflink not supported for %s" % dst)
+
+    shutil.copystat(src, dst)
+
+def _pathStamp(path):
+    """
+    Return a list of (relpath, mtime, size) for `path` or all files under it.
+    """
+    if not os.path.isdir(path):
+        st = os.stat(path)
+        return [('', st.st_mtime, st.st_size)]
+
+    stamps = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in sorted(filenames):
+            filename = os.path.join(dirpath, name)
+            st = os.stat(filename)
+            stamps.append((os.path.relpath(filename, path), st.st_mtime, st.st_size))
+
+    return stamps
+
+
+class SandboxTemplate(object):
+    """
+    A directory holding the parts of a sandbox that would otherwise be created
+    anew for each sandbox: copies of the files listed in GCAM.RequiredFiles but
+    not in GCAM.SandboxFilesToLink, and symlinks to the files that are linked.
+    New sandboxes are created by cloning the template in a single pass over a
+    list of its contents, using reflinks (copy-on-write clones) or copies for
+    the copied files. These are never hard-linked since they're copied so each
+    sandbox can modify its own. The template is rebuilt if the source files or
+    file lists change.
+    """
+    instances = {}      # keyed by (srcWorkspace, filesToCopy, filesToLink)
+
+    @classmethod
+    def getInstance(cls, srcWorkspace, filesToCopy, filesToLink):
+        key = (srcWorkspace, tuple(sorted(filesToCopy)), tuple(sorted(filesToLink)))
+        obj = cls.instances.get(key)
+        if obj is None:
+            obj = cls.instances[key] = cls(srcWorkspace, filesToCopy, filesToLink)
+
+        return obj
+
+    def __init__(self, srcWorkspace, filesToCopy, filesToLink):
+        self.srcWorkspace = os.path.abspath(srcWorkspace)
+        self.filesToCopy = sorted(filesToCopy)
+        self.filesToLink = sorted(filesToLink)
+        self.path = pathjoin(self.srcWorkspace, SANDBOX_TEMPLATE_NAME)
+        self.method = getParam('GCAM.SandboxCloneMethod').lower()
+        self.contents = None    # list of (relPath, kind, linkTarget) tuples
+
+        if self.method not in ('auto', 'reflink', 'copy'):
+            raise SetupException("Unknown GCAM.SandboxCloneMethod '%s'" % self.method)
+
+    def _srcPath(self, filename):
+        return filename if os.path.isabs(filename) else pathjoin(self.srcWorkspace, filename)
+
+    def computeStamp(self):
+        """
+        Return a string identifying the template's inputs: the file lists
+        and the modification times and sizes of the files to copy.
+        """
+        import json
+
+        copied = [(filename, _pathStamp(self._srcPath(filename))) for filename in self.filesToCopy]
+        return json.dumps([self.srcWorkspace, self.filesToLink, copied])
+
+    def isCurrent(self, stamp):
+        stampFile = pathjoin(self.path, TEMPLATE_STAMP_NAME)
+        try:
+            with open(stampFile) as f:
+                return f.read() == stamp
+        except IOError:
+            return False
+
+    def build(self, stamp):
+        """
+        Build the template in a temporary directory and move it into place, so
+        that concurrent processes never see a partially built template.
+        """
+        _logger.info("Building sandbox template '%s'", self.path)
+        tmpPath = '%s.tmp-%d' % (self.path, os.getpid())
+        shutil.rmtree(tmpPath, ignore_errors=True)
+        mkdirs(tmpPath)
+
+        for filename in self.filesToCopy:
+            _workspaceLinkOrCopy(filename, self.srcWorkspace, tmpPath, copyFiles=True)
+
+        for filename in self.filesToLink:
+            _workspaceLinkOrCopy(filename, self.srcWorkspace, tmpPath, copyFiles=False)
+
+        with open(pathjoin(tmpPath, TEMPLATE_STAMP_NAME), 'w') as f:
+            f.write(stamp)
+
+        oldPath = '%s.old-%d' % (self.path, os.getpid())
+        if os.path.lexists(self.path):
+            os.rename(self.path, oldPath)
+
+        try:
+            os.rename(tmpPath, self.path)
+        except OSError:
+            # another process installed a template first
+            shutil.rmtree(tmpPath, ignore_errors=True)
+
+        shutil.rmtree(oldPath, ignore_errors=True)
+
+    def ensureCurrent(self):
+        """
+        Build the template if it doesn't exist or is out of date, and read its contents.
+        """
+        if self.contents is not None:
+            return
+
+        stamp = self.computeStamp()
+        if not self.isCurrent(stamp):
+            self.build(stamp)
+
+        contents = []
+        for dirpath, dirnames, filenames in os.walk(self.path):
+            for name in sorted(dirnames + filenames):
+                path = os.path.join(dirpath, name)
+                relPath = os.path.relpath(path, self.path)
+
+                if relPath == TEMPLATE_STAMP_NAME:
+                    continue
+
+                if os.path.islink(path):
+                    contents.append((relPath, 'link', os.readlink(path)))
+                elif os.path.isdir(path):
+                    contents.append((relPath, 'dir', None))
+                else:
+                    contents.append((relPath, 'file', None))
+
+        self.contents = contents
+
+    def cloneFile(self, src, dst):
+        """
+        Create `dst` as an independent copy of template file `src`.
+        """
+        if self.method in ('auto', 'reflink'):
+            try:
+                _reflinkFile(src, dst)
+                return
+            except OSError:
+                if self.method == 'reflink':
+                    raise SetupException("Failed to reflink %s; the filesystem may not support it" % src)
+                self.method = 'copy'    # don't try reflink again
+
+        shutil.copy2(src, dst)
+
+    def clone(self, sandbox):
+        """
+        Create or update the copied and linked files in `sandbox` from the template.
+        Existing copied files and correct symlinks are left as they are.
+        """
+        self.ensureCurrent()
+
+        for relPath, kind, target in self.contents:
+            dst = pathjoin(sandbox, relPath)
+
+            if os.path.lexists(dst):
+                isLink = os.path.islink(dst)
+                if kind == 'link' and isLink and os.readlink(dst) == target:
+                    continue
+
+                if kind == 'dir' and not isLink and os.path.isdir(dst):
+                    continue
+
+                if kind == 'file' and not isLink:
+                    continue    # as with _workspaceLinkOrCopy, copied files aren't replaced
+
+                removeFileOrTree(dst)
+
+            if kind == 'dir':
+                mkdirs(dst)
+            elif kind == 'link':
+                os.symlink(target, dst)
+            else:
+                self.cloneFile(pathjoin(self.path, relPath), dst)
+
+
 def createSandbox(sandbox, srcWorkspace=None, forceCreate=False, mcsMode=None):
     '''
     Set up a run-time sandbox in which to run GCAM. This involves copying
@@ -123,11 +321,19 @@ def createSandbox(sandbox, srcWorkspace=None, forceCreate=False, mcsMode=None):
 
     filesToCopy, filesToLink = _getFilesToCopyAndLink('GCAM.SandboxFilesToLink')
 
-    for filename in filesToCopy:
-        _workspaceLinkOrCopy(filename, srcWorkspace, sandbox, copyFiles=True)
+    # "gensim" creates a single sandbox from the reference workspace, which we don't modify
+    useTemplate = (getParamAsBoolean('GCAM.SandboxTemplate') and mcsMode != 'gensim' and
+                   not getParamAsBoolean('GCAM.CopyAllFiles'))
 
-    for filename in filesToLink:
-        _workspaceLinkOrCopy(filename, srcWorkspace, sandbox, copyFiles=False)
+    if useTemplate:
+        template = SandboxTemplate.getInstance(srcWorkspace, filesToCopy, filesToLink)
+        template.clone(sandbox)
+    else:
+        for filename in filesToCopy:
+            _workspaceLinkOrCopy(filename, srcWorkspace, sandbox, copyFiles=True)
+
+        for filename in filesToLink:
+            _workspaceLinkOrCopy(filename, srcWorkspace, sandbox, copyFiles=False)
 
     outputDir = pathjoin(sandbox, 'output')
 
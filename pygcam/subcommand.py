@@ -63,6 +63,7 @@ class SubcommandABC(object):
                  guiSuppress=False):
         self.name = name
         self.label = label or name.capitalize()  # label to display in GUI
+        self.help = kwargs.get('help')           # shown in the main help message
         self.parser = parser = subparsers.add_parser(self.name, **kwargs)
         self.Instances[self.name] = self
 
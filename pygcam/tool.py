@@ -6,6 +6,7 @@
 '''
 from __future__ import print_function
 import argparse
+from collections import OrderedDict
 from glob import glob
 import os
 import pipes
@@ -34,8 +35,9 @@ class GcamTool(object):
     # plugin instances by command name
     _plugins = {}
 
-    # cached plugin paths by command name
-    _pluginPaths = {}
+    # manifest entries (see _manifestEntry) by command name, for all plugins
+    # whether loaded or not
+    _manifest = OrderedDict()
 
     @classmethod
     def getPlugin(cls, name):
@@ -46,30 +48,113 @@ class GcamTool(object):
 
     @classmethod
     def _loadCachedPlugin(cls, name):
-        # see if it's already loaded
-        path = cls._pluginPaths[name]
-        tool = cls.getInstance()
-        tool.loadPlugin(path)
+        entry = cls._manifest.get(name)
+        if not entry:
+            return
+
+        cls.getInstance()._loadEntry(entry)
+
+    def _loadEntry(self, entry):
+        if entry['path']:
+            self.loadPlugin(entry['path'])
+        else:
+            from importlib import import_module
+
+            mod = import_module(entry['module'])
+            self.instantiatePlugin(getattr(mod, entry['className']))
 
     @classmethod
     def _cachePlugins(cls):
         '''
-        Find all plugins via GCAM.PluginPath and create a dict
-        of plugin pathnames keyed by command name so the plugin
-        can be loaded on-demand.
+        Find all plugins via GCAM.PluginPath and add them to the manifest
+        so the plugin can be loaded on-demand.
         :return: none
         '''
-        pluginDirs = cls._getPluginDirs()
+        for d in cls._getPluginDirs():
+            if os.path.isdir(d):
+                cls._addToManifest(d, lambda d=d: cls._externalPlugins(d))
+
+    @staticmethod
+    def _externalPlugins(pluginDir):
+        """
+        Return a list of (pathname, None, None) for the plugin files in `pluginDir`.
+        """
+        pattern = pathjoin(pluginDir, '*_plugin.py')
+        return [(path, None, None) for path in sorted(glob(pattern))]
+
+    @staticmethod
+    def _builtinPlugins(pkgDir, package, items):
+        """
+        Return a list of (pathname, module, className) for built-in plugins
+        `items`, a list of (module, className) in `package`.
+        """
+        return [(pathjoin(pkgDir, modName + '.py'), package + '.' + modName, className)
+                for modName, className in items]
+
+    @staticmethod
+    def _manifestEntry(path, module, className):
+        """
+        Import a plugin and create a temporary instance to find its name,
+        help text and group.
+        """
+        from importlib import import_module
+        from .subcommand import SubcommandABC
+
+        if module:
+            pluginClass = getattr(import_module(module), className)
+        else:
+            from .utils import loadModuleFromPath
+
+            mod = loadModuleFromPath(path)
+            pluginClass = mod.__dict__.get('PluginClass') or mod.__dict__.get('Plugin')
+            if not pluginClass:
+                raise PygcamException('Neither PluginClass nor class Plugin are defined in %s' % path)
+
+        # don't leave the temporary instance behind
+        instances = dict(SubcommandABC.Instances)
+        subparsers = argparse.ArgumentParser().add_subparsers()
+        plugin = pluginClass(subparsers)
+        SubcommandABC.Instances.clear()
+        SubcommandABC.Instances.update(instances)
+
+        return {'name'      : plugin.name,
+                'help'      : plugin.help,
+                'group'     : plugin.getGroup(),
+                'path'      : None if module else path,
+                'module'    : module,
+                'className' : className}
+
+    @classmethod
+    def _addToManifest(cls, pluginDir, plugins):
+        """
+        Add the plugins in `pluginDir` to the manifest, using the entries
+        saved in the file named by GCAM.PluginCacheFile if the directory and
+        plugin files are unchanged. Otherwise the plugins are imported to
+        create the entries, which are then saved in the cache file.
+
+        :param pluginDir: (str) the directory holding the plugin files
+        :param plugins: (callable) returns a list of (pathname, module, className)
+            for each plugin. For plugins loaded from a file, module and className
+            are None.
+        :return: none
+        """
+        from .utils import _readJsonCache, _writeJsonCache
+
+        pluginDir = os.path.abspath(pluginDir)
+        cacheFile = getParam('GCAM.PluginCacheFile')
+        entries = _readJsonCache(cacheFile, pluginDir) if cacheFile else None
+
+        if entries is None:
+            items = plugins()
+            entries = [cls._manifestEntry(*item) for item in items]
 
-        suffix = '_plugin.py'
-        suffixLen = len(suffix)
+            if cacheFile:
+                # include the directory so that added or deleted plugins are noticed
+                paths = [pluginDir] + [path for path, _, _ in items]
+                _writeJsonCache(cacheFile, pluginDir, paths, entries)
 
-        for d in pluginDirs:
-            pattern = pathjoin(d, '*' + suffix)
-            for path in glob(pattern):
-                basename = os.path.basename(path)
-                command = basename[:-suffixLen]
-                cls._pluginPaths[command] = path
+        for entry in entries:
+            cls._manifest[entry['name']] = entry
 
     _instance = None
 
@@ -87,7 +172,7 @@ class GcamTool(object):
         if reload:
             GcamTool._instance = None
             GcamTool._plugins = {}
-            GcamTool._pluginPaths = {}
+            GcamTool._manifest = OrderedDict()
 
         if not GcamTool._instance:
             GcamTool._instance = cls(loadPlugins=loadPlugins)
@@ -96,9 +181,9 @@ class GcamTool(object):
 
     @classmethod
     def pluginGroup(cls, groupName, namesOnly=False):
-        objs = filter(lambda obj: obj.getGroup() == groupName, cls._plugins.values())
-        result = sorted(map(lambda obj: obj.name, objs)) if namesOnly else list(objs)
-        return result
+        names = sorted(name for name, entry in cls._manifest.items() if entry['group'] == groupName)
+        objs = [cls.getPlugin(name) for name in names]    # loads the plugins, if needed
+        return names if namesOnly else objs
 
     def __init__(self, loadPlugins=True, loadBuiltins=True):
         from .project import decacheVariables
@@ -112,22 +197,42 @@ class GcamTool(object):
         self.parser = self.subparsers = None
         self.addParsers()
 
-        # load all built-in sub-commands
+        # Built-in sub-commands are added to the manifest, but not imported
+        # until needed, since some of them are slow to import.
+        pkgDir = os.path.dirname(os.path.abspath(__file__))
+
         if loadBuiltins:
             from .built_ins import BuiltinSubcommands
-            for item in BuiltinSubcommands:
-                self.instantiatePlugin(item)
+            builtinDir = pathjoin(pkgDir, 'built_ins')
+            self._addToManifest(builtinDir, lambda: self._builtinPlugins(builtinDir, 'pygcam.built_ins',
+                                                                         BuiltinSubcommands))
 
-        # If using MCS, load that set of built-ins, too
+        # If using MCS, add that set of built-ins, too
         if usingMCS():
             from .mcs.built_ins import MCSBuiltins
-            for item in MCSBuiltins:
-                self.instantiatePlugin(item)
+            mcsDir = pathjoin(pkgDir, 'mcs', 'built_ins')
+            self._addToManifest(mcsDir, lambda: self._builtinPlugins(mcsDir, 'pygcam.mcs.built_ins',
+                                                                     MCSBuiltins))
 
-        # Load external plug-ins found in plug-in path
+        # Add external plug-ins found in plug-in path
         if loadPlugins:
             self._cachePlugins()
 
+        # Until a plugin is loaded, its sub-command has a parser that
+        # provides only the help text shown in the main help message.
+        if self._subparserInternals():
+            for name, entry in self._manifest.items():
+                if name not in self._plugins:
+                    self.subparsers.add_parser(name, help=entry['help'])
+        else:
+            # placeholder parsers couldn't be replaced, so load every plugin now
+            from .log import getLogger
+            getLogger(__name__).debug("Unrecognized argparse internals: loading all plugins")
+
+            for name, entry in list(self._manifest.items()):
+                if name not in self._plugins:
+                    self._loadEntry(entry)
+
     def addParsers(self):
         self.parser = parser = argparse.ArgumentParser(prog=PROGRAM, prefix_chars='-+')
 
@@ -208,10 +313,53 @@ class GcamTool(object):
     def getMcsMode(self):
         return self.mcsMode
 
+    def _subparserInternals(self):
+        """
+        Return the private argparse attributes needed to replace a placeholder
+        parser: the dict of parsers by sub-command name and the list of actions
+        holding their help text. Return None if these aren't found, e.g., if a
+        new version of argparse changes them.
+        """
+        parserMap = getattr(self.subparsers, '_name_parser_map', None)
+        actions   = getattr(self.subparsers, '_choices_actions', None)
+
+        if isinstance(parserMap, dict) and isinstance(actions, list):
+            return parserMap, actions
+
+        return None
+
+    def _removeParser(self, name):
+        """
+        Remove the placeholder parser for sub-command `name`, if any, so the
+        plugin can create its own. This is the only method that modifies the
+        argparse internals; placeholders are created only if it can do so.
+        """
+        internals = self._subparserInternals()
+        if internals is None:
+            return
+
+        parserMap, actions = internals
+        if name in parserMap:
+            del parserMap[name]
+            actions[:] = [action for action in actions if action.dest != name]
+
     def instantiatePlugin(self, pluginClass):
+        name = next((entry['name'] for entry in self._manifest.values()
+                     if entry['className'] == pluginClass.__name__ and
+                     entry['module'] == pluginClass.__module__), None)
+        if name:
+            self._removeParser(name)
+
         plugin = pluginClass(self.subparsers)
         self._plugins[plugin.name] = plugin
 
+    def loadAllPlugins(self):
+        """
+        Load all plugins in the manifest, e.g., to generate documentation.
+        """
+        for name in list(self._manifest.keys()):
+            self.getPlugin(name)
+
     @staticmethod
     def _getPluginDirs():
         pluginPath = getParam('GCAM.PluginPath')
@@ -241,6 +389,10 @@ class GcamTool(object):
         if not pluginClass:
             raise PygcamException('Neither PluginClass nor class Plugin are defined in %s' % path)
 
+        name = next((entry['name'] for entry in self._manifest.values() if entry['path'] == path), None)
+        if name:
+            self._removeParser(name)
+
         self.instantiatePlugin(pluginClass)
 
     def _loadRequiredPlugins(self, argv):
@@ -252,16 +404,11 @@ class GcamTool(object):
 
         ns, otherArgs = parser.parse_known_args(args=argv)
 
-        # For top-level help, or if no args, load all plugins
-        # so the generated help messages includes all subcommands
-        if ns.help or not otherArgs:
-            for item in self._pluginPaths.keys():
-                self._loadCachedPlugin(item)
-        else:
-            # Otherwise, load any referenced sub-command
-            for command in self._pluginPaths.keys():
-                if command in otherArgs:
-                    self.getPlugin(command)
+        # Top-level help requires only the help text in the manifest, so
+        # load only the plugins for any referenced sub-commands.
+        for command in list(self._manifest.keys()):
+            if command in otherArgs:
+                self.getPlugin(command)
 
     def validateGcamVersion(self):
         from .gcam import getGcamVersion
@@ -441,6 +588,7 @@ def _getMainParser():
     '''
     getConfig(allowMissing=True)
     tool = GcamTool.getInstance(loadPlugins=False)
+    tool.loadAllPlugins()
     return tool.parser
 
 
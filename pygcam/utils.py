@@ -16,7 +16,8 @@ import subprocess
 import sys
 from contextlib import contextmanager
 
-from .config import getParam, getParamAsBoolean, pathjoin, unixPath, parse_version_info
+from .config import (getParam, getParamAsBoolean, pathjoin, unixPath, parse_version_info,
+                     initWorkerConfig, workerConfigState)
 from .error import PygcamException, FileFormatError
 from .log import getLogger
 
@@ -100,6 +101,141 @@ StateOptions = ('withGlobal',   # return states and global regions
                 'only',         # return states only, excluding global regions
                 'none')         # return only global regions
 
+def _readRegionNames(xmlFile):
+    """
+    Return the names of the <region> elements in `xmlFile`, in document order,
+    reading the file incrementally rather than building the full tree.
+    """
+    names = []
+    for event, elt in ET.iterparse(xmlFile, events=('start', 'end'), tag='region'):
+        if event == 'start':
+            name = elt.get('name')
+            if name is not None:
+                names.append(name)
+        else:
+            # discard the region's contents and any preceding siblings
+            elt.clear()
+            while elt.getprevious() is not None:
+                del elt.getparent()[0]
+
+    return names
+
+def _readSocioFileNames(configFile, workspace):
+    """
+    Return a dict with the pathnames of the 'socioeconomics' and 'socio_usa'
+    ScenarioComponents (if present) in the GCAM config file `configFile`.
+    """
+    wanted = ('socioeconomics', 'socio_usa')
+    found = {}
+
+    for event, elt in ET.iterparse(configFile, events=('end',), tag=('Value', 'ScenarioComponents')):
+        if elt.tag == 'ScenarioComponents':
+            break   # no need to read the rest of the file
+
+        name = elt.get('name')
+        if name in wanted and elt.getparent().tag == 'ScenarioComponents' and name not in found:
+            found[name] = pathjoin(workspace, 'exe', elt.text, abspath=True)
+
+    return found
+
+def _fileStamps(paths):
+    return [(path, os.path.getmtime(path), os.path.getsize(path)) for path in paths]
+
+def _readJsonCache(cacheFile, key):
+    """
+    Return the data saved in `cacheFile` for `key` if all the files
+    it was derived from are unchanged, else None.
+    """
+    import json
+
+    try:
+        with open(cacheFile) as f:
+            entry = json.load(f).get(key)
+
+        if entry and [list(stamp) for stamp in _fileStamps([s[0] for s in entry['stamps']])] == entry['stamps']:
+            _logger.debug("Read '%s' from cache '%s'", key, cacheFile)
+            return entry['data']
+
+    except (IOError, OSError, ValueError, KeyError) as e:
+        _logger.debug("Can't use cache '%s': %s", cacheFile, e)
+
+    return None
+
+def _writeJsonCache(cacheFile, key, paths, data):
+    """
+    Save `data`, which was derived from the files (or directories) `paths`,
+    in `cacheFile` for `key`, along with the modification time and size of
+    each of `paths`.
+    """
+    import json
+
+    try:
+        with open(cacheFile) as f:
+            cache = json.load(f)
+    except (IOError, OSError, ValueError):
+        cache = {}
+
+    tmpFile = '%s.%d' % (cacheFile, os.getpid())
+    try:
+        cache[key] = {'stamps': [list(stamp) for stamp in _fileStamps(paths)],
+                      'data': data}
+
+        # Write to a temp file and rename it, since concurrent processes may read the cache
+        mkdirs(os.path.dirname(cacheFile))
+        with open(tmpFile, 'w') as f:
+            json.dump(cache, f)
+
+        if os.path.exists(cacheFile) and sys.platform == 'win32':
+            os.remove(cacheFile)    # os.rename won't replace an existing file on Windows
+
+        os.rename(tmpFile, cacheFile)
+
+    except (IOError, OSError) as e:
+        _logger.debug("Failed to write cache '%s': %s", cacheFile, e)
+        deleteFile(tmpFile)
+
+def _discoverRegions(configFile, workspace):
+    """
+    Return the lists of global regions and US states defined in the socioeconomics
+    input files named in `configFile`, using the cache file named by config var
+    GCAM.RegionCacheFile, if it's set and the files haven't changed. Returns None
+    if a file isn't found.
+    """
+    configFile = os.path.abspath(configFile)
+    cacheFile = getParam('GCAM.RegionCacheFile')
+    key = '%s|%s' % (configFile, os.path.abspath(workspace))
+
+    if cacheFile:
+        cached = _readJsonCache(cacheFile, key)
+        if cached:
+            return cached
+
+    xmlFiles = _readSocioFileNames(configFile, workspace)
+    xml_USA    = xmlFiles.get('socio_usa')
+    xml_global = xmlFiles.get('socioeconomics')
+    paths = [configFile]
+
+    if xml_global and os.path.lexists(xml_global):
+        regions = _readRegionNames(xml_global)
+        paths.append(xml_global)
+    else:
+        _logger.error("GCAM input file '{}' not found.".format(xml_global))
+        return None
+
+    states = []
+    if xml_USA:
+        if not os.path.lexists(xml_USA):
+            _logger.error("GCAM input file '{}' not found.".format(xml_USA))
+            return None
+
+        states = sorted(set(_readRegionNames(xml_USA)) - {'USA'})  # don't include "USA" in list of states
+        paths.append(xml_USA)
+
+    if cacheFile:
+        _writeJsonCache(cacheFile, key, paths, [regions, states])
+
+    return regions, states
+
 def getRegionList(workspace=None, states='withGlobal'):
     """
     Set the list of the defined region names from the data system, if possible,
@@ -159,31 +295,11 @@ def getRegionList(workspace=None, states='withGlobal'):
             _logger.error("GCAM reference config file '{}' not found.".format(configFile))
             return
 
-        parser = ET.XMLParser(remove_blank_text=True)
-        tree   = ET.parse(configFile, parser)
-
-        def _xmlpath(tag):
-            elt = tree.find('//ScenarioComponents/Value[@name="{}"]'.format(tag))
-            return None if elt is None else pathjoin(workspace, 'exe', elt.text, abspath=True)
-
-        xml_USA    = _xmlpath('socio_usa')
-        xml_global = _xmlpath('socioeconomics')
-
-        if xml_global and os.path.lexists(xml_global):
-            tree = ET.parse(xml_global, parser)
-            _RegionList = tree.xpath('//region/@name')
-        else:
-            _logger.error("GCAM input file '{}' not found.".format(xml_global))
+        result = _discoverRegions(configFile, workspace)
+        if result is None:
             return
 
-        if xml_USA:
-            if not os.path.lexists(xml_USA):
-                _logger.error("GCAM input file '{}' not found.".format(xml_USA))
-                return
-
-            tree = ET.parse(xml_USA, parser)
-            _StateList = tree.xpath('//region/@name')
-            _StateList = sorted(set(_StateList) - {'USA'})  # don't include "USA" in list of states
+        _RegionList, _StateList = result
 
     else: # Deprecated (probably) -- see note above.
         path = pathjoin(workspace, relpath) if workspace else None
@@ -530,6 +646,29 @@ def shellCommand(command, shell=True, raiseError=True):
 
     return exitStatus
 
+def workerProcessPool(maxWorkers, initializer=initWorkerConfig, initargs=None):
+    """
+    Create a ProcessPoolExecutor whose worker processes are initialized by calling
+    `initializer` with `initargs`. By default, workers get the configuration of
+    this process (see :py:func:`pygcam.config.initWorkerConfig`). An initializer
+    requires Python 3.7 or later; with earlier versions it's not called, and
+    workers rely on inheriting the configuration when they're forked.
+
+    :param maxWorkers: (int) the maximum number of worker processes
+    :param initializer: (callable) the function to call in each worker process, or None
+    :param initargs: (tuple) the arguments to pass to `initializer`. If None,
+        the value of :py:func:`pygcam.config.workerConfigState` is used.
+    :return: (concurrent.futures.ProcessPoolExecutor) the pool
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    kwargs = {}
+    if initializer and sys.version_info >= (3, 7):
+        kwargs = dict(initializer=initializer,
+                      initargs=workerConfigState() if initargs is None else initargs)
+
+    return ProcessPoolExecutor(max_workers=maxWorkers, **kwargs)
+
 def flatten(listOfLists):
     """
     Flatten one level of nesting given a list of lists. That is, convert
@@ -822,3 +961,62 @@ def chunkify(lst, chunks):
             chunkSize -= 1
         yield lst[i:i + chunkSize]
         i += chunkSize
+
+class LRUCache(object):
+    """
+    A dictionary-like cache that holds at most `maxsize` items, evicting the
+    least recently used item when a new one is added to a full cache. If
+    `maxbytes` is given, items are also evicted while the total of their sizes,
+    as computed by the function `sizeof`, exceeds `maxbytes`. An item larger
+    than `maxbytes` is not cached.
+    """
+    def __init__(self, maxsize, maxbytes=None, sizeof=None):
+        from collections import OrderedDict
+
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.items = OrderedDict()
+        self.sizes = {}
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key, default=None):
+        try:
+            value = self.items.pop(key)
+        except KeyError:
+            return default
+
+        self.items[key] = value      # reinsert as the most recently used item
+        return value
+
+    def set(self, key, value):
+        self.pop(key)
+
+        size = self.sizeof(value) if (self.maxbytes is not None and self.sizeof) else 0
+        if self.maxbytes is not None and size > self.maxbytes:
+            return
+
+        self.items[key] = value
+        self.sizes[key] = size
+        self.nbytes += size
+
+        while len(self.items) > max(self.maxsize, 0) or \
+                (self.maxbytes is not None and self.nbytes > self.maxbytes):
+            oldKey, _ = self.items.popitem(last=False)
+            self.nbytes -= self.sizes.pop(oldKey)
+
+    def pop(self, key, default=None):
+        value = self.items.pop(key, default)
+        self.nbytes -= self.sizes.pop(key, 0)
+        return value
+
+    def clear(self):
+        self.items.clear()
+        self.sizes.clear()
+        self.nbytes = 0
@@ -19,6 +19,12 @@
 # to refer to the modified file. (This may be done multiple times, to
 # no ill effect.)
 #
+# If GCAM.XmlOverrides is True, functions that only edit values in the
+# file instead write the edited elements to a small "add-on" file that
+# GCAM reads after the original. (See OverrideFile, below.)
+#
+from collections import defaultdict, OrderedDict
+import copy
 import glob
 import os
 import re
@@ -101,6 +107,137 @@ def copyIfMissing(src, dst, makedirs=False):
         _logger.info("Copy %s\n      to %s", src, dst)
         shutil.copy(src, dst)
         os.chmod(dst, 0o644)
+        CachedFile.written.add(os.path.realpath(dst))
+
+class ElementIndex(object):
+    """
+    Index of the sector, subsector, technology and period elements of a GCAM
+    input file, built in one pass over the tree. Elements are keyed by tuples
+    of names, (region, sector, subsector, technology, year), truncated to the
+    element's level, e.g., subsectors are keyed by (region, sector, subsector).
+    Elements of the global-technology-database are keyed with region None,
+    using the sector-name and subsector-name of their <location-info>.
+
+    The index doesn't track changes to the tree: elements inserted with xmlIns
+    are added to it, but other changes to the structure of the tree require a
+    call to CachedFile.invalidateIndex().
+    """
+    def __init__(self, tree, filename=None):
+        self.filename = filename
+        self.elements = defaultdict(list)
+
+        world = tree.getroot().find('world')
+        if world is None:
+            return
+
+        for elt in world.iterchildren(tag=ET.Element):
+            if elt.tag == 'region':
+                key = (elt.get('name'),)
+                for child in elt.iterchildren(tag=ET.Element):
+                    self._addElement(child, key)
+
+            elif elt.tag == 'global-technology-database':
+                for info in elt.iterchildren(tag='location-info'):
+                    key = (None, info.get('sector-name'), info.get('subsector-name'))
+                    self.elements[key].append(info)
+                    for child in info.iterchildren(tag=ET.Element):
+                        self._addElement(child, key)
+
+    def _addElement(self, elt, parentKey):
+        # Index elt, the child of the element at parentKey, and its descendants.
+        # Below the technology level, only <period> elements are indexed.
+        if len(parentKey) == 4:
+            name = elt.get('year') if elt.tag == 'period' else None
+        else:
+            name = elt.get('name')
+
+        if name is None:
+            return
+
+        key = parentKey + (name,)
+        self.elements[key].append(elt)
+
+        if len(key) < 5:
+            for child in elt.iterchildren(tag=ET.Element):
+                self._addElement(child, key)
+
+    @staticmethod
+    def _elementKey(elt):
+        # Compute the key of an element from its ancestors, or return None if it's not indexed
+        names = []
+        for node in [elt] + list(elt.iterancestors()):
+            if node.tag == 'region':
+                names.append(node.get('name'))
+                break
+
+            if node.tag == 'location-info':
+                names += [node.get('subsector-name'), node.get('sector-name'), None]
+                break
+
+            names.append(node.get('year') if node.tag == 'period' else node.get('name'))
+        else:
+            return None
+
+        names.reverse()
+        return tuple(names)
+
+    def add(self, elt):
+        """
+        Add an element inserted in the tree, and its descendants, to the index.
+
+        :param elt: (etree.Element) an element that has been inserted in the tree
+        :return: none
+        """
+        parentKey = self._elementKey(elt.getparent())
+        if parentKey is not None and len(parentKey) < 5 and None not in parentKey[1:]:
+            self._addElement(elt, parentKey)
+
+    def select(self, key, path=None, tag=None):
+        """
+        Return the elements with the given key and, optionally, `tag`. If `path`
+        is given, return instead the elements it selects from those elements.
+
+        :param key: (tuple) up to 5 names (region, sector, subsector, technology,
+            year), which are converted to str, except for region None, which
+            selects from the global-technology-database.
+        :param path: (str) an XPath query relative to the elements with `key`
+        :param tag: (str) the required tag of the elements with `key`
+        :return: (list of etree.Element) the elements found
+        """
+        key = tuple(None if name is None else str(name) for name in key)
+        elts = self.elements.get(key, [])
+
+        if tag:
+            elts = [elt for elt in elts if elt.tag == tag]
+
+        if path:
+            elts = [found for elt in elts for found in elt.xpath(path)]
+
+        return elts
+
+    def selectOne(self, key, path=None, tag=None, required=True):
+        """
+        Return the single element selected by calling ``select(key, path, tag)``.
+
+        :param required: (bool) if True, raise an error if no element is found,
+            otherwise return None.
+        :return: (etree.Element) the element found, or None
+        :raises SetupException: if more than one element is found, or if none is
+            found and `required` is True.
+        """
+        elts = self.select(key, path=path, tag=tag)
+        desc = '/'.join(str(name) for name in key) + ('/' + path if path else '')
+
+        if len(elts) > 1:
+            raise SetupException('Found {} elements at {} in "{}"'.format(len(elts), desc, self.filename))
+
+        if not elts:
+            if required:
+                raise SetupException('Failed to find an element at {} in "{}"'.format(desc, self.filename))
+            return None
+
+        return elts[0]
+
 
 class CachedFile(object):
     parser = ET.XMLParser(remove_blank_text=True)
@@ -108,9 +245,14 @@ class CachedFile(object):
     # Store parsed XML trees here and use with xmlSel/xmlEdit if useCache is True
     cache = {}
 
+    # Pathnames of the files written (or copied by copyIfMissing) in this process,
+    # used to detect files written by more than one scenario in a parallel setup.
+    written = set()
+
     def __init__(self, filename):
         self.filename = filename = os.path.realpath(filename)
         self.edited = False
+        self.index = None
 
         _logger.debug("Reading '%s'", filename)
         self.tree = ET.parse(filename, self.parser)
@@ -128,12 +270,36 @@ class CachedFile(object):
 
         return item
 
-    def setEdited(self):
+    def getIndex(self):
+        """
+        Return the ElementIndex for this file's tree, building it if needed.
+        """
+        if self.index is None:
+            self.index = ElementIndex(self.tree, filename=self.filename)
+
+        return self.index
+
+    def invalidateIndex(self):
+        """
+        Discard the index, which must be done after changing the structure of
+        the tree other than by calling xmlIns.
+        """
+        self.index = None
+
+    def setEdited(self, *elts):
+        """
+        Mark the file as edited, so it's written when decached.
+
+        :param elts: (etree.Element) the elements that were edited or inserted,
+            which are recorded by subclasses that write only the edits.
+        :return: none
+        """
         self.edited = True
 
     def write(self):
         _logger.info("Writing '%s'", self.filename)
         self.tree.write(self.filename, xml_declaration=True, encoding='utf-8', pretty_print=True)
+        self.written.add(self.filename)
         self.edited = False
 
     def decache(self):
@@ -146,6 +312,132 @@ class CachedFile(object):
             item.decache()
 
 
+def _docPosition(elt):
+    """
+    Return the list of child indices leading from the root to `elt`, which
+    sorts elements in document order.
+    """
+    position = []
+    parent = elt.getparent()
+    while parent is not None:
+        position.append(parent.index(elt))
+        elt, parent = parent, parent.getparent()
+
+    position.reverse()
+    return position
+
+def applyOverride(tree, addonTree):
+    """
+    Apply the elements of an add-on file to `tree`, approximating how GCAM
+    reads an add-on after the original file. Elements are matched by tag and
+    attributes; the text of matched elements without element children is
+    replaced, and unmatched elements are appended to their parent.
+
+    :param tree: (etree.ElementTree) the tree to update
+    :param addonTree: (etree.ElementTree) the parsed add-on file
+    :return: none
+    """
+    def merge(dst, src):
+        for child in src.iterchildren(tag=ET.Element):
+            attrib = dict(child.attrib)
+            match = next((elt for elt in dst.iterchildren(tag=child.tag) if dict(elt.attrib) == attrib), None)
+
+            if match is None:
+                dst.append(copy.deepcopy(child))
+            elif len(child):
+                merge(match, child)
+            else:
+                match.text = child.text
+
+    merge(tree.getroot(), addonTree.getroot())
+
+
+class OverrideFile(CachedFile):
+    """
+    Holds the parsed tree of a scenario component's XML file, but rather than
+    writing the full tree when decached, writes an "add-on" file holding only
+    the edited (or inserted) elements and their ancestors. The add-on file is
+    read by GCAM after the original, replacing the values of elements that
+    match by name. Elements must be passed to setEdited() to be written, as
+    xmlEdit and xmlIns do.
+    """
+    def __init__(self, filename, srcFile, addonFiles=()):
+        """
+        :param filename: (str) the pathname of the add-on file to write
+        :param srcFile: (str) the pathname of the XML file to edit. If this file is
+            in the cache, e.g., after edits to a full copy, its cached tree is used.
+        :param addonFiles: (list of str) the pathnames of add-on files (e.g., written
+            for a parent scenario) to apply to the tree of `srcFile` before editing.
+        """
+        self.filename = filename = os.path.realpath(filename)
+        self.srcFile = srcFile
+        self.edited = False
+        self.index = None
+        self.edits = OrderedDict()  # edited elements, used as an ordered set
+
+        # Start from any edits not yet written to srcFile, but don't share the tree
+        cached = self.cache.get(os.path.realpath(srcFile))
+        if cached:
+            self.tree = copy.deepcopy(cached.tree)
+        else:
+            _logger.debug("Reading '%s'", srcFile)
+            self.tree = ET.parse(srcFile, self.parser)
+
+        for addonFile in addonFiles:
+            _logger.debug("Applying '%s'", addonFile)
+            applyOverride(self.tree, ET.parse(addonFile, self.parser))
+
+        self.cache[filename] = self
+
+    def setEdited(self, *elts):
+        self.edited = True
+        for elt in elts:
+            self.edits[elt] = True
+
+    def addonTree(self):
+        """
+        Create the tree to write to the add-on file, holding a copy of each edited
+        element, nested within copies of its ancestors (without their other children).
+
+        :return: (etree.ElementTree) the add-on tree
+        """
+        root = self.tree.getroot()
+        addonRoot = ET.Element(root.tag, dict(root.attrib))
+        nodes = {root: addonRoot}
+        copied = set()
+
+        # In document order, ancestors precede descendants, so we can skip
+        # elements within those already copied.
+        for elt in sorted(self.edits, key=_docPosition):
+            ancestors = list(elt.iterancestors())
+            ancestors.reverse()
+
+            if not ancestors or ancestors[0] is not root or copied.intersection(ancestors):
+                continue    # the root itself, an element since removed, or already copied
+
+            parent = addonRoot
+            for ancestor in ancestors[1:]:
+                node = nodes.get(ancestor)
+                if node is None:
+                    node = nodes[ancestor] = ET.SubElement(parent, ancestor.tag, dict(ancestor.attrib))
+                parent = node
+
+            parent.append(copy.deepcopy(elt))
+            copied.add(elt)
+
+        return ET.ElementTree(addonRoot)
+
+    def write(self):
+        _logger.info("Writing '%s'", self.filename)
+        mkdirs(os.path.dirname(self.filename))
+        self.addonTree().write(self.filename, xml_declaration=True, encoding='utf-8', pretty_print=True)
+        self.written.add(self.filename)
+        self.edited = False
+
+        _logger.info("Wrote %d bytes for %d edited elements, rather than %d bytes for a full copy of '%s'",
+                     os.path.getsize(self.filename), len(self.edits), os.path.getsize(self.srcFile), self.srcFile)
+
+
 def xmlSel(filename, xpath, asText=False):
     """
     Return True if the XML component identified by the xpath argument
@@ -169,18 +461,22 @@ def xmlIns(filename, xpath, elt):
     """
     Insert the element `elt` as a child to the node found with `xpath`.
     :param filename: (str) the file to edit
-    :param xpath: (str) the xml element(s) to search for
+    :param xpath: (str or etree.Element) the xml element to search for, or
+        the parent element itself (e.g., as found with an ElementIndex).
     :param elt: (etree.Element) the node to insert
     :return: none
     """
     item = CachedFile.getFile(filename)
-    item.setEdited()
 
-    parentElt = item.tree.find(xpath)
+    parentElt = item.tree.find(xpath) if isinstance(xpath, six.string_types) else xpath
     if parentElt is None:
         raise SetupException("xmlIns: failed to find parent element at {} in {}".format(xpath, filename))
 
     parentElt.append(elt)
+    item.setEdited(elt)
+
+    if item.index is not None:
+        item.index.add(elt)
 
 #
 # xmlEdit can set a value, multiply a value in the XML by a constant,
@@ -208,7 +504,8 @@ def xmlEdit(filename, pairs, op='set', useCache=True):
 
     :param filename: the file to edit in-place.
     :param pairs: (iterable of (xpath, value) pairs) In each pair, the xpath selects
-      elements or attributes to update with the given values.
+      elements or attributes to update with the given values. The xpath can also be
+      given as an element to update (e.g., as found with an ElementIndex).
     :param op: (str) Operation to perform. Must be in ('set', 'multiply', 'add').
       Note that 'multiply' and 'add' are *not* available for xpaths selecting
       attributes rather than node values. For 'multiply'  and 'add', the value
@@ -229,21 +526,28 @@ def xmlEdit(filename, pairs, op='set', useCache=True):
     tree = item.tree
 
     updated = False
+    edited = []
 
     # if at least one xpath is found, update and write file
     for xpath, value in pairs:
         attr = None
 
-        # If it's an attribute update, extract the attribute
-        # and use the rest of the xpath to select the elements.
-        match = re.match(AttributePattern, xpath)
-        if match:
-            attr = match.group(2)
-            xpath = match.group(1)
+        if not isinstance(xpath, six.string_types):
+            elts = [xpath]
+
+        else:
+            # If it's an attribute update, extract the attribute
+            # and use the rest of the xpath to select the elements.
+            match = re.match(AttributePattern, xpath)
+            if match:
+                attr = match.group(2)
+                xpath = match.group(1)
+
+            elts = tree.xpath(xpath)
 
-        elts = tree.xpath(xpath)
         if len(elts):
             updated = True
+            edited.extend(elts)
             if attr:                # conditional outside loop since there may be many elements
                 value = str(value)
                 for elt in elts:
@@ -253,9 +557,8 @@ def xmlEdit(filename, pairs, op='set', useCache=True):
                     modFunc(elt, value)
 
     if updated:
-        if useCache:
-            item.setEdited()
-        else:
+        item.setEdited(*edited)
+        if not useCache:
             item.write()
 
     return updated
@@ -467,6 +770,10 @@ class XMLEditor(object):
 
         self.configPath = None
 
+        # Maps scenario component tags to the relative paths of add-on files
+        # written for them, when GCAM.XmlOverrides is True.
+        self.overrides = {}
+
         # TBD: xmlOutputRoot is now just scenario dir, so this parameter can disappear
         create = bool(xmlOutputRoot)  # create it only if a dir is specified
         self.local_xml_abs = makeDirPath((xmlOutputRoot, LOCAL_XML_NAME), create=create)
@@ -734,13 +1041,18 @@ class XMLEditor(object):
 
         return pathname
 
-    def getLocalCopy(self, configTag):
+    def getLocalCopy(self, configTag, override=False):
         """
         Get the filename for the most local version (in terms of scenario hierarchy)
         of the XML file identified in the configuration file with `configTag`, and
         copy the file to our scenario dir if not already there.
 
         :param configTag: (str) the configuration file tag (name="xxx") of an XML file
+        :param override: (bool) if True and GCAM.XmlOverrides is True, the file is
+          not copied. Instead, the paths of an add-on file are returned, to which
+          only the elements edited via xmlEdit or xmlIns are written. (See
+          :py:meth:`getOverrideFile`.) Callers that modify the tree in other ways
+          must not set this.
         :return: (str, str) a tuple of the relative and absolute path of the
           local (i.e., within the current scenario) copy of the file.
         """
@@ -769,6 +1081,9 @@ class XMLEditor(object):
         else:
             suffix = os.path.basename(srcAbsPath)
 
+        if override and getParamAsBoolean('GCAM.XmlOverrides'):
+            return self.getOverrideFile(configTag, srcAbsPath, suffix)
+
         dstAbsPath = pathjoin(self.scenario_dir_abs, suffix)
         dstRelPath = pathjoin(self.scenario_dir_rel, suffix)
 
@@ -776,6 +1091,42 @@ class XMLEditor(object):
 
         return dstRelPath, dstAbsPath
 
+    def getOverrideFile(self, configTag, srcAbsPath, suffix):
+        """
+        Create (on first call for `configTag`) an OverrideFile holding the tree
+        of `srcAbsPath`, and insert the add-on file it writes into the config
+        file, named "{configTag}-override-{scenario}", following the component
+        `configTag` and any add-on files inherited from parent scenarios, which
+        are applied to the tree so edits start from the parent's values.
+
+        :param configTag: (str) the configuration file tag (name="xxx") of an XML file
+        :param srcAbsPath: (str) the absolute path of the file identified by `configTag`
+        :param suffix: (str) the path of the local copy relative to the scenario dir
+        :return: (str, str) a tuple of the relative and absolute path of the add-on file
+        """
+        base, ext = os.path.splitext(suffix)
+        suffix = base + '-override' + ext
+
+        dstAbsPath = pathjoin(self.scenario_dir_abs, suffix)
+        dstRelPath = unixPath(pathjoin(self.scenario_dir_rel, suffix))
+
+        if configTag not in self.overrides:
+            name = '{}-override-{}'.format(configTag, self.name)
+
+            cfg = CachedFile.getFile(self.cfgPath())
+            xpath = '//ScenarioComponents/Value[starts-with(@name, "{}-override-")]'.format(configTag)
+            inherited = [elt for elt in cfg.tree.xpath(xpath) if elt.get('name') != name]
+
+            addonFiles = [pathjoin(self.sandboxExeDir, elt.text, abspath=True) for elt in inherited]
+            item = OverrideFile(dstAbsPath, srcAbsPath, addonFiles=addonFiles)
+            item.setEdited()    # write the add-on file even if nothing matches
+
+            after = inherited[-1].get('name') if inherited else configTag
+            self.insertScenarioComponent(name, dstRelPath, after)
+            self.overrides[configTag] = dstRelPath
+
+        return dstRelPath, dstAbsPath
+
     @callableMethod
     def replaceValue(self, tag, xpath, value):
         """
@@ -787,7 +1138,7 @@ class XMLEditor(object):
         :param value: the value to use in place of that found by the xpath.
             (the value is converted to string, so you can pass ints or floats.)
         """
-        xmlFileRel, xmlFileAbs = self.getLocalCopy(tag)
+        xmlFileRel, xmlFileAbs = self.getLocalCopy(tag, override=True)
         xmlEdit(xmlFileAbs, [(xpath, str(value))])
 
     def updateConfigComponent(self, group, name, value=None, writeOutput=None, appendScenarioName=None):
@@ -962,6 +1313,9 @@ class XMLEditor(object):
         :return: none
         """
         xmlfile = unixPath(xmlfile)
+        if self.overrides.get(name) == xmlfile:
+            return      # the add-on file was inserted after the component by getOverrideFile
+
         _logger.info("Update scenario component name '{}' to refer to '{}'".format(name, xmlfile))
         self.updateConfigComponent('ScenarioComponents', name, xmlfile)
 
@@ -1012,7 +1366,7 @@ class XMLEditor(object):
         """
         _logger.info("multiply: tag='%s', xpath='%s', value=%s", tag, xpath, value)
 
-        fileRel, fileAbs = self.getLocalCopy(tag)
+        fileRel, fileAbs = self.getLocalCopy(tag, override=True)
 
         xmlEdit(fileAbs, [(xpath, value)], op='multiply')
         self.updateScenarioComponent(tag, fileRel)
@@ -1030,7 +1384,7 @@ class XMLEditor(object):
         """
         _logger.info("add: tag='{}', xpath='{}', value={}".format(tag, xpath, value))
 
-        fileRel, fileAbs = self.getLocalCopy(tag)
+        fileRel, fileAbs = self.getLocalCopy(tag, override=True)
 
         xmlEdit(fileAbs, [(xpath, value)], op='add')
         self.updateScenarioComponent(tag, fileRel)
@@ -1365,7 +1719,7 @@ class XMLEditor(object):
         tag = 'socioeconomics'
         #path = self.componentPath(tag)
         # fileRel, fileAbs = self.getLocalCopy(path)
-        fileRel, fileAbs = self.getLocalCopy(tag)
+        fileRel, fileAbs = self.getLocalCopy(tag, override=True)
 
         prefix = '//region[@name="{}"]/demographics/populationMiniCAM'.format(region)
         pairs = []
@@ -1381,7 +1735,7 @@ class XMLEditor(object):
         Freeze population subsequent to `year` at the value for that year.
         """
         tag = 'socioeconomics'
-        fileRel, fileAbs = self.getLocalCopy(tag)
+        fileRel, fileAbs = self.getLocalCopy(tag, override=True)
 
         fileObj = CachedFile.getFile(fileAbs)
         tree = fileObj.tree
@@ -1424,7 +1778,7 @@ class XMLEditor(object):
         msg = "Set non-energy-cost of {} for {} to:".format(technology, self.name)
         _logger.info(printSeries(values, technology, header=msg, asStr=True))
 
-        enTransFileRel, enTransFileAbs = self.getLocalCopy(ENERGY_TRANSFORMATION_TAG)
+        enTransFileRel, enTransFileAbs = self.getLocalCopy(ENERGY_TRANSFORMATION_TAG, override=True)
 
         prefix = '//global-technology-database/location-info[@sector-name="%s" and @subsector-name="%s"]/technology[@name="%s"]' % \
                  (sector, subsector, technology)
@@ -1460,7 +1814,7 @@ class XMLEditor(object):
         """
         _logger.info("Set shutdown rate for (%s, %s) to %s for %s", sector, technology, values, self.name)
 
-        enTransFileRel, enTransFileAbs = self.getLocalCopy(ENERGY_TRANSFORMATION_TAG)
+        enTransFileRel, enTransFileAbs = self.getLocalCopy(ENERGY_TRANSFORMATION_TAG, override=True)
 
         prefix = "//global-technology-database/location-info[@sector-name='%s' and @subsector-name='%s']/technology[@name='%s']" % \
                  (sector, subsector, technology)
@@ -1511,7 +1865,7 @@ class XMLEditor(object):
         """
         _logger.info("Set price-elasticity for (%s, %s) to %s for %s", regions, sectors, values, self.name)
 
-        filenameRel, filenameAbs = self.getLocalCopy(configFileTag)
+        filenameRel, filenameAbs = self.getLocalCopy(configFileTag, override=True)
 
         def listifyString(value, aliasForNone=None):
             if isinstance(value, six.string_types):
@@ -1586,7 +1940,7 @@ class XMLEditor(object):
         toYear = str(toYear)
         fromYear = str(fromYear)
 
-        xmlFileRel, xmlFileAbs = self.getLocalCopy(configFileTag)
+        xmlFileRel, xmlFileAbs = self.getLocalCopy(configFileTag, override=True)
 
         item = CachedFile.getFile(xmlFileAbs)
         tree = item.tree
@@ -1671,6 +2025,7 @@ class XMLEditor(object):
 
                 # Set the value for the toYear
                 share_elt.text = toValue
+                item.setEdited(share_elt)
 
             if delete:
                 args.append((interp_rule + '/@delete', "1"))        # TBD: not sure this is correct
@@ -1727,34 +2082,33 @@ class XMLEditor(object):
         else:
             shutdownTypeDecider="s-curve-shutdown-decider"
 
+        index = item.getIndex()
         args = []
 
         for region in regionList:
-            regionElt = '//region[@name="{}"]'.format(region)
-
             # /scenario/world/region[@name='USA']/supplysector[@name='refining']/subsector[@name='biomass liquids']/share-weight
             for stubTechnology in stubTechList:
-                stubTech = '{}/{}[@name="{}"]/{}[@name="{}"]/{}[@name="{}"]'.format(regionElt, supplysectorTag, supplysector, subsectorTag,
-                                                                    subsector,technologyTag,stubTechnology)
-                for year in yearList:
+                stubTechKey = (region, supplysector, subsector, stubTechnology)
+                stubTech = index.selectOne(stubTechKey, tag=technologyTag)
 
-                    period = stubTech + '/period[@year="{}"]'.format(year)
-                    shutdown = period + '/{}[@name="{}"]'.format(shutdownTypeDecider, type)
+                for year in yearList:
+                    shutdown = '{}[@name="{}"]'.format(shutdownTypeDecider, type)
                     steep = shutdown + '/steepness'
                     half_life = shutdown + '/half-life'
                     shutdownElement = ET.Element(str(shutdownTypeDecider), attrib={"name": str(type)})
                     steepnessElement = ET.SubElement(shutdownElement,"steepness")
 
-                    if not xmlSel(xmlFileAbs, period):
-                        periodElement = ET.Element('period', attrib={'year': str(year)})
-                        xmlIns(xmlFileAbs, stubTech, periodElement)
+                    period = index.selectOne(stubTechKey + (year,), tag='period', required=False)
+                    if period is None:
+                        period = ET.Element('period', attrib={'year': str(year)})
+                        xmlIns(xmlFileAbs, stubTech, period)
 
                     if type != "profit":
                         halflifeElement = ET.SubElement(shutdownElement,"half-life")
                     xmlIns(xmlFileAbs, period, shutdownElement)
-                    args.append((steep, coercible(steepness, float)))
+                    args += [(elt, coercible(steepness, float)) for elt in period.xpath(steep)]
                     if type != "profit":
-                        args.append((half_life, coercible(halflife, float)))
+                        args += [(elt, coercible(halflife, float)) for elt in period.xpath(half_life)]
 
         xmlEdit(xmlFileAbs, args)
         self.updateScenarioComponent(configFileTag, xmlFileRel)
@@ -1806,25 +2160,24 @@ class XMLEditor(object):
         # convert to a list; if no region given, get list of regions in this file
         regionList = splitAndStrip(regions, ',') if regions else tree.xpath('//region/@name')
 
+        index = item.getIndex()
         args = []
 
         for region in regionList:
-            regionElt = '//region[@name="{}"]'.format(region)
-
             # /scenario/world/region[@name='USA']/supplysector[@name='refining']/subsector[@name='biomass liquids']/share-weight
-            subsect = '{}/{}[@name="{}"]/{}[@name="{}"]'.format(regionElt, supplysectorTag, supplysector, subsectorTag,
-                                                                subsector)
-            for year,value in expandYearRanges(nodeValues):
+            stubTechKey = (region, supplysector, subsector, stubTechnology)
+            parameter = '{}[@{}="{}"]'.format(nodeName, attributeName, attributeValue)
 
-                stubTech = subsect + '/{}[@name="{}"]'.format(technologyTag, stubTechnology)
-                param_parent = stubTech + '/period[@year="{}"]'.format(year)
-                parameter = param_parent + '/{}[@{}="{}"]'.format(nodeName, attributeName, attributeValue)
+            for year,value in expandYearRanges(nodeValues):
+                param_parent = index.selectOne(stubTechKey + (year,), tag='period')
+                parameterElements = param_parent.xpath(parameter)
 
-                if not xmlSel(xmlFileAbs, parameter):
+                if not parameterElements:
                     parameterElement = ET.Element(str(nodeName), {str(attributeName): str(attributeValue)})
                     xmlIns(xmlFileAbs, param_parent, parameterElement)
+                    parameterElements = [parameterElement]
 
-                args.append((parameter, coercible(value, float)))
+                args += [(elt, coercible(value, float)) for elt in parameterElements]
 
         xmlEdit(xmlFileAbs, args)
         self.updateScenarioComponent(configFileTag, xmlFileRel)
@@ -1868,22 +2221,21 @@ class XMLEditor(object):
         # convert to a list; if no region given, get list of regions in this file
         regionList = splitAndStrip(regions, ',') if regions else tree.xpath('//region/@name')
 
+        index = item.getIndex()
         args = []
 
         for region in regionList:
-            regionElt = '//region[@name="{}"]'.format(region)
-
             # /scenario/world/region[@name='USA']/supplysector[@name='refining']/subsector[@name='biomass liquids']/share-weight
-            subsect = '{}/{}[@name="{}"]/{}[@name="{}"]'.format(regionElt, supplysectorTag, supplysector, subsectorTag,
-                                                                subsector)
-            parameter = subsect + '/{}[@{}="{}"]'.format(nodeName, attributeName, attributeValue)
-            parameterElement = ET.Element(str(nodeName), {str(attributeName): str(attributeValue)})
+            subsect = index.selectOne((region, supplysector, subsector), tag=subsectorTag)
+            parameter = '{}[@{}="{}"]'.format(nodeName, attributeName, attributeValue)
+            parameterElements = subsect.xpath(parameter)
 
-            if not xmlSel(xmlFileAbs, parameter):
+            if not parameterElements:
                 parameterElement = ET.Element(str(nodeName), {str(attributeName): str(attributeValue)})
                 xmlIns(xmlFileAbs, subsect, parameterElement)
+                parameterElements = [parameterElement]
 
-            args.append((parameter, coercible(nodeValue, float)))
+            args += [(elt, coercible(nodeValue, float)) for elt in parameterElements]
 
         xmlEdit(xmlFileAbs, args)
         self.updateScenarioComponent(configFileTag, xmlFileRel)
@@ -1925,7 +2277,7 @@ class XMLEditor(object):
                      regions, sector, subsector, stubTechnology, self.name)
         # _logger.info(printSeries(values, 'share-weights', asStr=True))
 
-        xmlFileRel, xmlFileAbs = self.getLocalCopy(configFileTag)
+        xmlFileRel, xmlFileAbs = self.getLocalCopy(configFileTag, override=True)
 
         item = CachedFile.getFile(xmlFileAbs)
         tree = item.tree
@@ -1933,35 +2285,36 @@ class XMLEditor(object):
         # convert to a list; if no regions given, get list of regions in this file
         regionList = splitAndStrip(regions, ',') if regions else tree.xpath('//region/@name')
 
+        index = item.getIndex()
         args = []
 
         for region in regionList:
-            regionElt = '//region[@name="{}"]'.format(region)
-
             # /scenario/world/region[@name='USA']/supplysector[@name='refining']/subsector[@name='biomass liquids']/share-weight
-            subsect = '{}/{}[@name="{}"]/{}[@name="{}"]'.format(regionElt, supplysectorTag, sector, subsectorTag, subsector)
+            subsectKey = (region, sector, subsector)
 
             for year, value in expandYearRanges(values):
 
                 if stubTechnology:
-                    stubTech = subsect + '/{}[@name="{}"]'.format(technologyTag, stubTechnology)
-                    sw_parent = stubTech + '/period[@year="{}"]'.format(year)
-                    share_weight = sw_parent + '/share-weight'
+                    stubTechKey = subsectKey + (stubTechnology,)
+                    sw_parent = index.selectOne(stubTechKey + (year,), tag='period', required=False)
+                    share_weight = 'share-weight'
 
-                    if not xmlSel(xmlFileAbs, sw_parent):
-                        elt = ET.Element('period', attrib={'year': str(year)})
-                        xmlIns(xmlFileAbs, stubTech, elt)
+                    if sw_parent is None:
+                        sw_parent = ET.Element('period', attrib={'year': str(year)})
+                        xmlIns(xmlFileAbs, index.selectOne(stubTechKey, tag=technologyTag), sw_parent)
 
                 else:  # subsector level
-                    sw_parent = subsect
-                    share_weight = sw_parent + '/share-weight[@year="{}"]'.format(year)
+                    sw_parent = index.selectOne(subsectKey, tag=subsectorTag)
+                    share_weight = 'share-weight[@year="{}"]'.format(year)
 
-                if not xmlSel(xmlFileAbs, share_weight):
+                share_weights = sw_parent.xpath(share_weight)
+                if not share_weights:
                     attrib = {} if stubTechnology else {'year': str(year)}
                     elt = ET.Element('share-weight', attrib=attrib)
                     xmlIns(xmlFileAbs, sw_parent, elt)
+                    share_weights = [elt]
 
-                args.append((share_weight, coercible(value, float)))
+                args += [(elt, coercible(value, float)) for elt in share_weights]
 
         xmlEdit(xmlFileAbs, args)
         self.updateScenarioComponent(configFileTag, xmlFileRel)
@@ -1992,7 +2345,7 @@ class XMLEditor(object):
         _logger.info("Set global-technology-database share-weights for (%s, %s) to %s for %s",
                      sector, technology, values, self.name)
 
-        enTransFileRel, enTransFileAbs = self.getLocalCopy(configFileTag)
+        enTransFileRel, enTransFileAbs = self.getLocalCopy(configFileTag, override=True)
 
         prefix = "//global-technology-database/location-info[@sector-name='{}' and @subsector-name='{}']/technology[@name='{}']".format(
                  sector, subsector, technology)
@@ -2028,7 +2381,7 @@ class XMLEditor(object):
                      energyInput, technology, subsector, values)
 
         enTransFileRel, enTransFileAbs = \
-            self.getLocalCopy(ENERGY_TRANSFORMATION_TAG)
+            self.getLocalCopy(ENERGY_TRANSFORMATION_TAG, override=True)
 
         prefix = "//global-technology-database/location-info[@subsector-name='%s']/technology[@name='%s']" % \
                  (subsector, technology)
@@ -2080,7 +2433,7 @@ class XMLEditor(object):
         _logger.info("Set Non-CO2 emissions for (%s, %s, %s, %s, %s) to %s for %s",
                      region, sector, subsector, stubTechnology, species, values, self.name)
 
-        xmlFileRel, xmlFileAbs = self.getLocalCopy(configFileTag)
+        xmlFileRel, xmlFileAbs = self.getLocalCopy(configFileTag, override=True)
 
         # //region[@name='USA']/supplysector[@name='N fertilizer']/subsector[@name='gas']/stub-technology[@name='gas']/period[@year='2005']/Non-CO2[@name='CH4']/input-emissions
         xpath = "//region[@name='{region}']/supplysector[@name='{sector}']/subsector[@name='{subsector}']/stub-technology[@name='{stubTechnology}']/period[@year='%s']/Non-CO2[@name='{species}']/input-emissions".\
@@ -2105,39 +2458,27 @@ class XMLEditor(object):
 
         xmlFileRel, xmlFileAbs = self.getLocalCopy(xmlTag)
         fileObj = CachedFile.getFile(xmlFileAbs)
-        tree = fileObj.tree
-
-        xml_template = "//region[@name='{region}']/supplysector[@name='{sector}']/tranSubsector[@name='{subsector}']/stub-technology[@name='{technology}']/"
+        index = fileObj.getIndex()
 
+        # region/supplysector/tranSubsector/stub-technology/period/minicam-energy-input/coefficient
         pairs = []
 
         for (idx, row) in df.iterrows():
-            xpath_prefix = xml_template.format(**row)
-            input = row['input']
+            techKey = (row['region'], row['sector'], row['subsector'], row['technology'])
+            path = "minicam-energy-input[@name='{}']/coefficient".format(row['input'])
 
             for year in year_cols:
                 improvement = row[year]
                 if improvement == 0:
                     continue
 
-                xpath = xpath_prefix + "period[@year='{year}']/minicam-energy-input[@name='{input}']/coefficient".format(
-                    year=year, input=input)
-                elts = tree.xpath(xpath)
-
-                if elts is None:
-                    raise SetupException('XPath query {} on file "{}" failed to find an element'.format(xpath, xmlFileAbs))
-
-                if len(elts) != 1:
-                    raise SetupException(
-                        'XPath query {} on file "{}" returned multiple elements'.format(xpath, xmlFileAbs))
-
-                elt = elts[0]
+                elt = index.selectOne(techKey + (year,), path=path, tag='period')
                 old_value = float(elt.text)
                 # The coefficient in the XML file is in energy per output unit (e.g., vehicle-km or passenger-km).
                 # A value of 1 in the CSV template, which indicates a 100% improvement (a doubling) of fuel economy,
                 # should drop the coefficient value by 50%. Thus the following calculation:
                 new_value = old_value / (1 + improvement)
-                pairs.append((xpath, new_value))
+                pairs.append((elt, new_value))
 
         xmlEdit(xmlFileAbs, pairs)
         self.updateScenarioComponent(xmlTag, xmlFileRel)
@@ -2191,18 +2532,17 @@ class XMLEditor(object):
         def runForFile(tag, which):
             fileRel, fileAbs = self.getLocalCopy(tag)
             fileObj = CachedFile.getFile(fileAbs)
-            tree = fileObj.tree
+            index = fileObj.getIndex()
 
-            if which == 'GCAM-USA':
-                xml_template = "//global-technology-database/location-info[@sector-name='{sector}' and @subsector-name='{subsector}']/technology[@name='{technology}']/"
-            else:
-                xml_template = "//region[@name='{region}']/supplysector[@name='{sector}']/subsector[@name='{subsector}']/stub-technology[@name='{technology}']/"
+            # For GCAM-USA, global-technology-database/location-info/technology/period/...
+            # otherwise, region/supplysector/subsector/stub-technology/period/...
+            globalTech = (which == 'GCAM-USA')
 
             subdf = df.query('which == "{}"'.format(which))
 
             for (idx, row) in subdf.iterrows():
-                xpath_prefix = xml_template.format(**row)
-                input = row['input']
+                techKey = (None if globalTech else row['region'], row['sector'], row['subsector'], row['technology'])
+                path = "minicam-energy-input[@name='{}']/efficiency".format(row['input'])
                 subsector  = row['subsector']
                 pairs = []
 
@@ -2211,16 +2551,7 @@ class XMLEditor(object):
                     if improvement == 0:
                         continue
 
-                    xpath = xpath_prefix + "period[@year='{year}']/minicam-energy-input[@name='{input}']/efficiency".format(year=year, input=input)
-                    elts = tree.xpath(xpath)
-
-                    if elts is None:
-                        raise SetupException('XPath query {} on file "{}" failed to find an element'.format(xpath, fileAbs))
-
-                    if len(elts) != 1:
-                        raise SetupException('XPath query {} on file "{}" returned multiple elements'.format(xpath, fileAbs))
-
-                    elt = elts[0]
+                    elt = index.selectOne(techKey + (year,), path=path, tag='period')
                     old_value = float(elt.text)
                     new_value = compute(old_value, improvement, subsector)
                     pairs.append((year, new_value))
@@ -2360,18 +2691,14 @@ class XMLEditor(object):
         def runForFile(tag, which):
             fileRel, fileAbs = self.getLocalCopy(tag)
             fileObj = CachedFile.getFile(fileAbs)
-            tree = fileObj.tree
-            xml_template = "//global-technology-database/location-info[@sector-name='{sector}' and @subsector-name='{subsector}']/technology[@name='{technology}']/"
-#            if which == 'GCAM-USA':
-#                xml_template = "//global-technology-database/location-info[@sector-name='{sector}' and @subsector-name='{subsector}']/technology[@name='{technology}']/"
-#            else:
-#                xml_template = "//region[@name='{region}']/supplysector[@name='{sector}']/subsector[@name='{subsector}']/stub-technology[@name='{technology}']/"
+            index = fileObj.getIndex()
 
+            # Both use global-technology-database/location-info/technology/period/...
             subdf = df.query('which == "{}"'.format(which))
 
             for (idx, row) in subdf.iterrows():
-                xpath_prefix = xml_template.format(**row)
-                input = row['input']
+                techKey = (None, row['sector'], row['subsector'], row['technology'])
+                path = "minicam-energy-input[@name='{}']/efficiency".format(row['input'])
                 subsector  = row['subsector']
                 pairs = []
 
@@ -2380,19 +2707,7 @@ class XMLEditor(object):
                     if improvement == 0:
                         continue
 
-                    xpath = xpath_prefix + "period[@year='{year}']/minicam-energy-input[@name='{input}']/efficiency".format(year=year, input=input)
-                    elts = tree.xpath(xpath)
-
-                    if elts is None:
-                        raise SetupException('XPath query {} on file "{}" failed to find an element'.format(xpath, fileAbs))
-
-                    if len(elts) == 0:
-                        raise SetupException('XPath query {} on file "{}" returned zero elements'.format(xpath, fileAbs))
-
-                    if len(elts) != 1:
-                        raise SetupException('XPath query {} on file "{}" returned multiple elements'.format(xpath, fileAbs))
-
-                    elt = elts[0]
+                    elt = index.selectOne(techKey + (year,), path=path, tag='period')
                     old_value = float(elt.text)
                     new_value = compute(old_value, improvement, subsector)
                     pairs.append((year, new_value))
@@ -0,0 +1,160 @@
+import threading
+import unittest
+
+from pygcam.mcs.completion import CompletionQueue, LocalClient
+
+
+def square(x):
+    return x * x
+
+def fail(x):
+    raise ValueError("task %s failed" % x)
+
+
+class HubResult(object):
+    """
+    Like ipyparallel's AsyncHubResult, whose completion is found only by polling:
+    "done" callbacks are never run.
+    """
+    def __init__(self, ar):
+        self.ar = ar
+        self.msg_ids = ar.msg_ids
+
+    def add_done_callback(self, func):
+        pass
+
+    def ready(self):
+        return self.ar.done()
+
+    def get(self, timeout=None):
+        return self.ar.get(timeout=timeout)
+
+
+class HubClient(LocalClient):
+    def resubmit(self, msg_ids):
+        return HubResult(super(HubClient, self).resubmit(msg_ids))
+
+
+class TestCompletion(unittest.TestCase):
+    def setUp(self):
+        self.client = LocalClient(engines=4)
+        self.view = self.client.load_balanced_view()
+
+    def tearDown(self):
+        self.client.close()
+
+    def drainAll(self, completed):
+        done = []
+        while len(completed):
+            batch = completed.drain(timeout=5)
+            self.assertTrue(batch, 'Timed out waiting for tasks to complete')
+            done.extend(batch)
+
+        return done
+
+    def test_results(self):
+        completed = CompletionQueue()
+        ars = [self.view.map_async(square, [i]) for i in range(20)]
+        for ar in ars:
+            completed.watch(ar)
+
+        done = self.drainAll(completed)
+        self.assertEqual(len(done), 20)
+        self.assertEqual(sorted(ar.get()[0] for ar in done), [i * i for i in range(20)])
+        self.assertEqual(self.client.queue_status()[0]['completed'], 20)
+
+    def test_batch_size(self):
+        completed = CompletionQueue()
+        ars = [self.view.map_async(square, [i]) for i in range(10)]
+        for ar in ars:
+            ar.result(timeout=5)
+            completed.watch(ar)
+
+        batch = completed.drain(timeout=5, maxBatch=3)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(len(completed), 7)
+
+    def test_timeout(self):
+        completed = CompletionQueue()
+        event = threading.Event()
+        ar = self.view.map_async(lambda x: event.wait(5), [1])
+        completed.watch(ar)
+
+        self.assertEqual(completed.drain(timeout=0.1), [])
+        event.set()
+        self.assertEqual(len(self.drainAll(completed)), 1)
+
+    def test_dependency(self):
+        order = []
+        event = threading.Event()
+
+        def baseline(x):
+            event.wait(5)
+            order.append('baseline')
+
+        def policy(x):
+            order.append('policy')
+
+        baseAR = self.view.map_async(baseline, [1])
+        with self.view.temp_flags(after=baseAR):
+            policyAR = self.view.map_async(policy, [1])
+
+        event.set()
+        policyAR.result(timeout=5)
+        self.assertEqual(order, ['baseline', 'policy'])
+
+    def test_failed_dependency(self):
+        baseAR = self.view.map_async(fail, [1])
+        with self.view.temp_flags(after=baseAR):
+            policyAR = self.view.map_async(square, [1])
+
+        self.assertIsNotNone(policyAR.exception(timeout=5))
+
+    def test_resubmit(self):
+        ar = self.view.map_async(square, [3])
+        self.assertEqual(ar.get(timeout=5), [9])
+
+        newAR = self.client.resubmit(ar.msg_ids)
+        self.assertNotEqual(newAR.msg_ids, ar.msg_ids)
+        self.assertEqual(newAR.get(timeout=5), [9])
+
+    def test_polled_resubmit(self):
+        client = HubClient(engines=2)
+        try:
+            view = client.load_balanced_view()
+            completed = CompletionQueue()
+            ar = view.map_async(square, [4])
+            completed.watch(ar)
+            self.assertEqual(completed.drain(timeout=5), [ar])
+
+            newAR = client.resubmit(ar.msg_ids)
+            completed.watch(newAR, poll=True)
+            self.assertEqual(len(completed), 1)
+
+            # Without polling, the result is never queued
+            newAR.ar.result(timeout=5)
+            self.assertEqual(completed.drain(timeout=0.1), [])
+
+            self.assertEqual(completed.poll(), 1)
+            self.assertEqual(completed.drain(timeout=5), [newAR])
+            self.assertEqual(len(completed), 0)
+            self.assertEqual(newAR.get(), [16])
+        finally:
+            client.close()
+
+    def test_processes(self):
+        client = LocalClient(engines=2, processes=True)
+        try:
+            view = client.load_balanced_view()
+            baseAR = view.map_async(square, [2])
+            with view.temp_flags(after=baseAR):
+                policyAR = view.map_async(square, [3])
+
+            self.assertEqual(policyAR.get(timeout=30), [9])
+            self.assertEqual(baseAR.get(timeout=30), [4])
+        finally:
+            client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,8 +2,11 @@ import os
 import shutil
 from unittest import TestCase
 
+import numpy as np
+import pandas as pd
+
 from pygcam.query import readCsv, readQueryResult
-from pygcam.diff import computeDifference
+from pygcam.diff import computeDifference, DiffEngine, _alignedDifference
 from pygcam.utils import QueryResultsDir, mkdirs
 
 class TestDiffCmd(TestCase):
@@ -51,5 +54,60 @@ class TestDiffCmd(TestCase):
         bools = abs(testDiff[yearCols]) > 1e-8
         self.assertFalse(bools.all().all())
 
+class TestDiffEngine(TestCase):
+    """
+    Check that DiffEngine.diff produces the same results as the pandas alignment
+    in _alignedDifference, which it replaces except in the fallback cases.
+    """
+    def frame(self, rows):
+        return pd.DataFrame(rows, columns=['region', 'sector', 'Units', '2015', '2020'])
+
+    def setUp(self):
+        self.ref = self.frame([
+            ['USA',   'corn',  'EJ', 1.0, 2.0],
+            ['USA',   'wheat', 'EJ', 3.0, 4.0],
+            ['China', 'corn',  'EJ', 5.0, 6.0],
+            ['China', np.nan,  'EJ', 7.0, 8.0],
+            ['Japan', 'rice',  'EJ', 9.0, 10.0],
+        ])
+        self.other = self.frame([
+            ['China', np.nan,  'EJ', 17.0, 18.0],    # NaN key
+            ['USA',   'wheat', 'EJ', 13.0, 14.0],
+            ['USA',   'corn',  'EJ', 11.0, 12.0],
+            ['China', 'corn',  'EJ', 15.0, 16.0],
+            ['India', 'corn',  'EJ', 19.0, 20.0],    # not in the reference
+        ])                                          # Japan/rice is missing
+
+    def assertSameDiff(self, ref, other, **kwargs):
+        engine = DiffEngine(ref)
+        expected = _alignedDifference(ref, other, **kwargs)
+        actual = engine.diff(other, **kwargs)
+
+        # the fallback doesn't preserve the order of the key columns or rows
+        def normalize(df):
+            keyCols = engine.keyCols
+            return df[keyCols + engine.yearCols].sort_values(keyCols).reset_index(drop=True)
+
+        pd.testing.assert_frame_equal(normalize(actual), normalize(expected))
+        return engine
+
+    def test_nan_keys_and_missing_rows(self):
+        engine = self.assertSameDiff(self.ref, self.other)
+        self.assertTrue(engine.usable)
+
+    def test_missing_rows_in_other(self):
+        self.assertSameDiff(self.other, self.ref)
+
+    def test_duplicate_reference_keys(self):
+        ref = pd.concat([self.ref, self.ref.iloc[[0]]], ignore_index=True)
+        engine = self.assertSameDiff(ref, self.other)
+        self.assertFalse(engine.usable)
 
+    def test_percent_change_zero_baseline(self):
+        ref = self.ref.copy()
+        ref.loc[0, '2015'] = 0.0                     # nonzero change from zero: inf
+        ref.loc[1, ['2015', '2020']] = 0.0
+        other = self.other.copy()
+        other.loc[1, '2015'] = 0.0                   # no change from zero: NaN, dropped
 
+        self.assertSameDiff(ref, other, asPercentChange=True)
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from lxml import etree as ET
+
+from pygcam.error import SetupException
+from pygcam.xmlEditor import CachedFile, xmlEdit, xmlIns
+
+XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<scenario>
+  <world>
+    <region name="USA">
+      <supplysector name="resid heating">
+        <subsector name="gas">
+          <share-weight year="1975">1</share-weight>
+          <stub-technology name="gas furnace">
+            <period year="2015">
+              <minicam-energy-input name="gas">
+                <efficiency>0.8</efficiency>
+              </minicam-energy-input>
+            </period>
+          </stub-technology>
+        </subsector>
+      </supplysector>
+    </region>
+    <global-technology-database>
+      <location-info sector-name="resid heating" subsector-name="gas">
+        <technology name="gas furnace">
+          <period year="2015">
+            <minicam-energy-input name="gas">
+              <efficiency>0.7</efficiency>
+            </minicam-energy-input>
+          </period>
+        </technology>
+      </location-info>
+    </global-technology-database>
+  </world>
+</scenario>
+'''
+
+TECH = ('USA', 'resid heating', 'gas', 'gas furnace')
+EFFICIENCY = "minicam-energy-input[@name='gas']/efficiency"
+
+
+class TestElementIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpDir, 'building.xml')
+        with open(self.filename, 'w') as f:
+            f.write(XML)
+
+        self.item = CachedFile.getFile(self.filename)
+        self.index = self.item.getIndex()
+
+    def tearDown(self):
+        del CachedFile.cache[self.item.filename]
+        shutil.rmtree(self.tmpDir)
+
+    def test_select(self):
+        index = self.index
+        self.assertEqual(index.selectOne(TECH[:3], tag='subsector').get('name'), 'gas')
+        self.assertEqual(index.selectOne(TECH + (2015,), path=EFFICIENCY).text, '0.8')
+        self.assertEqual(index.selectOne((None,) + TECH[1:] + (2015,), path=EFFICIENCY).text, '0.7')
+
+        self.assertEqual(index.select(TECH[:3], tag='tranSubsector'), [])
+        self.assertIsNone(index.selectOne(TECH + (2020,), required=False))
+        self.assertRaises(SetupException, index.selectOne, TECH + (2020,))
+
+    def test_inserted_elements(self):
+        tech = self.index.selectOne(TECH, tag='stub-technology')
+        period = ET.Element('period', year='2020')
+        ET.SubElement(period, 'share-weight').text = '0'
+        xmlIns(self.filename, tech, period)
+
+        self.assertIs(self.index.selectOne(TECH + (2020,)), period)
+        self.assertIs(self.item.getIndex(), self.index)
+
+    def test_edit_elements(self):
+        elt = self.index.selectOne(TECH + (2015,), path=EFFICIENCY)
+        xmlEdit(self.filename, [(elt, 0.5)], op='add')
+
+        self.assertEqual(float(self.item.tree.xpath('//region/*/*/*/period/*/efficiency')[0].text), 1.3)
+        self.assertTrue(self.item.edited)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from pygcam.config import getConfig, setParam
+from pygcam.error import GcamError, GcamSolverError
+from pygcam.gcam import GcamOutputScanner, _gcamWrapper
+
+# Abridged from GCAM's console output. The base period isn't solved.
+OUTPUT = b'''Parsing input files...
+XML parsing complete.
+Starting new scenario
+Period 0: 1975
+Period 1: 1990
+Model solved normally: worldCalcCount = 12; Total Solver Iterations: 3
+Period 2: 2005
+Model solved normally: worldCalcCount = 345; Total Solver Iterations: 27
+Period 3: 2010
+Model solved normally: worldCalcCount = 2075; Total Solver Iterations: 41
+Data Readin, Model Run & Write Time: 58.9 seconds.
+Model run completed.
+'''
+
+class TestGcamWrapper(unittest.TestCase):
+    def setUp(self):
+        getConfig()
+        self.tmpDir = tempfile.mkdtemp()
+        self.logFile = os.path.join(self.tmpDir, 'logs', 'gcam-console.log')
+        setParam('GCAM.WrapperLogFile', self.logFile)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir, ignore_errors=True)
+
+    def fakeGcam(self, output):
+        script = os.path.join(self.tmpDir, 'gcam.py')
+        with open(script, 'w') as f:
+            f.write('import sys\nsys.stdout.write(%r)\n' % output.decode('utf-8'))
+        return [sys.executable, script]
+
+    def test_split_lines(self):
+        events = []
+        scanner = GcamOutputScanner(progress=events.append)
+        for i in range(0, len(OUTPUT), 7):     # lines and patterns split across buffers
+            scanner.feed(OUTPUT[i:i + 7])
+        scanner.close()
+
+        self.assertEqual([(e.period, e.year, e.iterations) for e in events],
+                         [(0, 1975, None), (1, 1990, 12), (2, 2005, 345), (3, 2010, 2075)])
+
+    def test_wrapper_log_and_progress(self):
+        events = []
+        status = _gcamWrapper(self.fakeGcam(OUTPUT), progress=events.append)
+        self.assertEqual(status, 0)
+        self.assertEqual(len(events), 4)
+
+        with open(self.logFile, 'rb') as f:
+            self.assertEqual(f.read(), OUTPUT)
+
+    def test_errors(self):
+        self.assertRaises(GcamSolverError, _gcamWrapper,
+                          self.fakeGcam(OUTPUT + b'Model did not solve within set iteration 2005\n'))
+        self.assertRaises(GcamError, _gcamWrapper,
+                          self.fakeGcam(OUTPUT + b'Error: BaseXException: no db\n'))
+
+
+if __name__ == "__main__":
+    unittest.main()
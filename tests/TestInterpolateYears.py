@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from pygcam.query import interpolateYears, _interpolateYearsByColumn
+
+class TestInterpolateYears(unittest.TestCase):
+    """
+    Check that interpolateYears produces the same values as the original
+    implementation, _interpolateYearsByColumn.
+    """
+    def setUp(self):
+        # irregular timesteps, including an annual step, and NaNs at either end of an interval
+        self.df = pd.DataFrame({
+            'region': ['USA', 'China', 'India', 'Japan'],
+            'Units':  ['EJ', 'EJ', 'EJ', 'EJ'],
+            '2005':   [1.0,  2.0,    np.nan, 4.0],
+            '2010':   [6.0,  3.0,    5.0,    np.nan],
+            '2015':   [11.0, 1.0,    7.0,    8.0],
+            '2016':   [12.0, 0.0,    9.0,    8.5],
+            '2025':   [30.0, 9.0,    0.0,    -1.0],
+        }, columns=['region', 'Units', '2005', '2010', '2015', '2016', '2025'])
+
+    def assertSameResult(self, startYear=0, inplace=False):
+        df = self.df.copy()
+        expected = _interpolateYearsByColumn(self.df.copy(), startYear=startYear)
+        actual = interpolateYears(df, startYear=startYear, inplace=inplace)
+
+        # the original doesn't preserve the order of the non-year columns
+        expected = expected[list(actual.columns)]
+        pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+        return df, actual
+
+    def test_no_start_year(self):
+        self.assertSameResult()
+
+    def test_start_year_before_interval(self):
+        self.assertSameResult(startYear=2000)
+
+    def test_start_year_inside_interval(self):
+        self.assertSameResult(startYear=2008)
+        self.assertSameResult(startYear=2019)
+
+    def test_start_year_after_interval(self):
+        self.assertSameResult(startYear=2030)
+
+    def test_not_inplace(self):
+        df, _ = self.assertSameResult(startYear=2008)
+        pd.testing.assert_frame_equal(df, self.df)
+
+    def test_inplace(self):
+        df, result = self.assertSameResult(startYear=2008, inplace=True)
+        self.assertEqual(set(df.columns), set(result.columns))
+        pd.testing.assert_frame_equal(df[list(result.columns)], result, check_exact=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
 import unittest
+import filecmp
 import os
+import shutil
 import subprocess
-from pygcam.landProtection import _makeLandClassXpath, _makeRegionXpath, protectLand, runProtectionScenario
+import tempfile
+from pygcam.landProtection import (_makeLandClassXpath, _makeRegionXpath, protectLand, runProtectionScenario,
+                                   parseLandProtectionFile, protectLandStream)
 from pygcam.windows import IsWindows
 
 class TestLandProtection(unittest.TestCase):
@@ -57,7 +61,9 @@ class TestLandProtection(unittest.TestCase):
     def test_protection_scenario(self):
         scenarioName = 'test'
         xmlDir = os.path.join('data', 'xml')
-        tmpDir = os.path.join('data', 'tmp')
+        tmpDir = os.path.join('data', 'tmp')    # not under version control
+        if not os.path.isdir(tmpDir):
+            os.makedirs(tmpDir)
 
         scenarioFile = os.path.join(xmlDir, 'protection.xml')
 
@@ -72,6 +78,32 @@ class TestLandProtection(unittest.TestCase):
 
             self.assertFilesEqual(outfile, testfile)
 
+    def test_stream_matches_tree(self):
+        scenarioName = 'test'
+        xmlDir = os.path.join('data', 'xml')
+        tmpDir = tempfile.mkdtemp()
+
+        landProtection = parseLandProtectionFile(os.path.join(xmlDir, 'protection.xml'))
+
+        try:
+            for num in (2, 3):
+                infile = os.path.join(xmlDir, 'partial_land_input_%d.xml' % num)
+                treeFile   = os.path.join(tmpDir, 'tree_%d.xml' % num)
+                streamFile = os.path.join(tmpDir, 'stream_%d.xml' % num)
+
+                landProtection.protectLand(infile, treeFile, scenarioName, backup=False)
+                protectLandStream(infile, streamFile, scenarioName, backup=False)
+                self.assertTrue(filecmp.cmp(treeFile, streamFile, shallow=False),
+                                'Files %s and %s differ' % (treeFile, streamFile))
+
+                # in place, reading from the backup file
+                shutil.copy(infile, streamFile)
+                protectLandStream(streamFile, streamFile, scenarioName)
+                self.assertTrue(filecmp.cmp(treeFile, streamFile, shallow=False))
+                self.assertTrue(filecmp.cmp(infile, streamFile + '~', shallow=False))
+        finally:
+            shutil.rmtree(tmpDir)
+
 
 if __name__ == "__main__":
     unittest.main()
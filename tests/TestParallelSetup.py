@@ -0,0 +1,135 @@
+import argparse
+import os
+import shutil
+import six
+import tempfile
+import unittest
+
+from pygcam.config import getConfig, getParam, setParam
+from pygcam.error import PygcamException, SetupException
+from pygcam.project import projectMain
+from pygcam.tool import GcamTool
+
+PROJECT_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<projects>
+  <project name="test">
+    <scenariosFile name="{tmpDir}/scenarios.xml"/>
+    <steps>
+{steps}
+    </steps>
+  </project>
+</projects>
+'''
+
+SCENARIOS_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<scenarios name="test" defaultGroup="group">
+  <scenarioGroup name="group" useGroupDir="0">
+    <scenario name="base" baseline="1"/>
+    <scenario name="pol1"/>
+    <scenario name="pol2"/>
+    <scenario name="pol3"/>
+  </scenarioGroup>
+</scenarios>
+'''
+
+# Each step records "{scenario} {step}" in the log file
+STEP = '      <step name="{name}" runFor="{runFor}">@steplog {{scenario}} {name} -l {log} {opts}</step>'
+
+class TestParallelSetup(unittest.TestCase):
+    def setUp(self):
+        getConfig()
+        self.tmpDir = tempfile.mkdtemp()
+        self.logFile = os.path.join(self.tmpDir, 'steps.log')
+
+        self.oldParams = {name: getParam(name, raw=True) for name in ('GCAM.PluginPath', 'GCAM.PluginCacheFile')}
+        pluginDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'plugins')
+        setParam('GCAM.PluginPath', pluginDir)
+        setParam('GCAM.PluginCacheFile', '')
+        self.tool = GcamTool.getInstance(reload=True)
+        self.tool.shellArgs = []
+
+        with open(os.path.join(self.tmpDir, 'scenarios.xml'), 'w') as f:
+            f.write(SCENARIOS_XML)
+
+    def tearDown(self):
+        for name, value in self.oldParams.items():
+            setParam(name, value)
+        shutil.rmtree(self.tmpDir, ignore_errors=True)
+
+    def runProject(self, steps, noQuit=False):
+        """
+        Run a project with the given (name, runFor, opts) steps, setting up the
+        policy scenarios in 2 processes, and return the lines of the log file.
+        """
+        stepXml = '\n'.join(STEP.format(name=name, runFor=runFor, log=self.logFile, opts=opts)
+                            for name, runFor, opts in steps)
+
+        projectFile = os.path.join(self.tmpDir, 'project.xml')
+        with open(projectFile, 'w') as f:
+            f.write(PROJECT_XML.format(tmpDir=self.tmpDir, steps=stepXml))
+
+        args = argparse.Namespace(setupJobs=2, distribute=False, noRun=False, noQuit=noQuit,
+                                  sandboxDir=os.path.join(self.tmpDir, 'sandboxes'),
+                                  listGroups=False, listSteps=False, listScenarios=False, vars=False,
+                                  projectFile=projectFile, projectName='test', group='group',
+                                  allGroups=False, steps=None, skipSteps=None, scenarios=None,
+                                  skipScenarios=None)
+        projectMain(args, self.tool)
+
+        with open(self.logFile) as f:
+            return f.read().splitlines()
+
+    def test_parallel_setup(self):
+        lines = self.runProject([('setup', 'all', ''), ('gcam', 'all', '')])
+
+        # the policy setups run after the baseline's steps and before the other policy steps
+        self.assertEqual(lines[:2], ['base setup', 'base gcam'])
+        self.assertEqual(sorted(lines[2:5]), ['pol1 setup', 'pol2 setup', 'pol3 setup'])
+        self.assertEqual(sorted(lines[5:]), ['pol1 gcam', 'pol2 gcam', 'pol3 gcam'])
+
+    def test_conflicting_writes(self):
+        sharedFile = os.path.join(self.tmpDir, 'shared.xml')
+        with open(sharedFile, 'w') as f:
+            f.write('<shared/>\n')
+
+        with self.assertRaises(SetupException):
+            self.runProject([('setup', 'baseline', ''),
+                             ('setup', 'policy', '-w ' + sharedFile),
+                             ('gcam', 'all', '')])
+
+        # no policy steps run after the setups
+        with open(self.logFile) as f:
+            self.assertEqual(sorted(f.read().splitlines()[2:]), ['pol1 setup', 'pol2 setup', 'pol3 setup'])
+
+    def test_sequential_setup(self):
+        # policies run a step before setup, so they're set up in order with their other steps
+        lines = self.runProject([('prep', 'policy', ''), ('setup', 'all', ''), ('gcam', 'all', '')])
+
+        self.assertEqual(lines[:2], ['base setup', 'base gcam'])
+
+        triples = sorted(tuple(lines[i:i + 3]) for i in range(2, len(lines), 3))
+        self.assertEqual(triples, [('%s prep' % name, '%s setup' % name, '%s gcam' % name)
+                                   for name in ('pol1', 'pol2', 'pol3')])
+
+    def test_failed_setup(self):
+        # with noQuit, a scenario whose setup fails is skipped and the others continue
+        lines = self.runProject([('setup', 'all', '-f pol2'), ('gcam', 'all', '')], noQuit=True)
+
+        self.assertEqual(sorted(lines[2:4]), ['pol1 setup', 'pol3 setup'])
+        self.assertEqual(sorted(lines[4:]), ['pol1 gcam', 'pol3 gcam'])
+
+        with self.assertRaises(PygcamException):
+            self.runProject([('setup', 'all', '-f pol2'), ('gcam', 'all', '')])
+
+    def test_unpicklable_error(self):
+        # lxml's exceptions can't be returned from a worker process, so they're converted
+        badFile = os.path.join(self.tmpDir, 'bad.xml')
+        with open(badFile, 'w') as f:
+            f.write('not XML\n')
+
+        with six.assertRaisesRegex(self, PygcamException, 'XMLSyntaxError'):
+            self.runProject([('setup', 'policy', '-w ' + badFile)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import sys
+import tempfile
+import shutil
+import unittest
+
+from pygcam.config import getConfig, getParam, setParam
+from pygcam.query import runModelInterface, runParallelQueryBatches
+
+QUERY_XML = '''<?xml version="1.0"?>
+<queries>
+  <aQuery>
+    <region name="USA"/>
+    <region name="China"/>
+    <emissionsQueryBuilder title="CO2 emissions by region"/>
+  </aQuery>
+</queries>
+'''
+
+LIBRARY_XML = '''<?xml version="1.0"?>
+<queries>
+  <queryGroup name="emissions">
+%s
+  </queryGroup>
+</queries>
+''' % '\n'.join('    <emissionsQueryBuilder title="query %d"/>' % i for i in range(7))
+
+class TestQueryBatches(unittest.TestCase):
+    def setUp(self):
+        getConfig()
+        self.tmpDir = tempfile.mkdtemp()
+        self.queryFile = os.path.join(self.tmpDir, 'query.xml')
+        with open(self.queryFile, 'w') as f:
+            f.write(QUERY_XML)
+
+        # Run the stand-in rather than ModelInterface
+        self.oldCommand = getParam('GCAM.MI.BatchCommand', raw=True)
+        standIn = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modelInterfaceStandIn.py')
+        setParam('GCAM.MI.BatchCommand', '"%s" "%s" -b "{batchFile}"' % (sys.executable, standIn))
+
+    def tearDown(self):
+        setParam('GCAM.MI.BatchCommand', self.oldCommand)
+        shutil.rmtree(self.tmpDir, ignore_errors=True)
+
+    def test_run_batch(self):
+        df = runModelInterface('base', self.tmpDir, csvFile='co2-base.csv',
+                               queryFile=self.queryFile, asDataFrame=True)
+        self.assertEqual(list(df.region), ['USA', 'China'])
+        self.assertEqual(list(df.scenario), ['base', 'base'])
+
+    def test_parallel_batches(self):
+        libraryFile = os.path.join(self.tmpDir, 'library.xml')
+        with open(libraryFile, 'w') as f:
+            f.write(LIBRARY_XML)
+
+        queries = ['query_%d' % i for i in range(7)] + ['#commented']
+        failed = runParallelQueryBatches('base', queries, 3, queryPath=libraryFile,
+                                         outputDir=self.tmpDir, regions=['USA'])
+        self.assertEqual(failed, [])
+        for i in range(7):
+            self.assertTrue(os.path.exists(os.path.join(self.tmpDir, 'query_%d-base.csv' % i)))
+
+        failed = runParallelQueryBatches('base', ['query_0', 'query_1'], 2, queryPath=libraryFile,
+                                         outputDir=self.tmpDir, regions=['USA'])
+        self.assertEqual(failed, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pygcam.config import getConfig, setParam, setUsingMCS
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+YEARS = ['y%d' % y for y in range(2010, 2101, 5)]
+
+def _timeseries(base):
+    return {col: base + i for i, col in enumerate(YEARS)}
+
+@unittest.skipIf(pyarrow is None, "the result store requires pyarrow")
+class TestResultStore(unittest.TestCase):
+    def setUp(self):
+        setUsingMCS(True)
+        getConfig(reload=True)
+
+        self.tmpDir = tempfile.mkdtemp()
+        setParam('MCS.RunSimsDir', self.tmpDir)
+        setParam('MCS.DbURL', 'sqlite:///' + os.path.join(self.tmpDir, 'mcs.sqlite'))
+        setParam('MCS.ResultStore', 'True')
+
+        from pygcam.mcs.Database import GcamDatabase, getDatabase, RUN_SUCCEEDED, RUN_FAILED
+        from pygcam.mcs.resultStore import ResultStore
+
+        GcamDatabase.close()
+        ResultStore.instances = {}
+
+        self.db = db = getDatabase()
+        self.simId = db.createSim(3, 'result store test')
+        db.createExp('base')
+        db.createOutput('total')
+        db.createOutput('emissions')
+
+        statuses = [RUN_SUCCEEDED, RUN_SUCCEEDED, RUN_FAILED]
+        with db.sessionScope() as session:
+            runs = [db.createRun(self.simId, trialNum, expName='base', status=status, session=session)
+                    for trialNum, status in enumerate(statuses)]
+            session.flush()
+            self.runIds = [run.runId for run in runs]
+
+    def tearDown(self):
+        from pygcam.mcs.Database import GcamDatabase
+
+        GcamDatabase.close()
+        shutil.rmtree(self.tmpDir, ignore_errors=True)
+        getConfig(reload=True)
+        setUsingMCS(False)
+
+    def addResults(self, store, trialNum, base):
+        runId = self.runIds[trialNum]
+        store.addResult(runId, trialNum, 'base', dict(paramName='total', isScalar=True, value=base))
+        store.addResult(runId, trialNum, 'base', dict(paramName='emissions', isScalar=False, regionName='USA',
+                                                      units='MtC', value=_timeseries(base)))
+
+    def test_latest_write_wins(self):
+        from pygcam.mcs.analysis import Analysis
+        from pygcam.mcs.resultStore import ResultStore
+
+        store = ResultStore.getInstance(self.simId)
+        for trialNum in range(3):
+            self.addResults(store, trialNum, 10.0 * trialNum)
+        store.flush()
+
+        self.addResults(store, 1, 99.0)     # re-save trial 1
+        store.flush()
+
+        df = self.db.getTimeSeriesDF(self.simId, 'emissions', ['base']).sort_values('runId')
+        self.assertEqual(list(df.runId), self.runIds)
+        self.assertEqual(list(df.y2010), [0.0, 99.0, 20.0])
+        self.assertEqual(list(df.y2100), [18.0, 117.0, 38.0])
+
+        results = Analysis(self.simId, ['base'], ['total']).getResults()
+        self.assertEqual(list(results['base']['total']), [0.0, 99.0, 20.0])
+
+    def test_backfill(self):
+        from pygcam.mcs.resultStore import ResultStore, backfillResultStore
+
+        db = self.db
+        regionId = db.getRegionId('USA')
+        for trialNum, runId in enumerate(self.runIds):
+            db.setOutValue(runId, 'total', 10.0 * trialNum)
+            db.saveTimeSeries(runId, regionId, 'emissions', _timeseries(10.0 * trialNum), units='MtC')
+
+        ResultStore.instances = {}
+        setParam('MCS.ResultStore', 'False')
+        expected = db.getTimeSeriesDF(self.simId, 'emissions', ['base'])
+
+        setParam('MCS.ResultStore', 'True')
+        backfillResultStore(self.simId)
+
+        # results of the failed run aren't copied
+        df = db.getTimeSeriesDF(self.simId, 'emissions', ['base'])
+        self.assertEqual(sorted(df.runId), self.runIds[:2])
+        self.assertEqual(df.sort_values('runId').y2010.tolist(), expected.sort_values('runId').y2010.tolist())
+
+        values = db.getOutValues(self.simId, 'base', 'total')
+        self.assertEqual(list(values.index), [0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from six import StringIO
+
+from pygcam.mcs.error import PygcamMcsUserError
+from pygcam.mcs.scheduler import TrialGraph
+
+
+class FakeContext(object):
+    def __init__(self, trialNum, scenario):
+        self.trialNum = trialNum
+        self.scenario = scenario
+
+
+# base <- policy <- policy2, and base <- other
+PARENTS = {'base': None, 'policy': 'base', 'policy2': 'policy', 'other': 'base'}
+DURATIONS = {'base': 30, 'policy': 20, 'policy2': 10, 'other': 5}
+
+
+class TestScheduler(unittest.TestCase):
+    def makeGraph(self, scenarios, trials=2, durations=DURATIONS):
+        graph = TrialGraph(PARENTS, durations=durations, defaultDuration=1)
+        for scenario in scenarios:
+            for trialNum in range(trials):
+                graph.addTrial(FakeContext(trialNum, scenario))
+        return graph
+
+    def test_multi_level_dependencies(self):
+        graph = self.makeGraph(['policy2', 'other', 'policy', 'base'])
+        graph.link()
+
+        node = graph.nodes[(1, 'policy2')]
+        self.assertEqual(node.parent.key, (1, 'policy'))
+        self.assertEqual(node.parent.parent.key, (1, 'base'))
+        self.assertEqual(graph.nodes[(0, 'other')].parent.key, (0, 'base'))
+
+    def test_skips_missing_ancestors(self):
+        graph = self.makeGraph(['policy2', 'base'])
+        graph.link()
+        self.assertEqual(graph.nodes[(0, 'policy2')].parent.key, (0, 'base'))
+
+        graph = self.makeGraph(['policy2'])
+        graph.link()
+        self.assertIsNone(graph.nodes[(0, 'policy2')].parent)
+
+    def test_priorities_and_order(self):
+        graph = self.makeGraph(['other', 'policy2', 'policy', 'base'])
+        order = graph.submissionOrder()
+
+        self.assertEqual(graph.nodes[(0, 'base')].priority, 60)
+        self.assertEqual(graph.criticalPath(), 60)
+
+        positions = {node.key: i for i, node in enumerate(order)}
+        for node in order:
+            if node.parent:
+                self.assertLess(positions[node.parent.key], positions[node.key])
+
+        # 'policy' is on the critical path, so it goes before 'other'
+        self.assertLess(positions[(0, 'policy')], positions[(0, 'other')])
+
+    def test_makespan(self):
+        graph = self.makeGraph(['base', 'policy', 'policy2', 'other'])
+        self.assertEqual(graph.makespan(100), 60)    # limited by critical path
+        self.assertEqual(graph.makespan(1), 130)     # serial: sum of all durations
+
+    def test_default_duration(self):
+        graph = self.makeGraph(['base', 'policy'], trials=1, durations={})
+        self.assertEqual(graph.criticalPath(), 2)
+
+    def test_circular_parents(self):
+        graph = TrialGraph({'a': 'b', 'b': 'a'})
+        graph.addTrial(FakeContext(0, 'a'))
+        self.assertRaises(PygcamMcsUserError, graph.link)
+
+    def test_print_plan(self):
+        graph = self.makeGraph(['base', 'policy'], trials=1)
+        out = StringIO()
+        graph.printPlan(4, file=out)
+        self.assertIn('Estimated makespan on 4 engines: 50.0 minutes', out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
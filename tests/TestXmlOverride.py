@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from lxml import etree as ET
+
+from pygcam.config import getConfig, setParam
+from pygcam.xmlEditor import CachedFile, OverrideFile, XMLEditor, applyOverride, xmlEdit, xmlIns
+
+SRC_FILE = os.path.join(os.path.dirname(__file__), 'data', 'xml', 'partial_land_input_2.xml')
+
+LEAF  = './/region[@name="Brazil"]//UnmanagedLandLeaf[@name="UnmanagedPastureAEZ04"]'
+XPATH = LEAF + '/landAllocation[@year="1990"]'
+
+
+class TestXmlOverride(unittest.TestCase):
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.addonFile = os.path.join(self.tmpDir, 'land_input_2-override.xml')
+
+    def tearDown(self):
+        for filename in list(CachedFile.cache):
+            if filename.startswith(os.path.realpath(self.tmpDir)):
+                del CachedFile.cache[filename]
+
+        shutil.rmtree(self.tmpDir)
+
+    def editedCopy(self, pairs, op='set'):
+        copyFile = os.path.join(self.tmpDir, 'land_input_2.xml')
+        shutil.copy(SRC_FILE, copyFile)
+        xmlEdit(copyFile, pairs, op=op)
+        return CachedFile.getFile(copyFile).tree
+
+    def applied(self, addonFile):
+        tree = ET.parse(SRC_FILE, CachedFile.parser)
+        applyOverride(tree, ET.parse(addonFile, CachedFile.parser))
+        return tree
+
+    def assertTreesEqual(self, tree1, tree2):
+        self.assertEqual(ET.tostring(tree1), ET.tostring(tree2))
+
+    def test_addon_holds_only_edits(self):
+        item = OverrideFile(self.addonFile, SRC_FILE)
+        xmlEdit(self.addonFile, [(XPATH, 2.0)], op='multiply')
+        item.write()
+
+        addon = ET.parse(self.addonFile)
+        self.assertEqual(len(addon.xpath('//landAllocation')), 1)
+        self.assertEqual(len(addon.xpath('//allocation')), 0)
+        self.assertEqual(addon.find('.//UnmanagedLandLeaf').get('name'), 'UnmanagedPastureAEZ04')
+        self.assertLess(os.path.getsize(self.addonFile), os.path.getsize(SRC_FILE) / 10)
+
+    def test_applied_addon_matches_full_copy(self):
+        pairs = [(XPATH, 2.0), ('.//region[@name="USA"]//landAllocation[@year="2005"]', 2.0)]
+
+        OverrideFile(self.addonFile, SRC_FILE)
+        xmlEdit(self.addonFile, pairs, op='multiply', useCache=False)
+
+        self.assertTreesEqual(self.applied(self.addonFile), self.editedCopy(pairs, op='multiply'))
+
+    def test_inserted_element(self):
+        item = OverrideFile(self.addonFile, SRC_FILE)
+        elt = ET.Element('protected-fraction')
+        elt.text = '0.9'
+        xmlIns(self.addonFile, LEAF, elt)
+        item.write()
+
+        addon = ET.parse(self.addonFile)
+        self.assertEqual(addon.findtext('.//UnmanagedLandLeaf/protected-fraction'), '0.9')
+        self.assertEqual(self.applied(self.addonFile).findtext(LEAF + '/protected-fraction'), '0.9')
+
+    def test_inherited_addon(self):
+        OverrideFile(self.addonFile, SRC_FILE)
+        xmlEdit(self.addonFile, [(XPATH, 2.0)], op='multiply', useCache=False)
+
+        childFile = os.path.join(self.tmpDir, 'child-override.xml')
+        OverrideFile(childFile, SRC_FILE, addonFiles=[self.addonFile])
+        xmlEdit(childFile, [(XPATH, 3.0)], op='multiply', useCache=False)
+
+        original = float(ET.parse(SRC_FILE).findtext(XPATH))
+        tree = self.applied(self.addonFile)
+        applyOverride(tree, ET.parse(childFile, CachedFile.parser))
+        self.assertEqual(float(tree.findtext(XPATH)), original * 2.0 * 3.0)
+
+
+CONFIG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<Configuration>
+  <ScenarioComponents>
+    <Value name="land2">../input/land_input_2.xml</Value>
+  </ScenarioComponents>
+</Configuration>
+"""
+
+class StubEditor(XMLEditor):
+    """
+    An XMLEditor with only the attributes needed to edit scenario components,
+    using a sandbox in `tmpDir`.
+    """
+    def __init__(self, tmpDir):
+        self.name = 'policy'
+        self.sandboxExeDir = os.path.join(tmpDir, 'exe')
+        self.scenario_dir_abs = os.path.join(tmpDir, 'local-xml', self.name)
+        self.scenario_dir_rel = '../local-xml/' + self.name
+        self.configPath = None
+        self.overrides = {}
+
+        for path in (self.sandboxExeDir, self.scenario_dir_abs, os.path.join(tmpDir, 'input')):
+            os.makedirs(path)
+
+        shutil.copy(SRC_FILE, os.path.join(tmpDir, 'input', 'land_input_2.xml'))
+        with open(self.cfgPath(), 'w') as f:
+            f.write(CONFIG_XML)
+
+
+class TestXMLEditorOverride(unittest.TestCase):
+    def setUp(self):
+        getConfig()
+        setParam('GCAM.XmlOverrides', 'True')
+        self.tmpDir = os.path.realpath(tempfile.mkdtemp())
+
+    def tearDown(self):
+        setParam('GCAM.XmlOverrides', 'False')
+        for filename in list(CachedFile.cache):
+            if filename.startswith(self.tmpDir):
+                del CachedFile.cache[filename]
+
+        shutil.rmtree(self.tmpDir)
+
+    def test_override_after_full_copy(self):
+        editor = StubEditor(self.tmpDir)
+
+        # edit a full copy, as setup methods that don't use add-on files do
+        fileRel, fileAbs = editor.getLocalCopy('land2')
+        xmlEdit(fileAbs, [(XPATH, '100')])
+        editor.updateScenarioComponent('land2', fileRel)
+
+        # the add-on file must start from the unwritten edits to the copy
+        editor.multiply('land2', XPATH, 2.0)
+        CachedFile.decacheAll()
+
+        cfg = ET.parse(editor.cfgPath())
+        paths = [os.path.join(editor.sandboxExeDir, elt.text) for elt in cfg.iterfind('.//Value')]
+        self.assertEqual(len(paths), 2)
+
+        tree = ET.parse(paths[0], CachedFile.parser)
+        self.assertEqual(float(tree.findtext(XPATH)), 100)
+
+        applyOverride(tree, ET.parse(paths[1], CachedFile.parser))
+        self.assertEqual(float(tree.findtext(XPATH)), 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import unittest
+
+from lxml import etree as ET
+
+from pygcam.config import getConfig, setParam
+from pygcam.error import XmlFormatError
+import pygcam.XMLFile as XMLFileModule
+from pygcam.XMLFile import XMLFile, getSchema
+
+EXAMPLES = os.path.join(os.path.dirname(XMLFileModule.__file__), 'etc', 'examples')
+SCHEMA = 'etc/project-schema.xsd'
+
+
+class TestXmlValidation(unittest.TestCase):
+    def setUp(self):
+        getConfig()
+        setParam('GCAM.ValidateXML', 'True')
+        XMLFileModule._validated.clear()
+        self.filename = os.path.join(EXAMPLES, 'project.xml')
+
+    def tearDown(self):
+        setParam('GCAM.ValidateXML', 'True')
+
+    def test_schema_compiled_once(self):
+        self.assertIs(getSchema(SCHEMA), getSchema(SCHEMA))
+
+    def test_validated_content_cached(self):
+        XMLFile(self.filename, schemaPath=SCHEMA)
+        self.assertEqual(len(XMLFileModule._validated), 1)
+
+        XMLFile(self.filename, schemaPath=SCHEMA)
+        self.assertEqual(len(XMLFileModule._validated), 1)
+
+    def test_modified_content_revalidated(self):
+        xml = XMLFile(self.filename, schemaPath=SCHEMA)
+        xml.getRoot().append(ET.Element('bogus'))
+
+        self.assertRaises(XmlFormatError, xml.validate)
+        self.assertFalse(xml.validate(raiseOnError=False))
+
+    def test_skip_validation(self):
+        xml = XMLFile(self.filename, schemaPath=SCHEMA)
+        xml.getRoot().append(ET.Element('bogus'))
+
+        setParam('GCAM.ValidateXML', 'False')
+        self.assertTrue(xml.validate())
+
+
+if __name__ == "__main__":
+    unittest.main()
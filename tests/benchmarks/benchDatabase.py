@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+'''
+Benchmark writing MCS results to the database, comparing the per-value
+path (setOutValue / saveTimeSeries) with the batched saveRunResults().
+
+Usage:
+    python benchDatabase.py [--url URL] [--trials N] [--outputs N]
+
+The default URL is a SQLite database in a temporary directory. To test
+Postgres, pass e.g. --url postgresql+psycopg2://mcsuser@localhost/mcsbench.
+N.B. the database at the given URL is dropped and re-initialized.
+'''
+from __future__ import print_function
+import argparse
+import tempfile
+import time
+
+from pygcam.config import getConfig, setParam, setUsingMCS
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Benchmark MCS result saving')
+    parser.add_argument('--url', default=None,
+                        help='Database URL. Default is a sqlite database in a temp dir.')
+    parser.add_argument('--trials', type=int, default=500,
+                        help='Number of trials (runs) to save results for. Default is 500.')
+    parser.add_argument('--outputs', type=int, default=50,
+                        help='Number of outputs per trial; half are timeseries. Default is 50.')
+    return parser.parse_args()
+
+def setupDatabase(args):
+    from pygcam.mcs.Database import getDatabase
+    from pygcam.mcs.util import YEAR_COL_PREFIX, activeYears
+
+    tmpDir = tempfile.mkdtemp()
+    url = args.url or 'sqlite:///%s/bench.sqlite' % tmpDir
+
+    setUsingMCS(True)     # load the MCS config defaults
+    getConfig(reload=True)
+    setParam('MCS.RunDbDir', tmpDir)
+    setParam('MCS.DbURL', url)
+    setParam('MCS.Postgres.CreateDbExe', '')
+
+    db = getDatabase()
+    db.initDb()
+    db.addYearCols()
+
+    simId = db.createSim(args.trials, 'benchmark')
+    db.createExp('baseline')
+
+    outputNames = ['output-%d' % i for i in range(args.outputs)]
+    session = db.Session()
+    for name in outputNames:
+        db.createOutput(name, session=session)
+    session.commit()
+
+    runIds = []
+    for trialNum in range(args.trials):
+        run = db.createRun(simId, trialNum, expName='baseline', session=session)
+        session.flush()
+        runIds.append(run.runId)
+    session.commit()
+    db.endSession(session)
+
+    yearCols = [YEAR_COL_PREFIX + y for y in activeYears()]
+
+    def resultDict(i, name):
+        isScalar = (i % 2 == 0)
+        value = float(i) if isScalar else {col: float(i) for col in yearCols}
+        return dict(paramName=name, value=value, regionName='USA', units='EJ', isScalar=isScalar)
+
+    resultsList = [resultDict(i, name) for i, name in enumerate(outputNames)]
+    runResults = [(runId, resultsList) for runId in runIds]
+    return db, url, runResults
+
+def perValueSave(db, runResults):
+    session = db.Session()
+    for runId, resultsList in runResults:
+        ids = [db.lookupOutputId(d['paramName']) for d in resultsList]
+        db.deleteRunResults(runId, outputIds=ids, session=session)
+
+        for d in resultsList:
+            if d['isScalar']:
+                db.setOutValue(runId, d['paramName'], d['value'], session=session)
+            else:
+                regionId = db.getRegionId(d['regionName'])
+                db.saveTimeSeries(runId, regionId, d['paramName'], d['value'], units=d['units'], session=session)
+
+    db.commitWithRetry(session)
+    db.endSession(session)
+
+def bulkSave(db, runResults):
+    db.saveRunResults(runResults)
+
+def main():
+    args = parseArgs()
+    db, url, runResults = setupDatabase(args)
+    rows = sum(len(resultsList) for _, resultsList in runResults)
+
+    print('Database: %s' % url)
+    print('Saving %d rows (%d trials x %d outputs)' % (rows, args.trials, args.outputs))
+
+    # Each path is run twice: once inserting new rows, once replacing them
+    for label, func in (('per-value', perValueSave), ('bulk', bulkSave)):
+        for attempt in ('insert', 'replace'):
+            start = time.time()
+            func(db, runResults)
+            secs = time.time() - start
+            print('%-10s %-8s %8.2f sec %10.0f rows/sec' % (label, attempt, secs, rows / secs))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+'''
+Benchmark computing differences between baseline and policy query results,
+comparing the pandas index-alignment path (used by computeDifference before
+DiffEngine was added) with DiffEngine, which prepares the baseline once per
+query and computes each policy's difference with NumPy array operations.
+
+Synthetic query results are generated in memory, so file I/O isn't included.
+
+Usage:
+    python benchDiff.py [--queries N] [--policies N] [--rows N]
+'''
+from __future__ import print_function
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from pygcam.config import getConfig
+from pygcam.diff import DiffEngine, _alignedDifference
+
+YEARS = [str(year) for year in [1990, 2005] + list(range(2010, 2101, 5))]
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Benchmark query result differences')
+    parser.add_argument('--queries', type=int, default=20,
+                        help='Number of queries. Default is 20.')
+    parser.add_argument('--policies', type=int, default=10,
+                        help='Number of policy scenarios per query. Default is 10.')
+    parser.add_argument('--rows', type=int, default=5000,
+                        help='Number of rows in each query result. Default is 5000.')
+    return parser.parse_args()
+
+def queryResult(rows, rng):
+    df = pd.DataFrame({'region': ['region%d' % (i % 32) for i in range(rows)],
+                       'sector': ['sector%d' % (i // 32 % 50) for i in range(rows)],
+                       'technology': ['tech%d' % (i // 1600) for i in range(rows)],
+                       'Units': 'EJ'})
+    for year in YEARS:
+        df[year] = rng.random_sample(rows)
+
+    return df
+
+def main():
+    args = parseArgs()
+    getConfig()
+    rng = np.random.RandomState(0)
+
+    baselines = [queryResult(args.rows, rng) for i in range(args.queries)]
+    policies  = [[queryResult(args.rows, rng) for j in range(args.policies)] for i in range(args.queries)]
+    print('%d queries x %d policies, %d rows each' % (args.queries, args.policies, args.rows))
+
+    start = time.time()
+    for baseline, others in zip(baselines, policies):
+        for other in others:
+            _alignedDifference(baseline, other)
+    aligned = time.time() - start
+
+    start = time.time()
+    for baseline, others in zip(baselines, policies):
+        engine = DiffEngine(baseline)
+        for other in others:
+            engine.diff(other)
+    engine = time.time() - start
+
+    count = args.queries * args.policies
+    for label, secs in (('aligned', aligned), ('DiffEngine', engine)):
+        print('%-10s %8.2f sec %8.2f ms/diff' % (label, secs, secs * 1000 / count))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+'''
+Benchmark finding the elements edited by CSV-driven XMLEditor methods such
+as buildingTechEfficiency, comparing one absolute XPath query per CSV row and
+year, as those methods originally ran, with lookups in an ElementIndex. The
+elements found by the two methods are compared to ensure they are identical.
+
+The targets are the <efficiency> (or, with --coefficient, <coefficient>)
+elements of each minicam-energy-input of each stub-technology period in the
+given GCAM building XML file, which defaults to building_det.xml in the
+reference workspace.
+
+Usage:
+    python benchElementIndex.py [--targets N] [--coefficient] [xmlFile]
+'''
+from __future__ import print_function
+import argparse
+import os
+import time
+
+from lxml import etree as ET
+
+from pygcam.config import getConfig, getParam, pathjoin
+from pygcam.xmlEditor import CachedFile, ElementIndex
+
+XPATH = "//region[@name='{}']/supplysector[@name='{}']/subsector[@name='{}']/stub-technology[@name='{}']/" \
+        "period[@year='{}']/minicam-energy-input[@name='{}']/{}"
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Benchmark XPath queries vs. ElementIndex lookups')
+    parser.add_argument('xmlFile', nargs='?',
+                        help='''The GCAM XML file to use. Default is building_det.xml in the
+                        xml directory of GCAM.RefWorkspace.''')
+    parser.add_argument('--targets', type=int, default=500,
+                        help='Maximum number of elements to find. Default is 500.')
+    parser.add_argument('--coefficient', action='store_true',
+                        help='Find <coefficient> rather than <efficiency> elements.')
+    return parser.parse_args()
+
+def findTargets(tree, leaf, count):
+    targets = []
+    for elt in tree.iterfind('world/region/*/subsector/stub-technology/period/minicam-energy-input/' + leaf):
+        inputElt = elt.getparent()
+        period = inputElt.getparent()
+        tech = period.getparent()
+        subsector = tech.getparent()
+        sector = subsector.getparent()
+        region = sector.getparent()
+
+        names = (region.get('name'), sector.get('name'), subsector.get('name'),
+                 tech.get('name'), period.get('year'), inputElt.get('name'))
+        if None not in names:
+            targets.append(names)
+            if len(targets) == count:
+                break
+
+    return targets
+
+def main():
+    args = parseArgs()
+    getConfig()
+
+    xmlFile = args.xmlFile or pathjoin(getParam('GCAM.RefWorkspace'), 'input', getParam('GCAM.DataDir'),
+                                       'xml', 'building_det.xml')
+    if not os.path.exists(xmlFile):
+        raise SystemExit("File '%s' not found" % xmlFile)
+
+    leaf = 'coefficient' if args.coefficient else 'efficiency'
+
+    start = time.time()
+    tree = ET.parse(xmlFile, CachedFile.parser)
+    parseSecs = time.time() - start
+
+    targets = findTargets(tree, leaf, args.targets)
+    print('%s: %.1f MB, parsed in %.2f sec, %d target elements' %
+          (xmlFile, os.path.getsize(xmlFile) / 2.0**20, parseSecs, len(targets)))
+
+    start = time.time()
+    byXpath = [tree.xpath(XPATH.format(*(names + (leaf,)))) for names in targets]
+    xpathSecs = time.time() - start
+
+    start = time.time()
+    index = ElementIndex(tree, filename=xmlFile)
+    buildSecs = time.time() - start
+
+    path = "minicam-energy-input[@name='{}']/" + leaf
+    byIndex = [index.select(names[:5], path=path.format(names[5]), tag='period') for names in targets]
+    indexSecs = time.time() - start
+
+    if byXpath != byIndex:
+        print('Results differ!')
+
+    n = max(len(targets), 1)
+    print('XPath      %8.3f sec %8.3f ms/element' % (xpathSecs, xpathSecs * 1000 / n))
+    print('Index      %8.3f sec %8.3f ms/element (including %.3f sec to build the index)' %
+          (indexSecs, indexSecs * 1000 / n, buildSecs))
+
+if __name__ == '__main__':
+    main()
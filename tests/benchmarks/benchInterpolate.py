@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+'''
+Benchmark interpolating query results to annual values, comparing the
+original implementation, which adds one DataFrame column per year, with
+interpolateYears(), which builds the annual matrix with NumPy. The results
+of the two are also compared to ensure they are identical.
+
+If CSV files are given, they are read as GCAM batch query results and used
+instead of synthetic data.
+
+Usage:
+    python benchInterpolate.py [--rows N] [--reps N] [--startYear YEAR] [csvFile ...]
+'''
+from __future__ import print_function
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from pygcam.config import getConfig
+from pygcam.query import interpolateYears, _interpolateYearsByColumn, readCsv
+
+YEARS = [str(year) for year in [1990, 2005] + list(range(2010, 2101, 5))]
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Benchmark interpolation of query results')
+    parser.add_argument('csvFiles', nargs='*',
+                        help='Query result CSV files to use instead of synthetic data.')
+    parser.add_argument('--rows', type=int, default=5000,
+                        help='Number of rows in the synthetic query result. Default is 5000.')
+    parser.add_argument('--reps', type=int, default=10,
+                        help='Number of times to interpolate each query result. Default is 10.')
+    parser.add_argument('--startYear', type=int, default=0,
+                        help='Year at which to start interpolating. Default is 0.')
+    return parser.parse_args()
+
+def queryResult(rows, rng):
+    df = pd.DataFrame({'region': ['region%d' % (i % 32) for i in range(rows)],
+                       'sector': ['sector%d' % (i // 32 % 50) for i in range(rows)],
+                       'Units': 'EJ'})
+    for year in YEARS:
+        df[year] = rng.random_sample(rows)
+
+    return df
+
+def timeIt(func, dfs, reps, startYear):
+    start = time.time()
+    for i in range(reps):
+        results = [func(df.copy(), startYear=startYear) for df in dfs]
+    return time.time() - start, results
+
+def main():
+    args = parseArgs()
+    getConfig()
+
+    if args.csvFiles:
+        dfs = [readCsv(filename) for filename in args.csvFiles]
+    else:
+        dfs = [queryResult(args.rows, np.random.RandomState(0))]
+
+    print('%d query results, %d rows total, %d reps' % (len(dfs), sum(len(df) for df in dfs), args.reps))
+
+    oldSecs, oldResults = timeIt(_interpolateYearsByColumn, dfs, args.reps, args.startYear)
+    newSecs, newResults = timeIt(interpolateYears, dfs, args.reps, args.startYear)
+
+    for old, new in zip(oldResults, newResults):
+        if not old[new.columns].equals(new):
+            print('Results differ!')
+
+    for label, secs in (('by column', oldSecs), ('NumPy', newSecs)):
+        print('%-10s %8.3f sec %8.2f ms/call' % (label, secs, secs * 1000 / (args.reps * len(dfs))))
+
+if __name__ == '__main__':
+    main()
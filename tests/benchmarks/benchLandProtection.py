@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+'''
+Benchmark applying a land-protection scenario to GCAM land XML files, comparing
+LandProtection.protectLand, which parses each file in full, with
+protectLandStream, which rewrites each file in a single iterparse pass. Each
+method runs in a fresh process so its peak memory use can be reported. The
+files written by the two methods are compared to ensure they are identical.
+
+The land files default to those in the reference workspace, and the scenario
+file defaults to the value of GCAM.LandProtectionXmlFile.
+
+Usage:
+    python benchLandProtection.py [--scenarioFile FILE] [--jobs N] scenario [xmlFile ...]
+'''
+from __future__ import print_function
+import argparse
+import filecmp
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+from pygcam.config import getConfig, getParam
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Benchmark tree-based vs. streaming land protection')
+    parser.add_argument('scenario', help='The name of the protection scenario to apply.')
+    parser.add_argument('xmlFiles', nargs='*',
+                        help='''The land XML files to protect. Default is the land files in the
+                        reference workspace.''')
+    parser.add_argument('--scenarioFile',
+                        help='The protection scenario file. Default is the value of GCAM.LandProtectionXmlFile.')
+    parser.add_argument('--jobs', type=int, default=4,
+                        help='The number of files to stream at once. Default is 4.')
+    return parser.parse_args()
+
+def peakMB():
+    # ru_maxrss is in KB on Linux (bytes on macOS, which inflates these values)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def protectFile(stream, scenarioFile, scenarioName, inFile, outFile):
+    from pygcam.landProtection import parseLandProtectionFile, protectLandStream
+
+    getConfig()
+    landProtection = parseLandProtectionFile(scenarioFile=scenarioFile)
+
+    start = time.time()
+    if stream:
+        protectLandStream(inFile, outFile, scenarioName, backup=False)
+    else:
+        landProtection.protectLand(inFile, outFile, scenarioName, backup=False)
+
+    return time.time() - start, peakMB()
+
+def runFiles(stream, jobs, scenarioFile, scenarioName, pairs):
+    from concurrent.futures import ProcessPoolExecutor
+
+    # max_tasks_per_child isn't available in all versions, so use a new pool per
+    # file when measuring memory of sequential runs.
+    start = time.time()
+    results = []
+    if jobs == 1:
+        for inFile, outFile in pairs:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                results.append(pool.submit(protectFile, stream, scenarioFile, scenarioName,
+                                           inFile, outFile).result())
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(protectFile, stream, scenarioFile, scenarioName, inFile, outFile)
+                       for inFile, outFile in pairs]
+            results = [future.result() for future in futures]
+
+    return time.time() - start, max(mb for _, mb in results)
+
+def main():
+    from pygcam.landProtection import _landXmlPaths
+
+    args = parseArgs()
+    getConfig()
+
+    scenarioFile = args.scenarioFile or getParam('GCAM.LandProtectionXmlFile')
+    xmlFiles = args.xmlFiles or _landXmlPaths(getParam('GCAM.RefWorkspace'))
+
+    for path in xmlFiles:
+        if not os.path.exists(path):
+            raise SystemExit("File '%s' not found" % path)
+        print('%s: %.1f MB' % (path, os.path.getsize(path) / 2.0**20))
+
+    tmpDir = tempfile.mkdtemp()
+    treeDir = os.path.join(tmpDir, 'tree')
+    streamDir = os.path.join(tmpDir, 'stream')
+    os.mkdir(treeDir)
+    os.mkdir(streamDir)
+
+    def pairs(outDir):
+        return [(path, os.path.join(outDir, os.path.basename(path))) for path in xmlFiles]
+
+    try:
+        treeSecs, treeMB = runFiles(False, 1, scenarioFile, args.scenario, pairs(treeDir))
+        seqSecs, seqMB = runFiles(True, 1, scenarioFile, args.scenario, pairs(streamDir))
+        parSecs, parMB = runFiles(True, args.jobs, scenarioFile, args.scenario, pairs(streamDir))
+
+        for path in xmlFiles:
+            name = os.path.basename(path)
+            if not filecmp.cmp(os.path.join(treeDir, name), os.path.join(streamDir, name), shallow=False):
+                print('Results differ for %s!' % name)
+
+        print('Tree               %8.2f sec  peak %7.1f MB per process' % (treeSecs, treeMB))
+        print('Stream             %8.2f sec  peak %7.1f MB per process' % (seqSecs, seqMB))
+        print('Stream (%d jobs)    %8.2f sec  peak %7.1f MB per process' % (args.jobs, parSecs, parMB))
+    finally:
+        shutil.rmtree(tmpDir)
+
+if __name__ == '__main__':
+    main()
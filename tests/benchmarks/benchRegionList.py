@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+'''
+Benchmark the cold-start cost of region discovery, i.e., the time taken by a
+new process (as for each "gt query" or "gt run" sub-command started by an MCS
+trial) to import pygcam and call getRegionList(), with and without the region
+cache file named by GCAM.RegionCacheFile.
+
+A synthetic reference workspace is created in a temporary directory, holding
+a GCAM config file and socioeconomics input files of the given size.
+
+Usage:
+    python benchRegionList.py [--processes N] [--mbytes N]
+'''
+from __future__ import print_function
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from pygcam.constants import GCAM_32_REGIONS
+
+STATES = ['AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'DC', 'FL', 'GA', 'HI', 'ID',
+          'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO',
+          'MT', 'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA',
+          'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY']
+
+CONFIG_XML = '''<Configuration>
+    <Files><Value name="xmlOutputFileName">../output/output.xml</Value></Files>
+    <ScenarioComponents>
+        <Value name="socioeconomics">../input/socioeconomics.xml</Value>
+        <Value name="socio_usa">../input/socio_usa.xml</Value>
+    </ScenarioComponents>
+</Configuration>
+'''
+
+# The code run in each new process
+SCRIPT = '''
+import sys
+from pygcam.config import getConfig, setParam
+getConfig()
+setParam('GCAM.RefWorkspace', sys.argv[1])
+setParam('GCAM.RefConfigFile', sys.argv[2])
+setParam('GCAM.RegionCacheFile', sys.argv[3])
+setParam('GCAM.RegionDiscovery', 'True')
+from pygcam.utils import getRegionList
+assert len(getRegionList()) > 32
+'''
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Benchmark cold-start region discovery')
+    parser.add_argument('--processes', type=int, default=10,
+                        help='Number of processes to run for each case. Default is 10.')
+    parser.add_argument('--mbytes', type=int, default=20,
+                        help='Approximate size of the socioeconomics XML file, in MB. Default is 20.')
+    return parser.parse_args()
+
+def writeSocioFile(path, regions, mbytes):
+    periods = ''.join('<period year="%d"><population>%d.0</population></period>' % (year, year)
+                      for year in range(1975, 2101, 5))
+    repeat = max(1, (mbytes * 1024 * 1024) // (len(periods) * len(regions)))
+
+    with open(path, 'w') as f:
+        f.write('<scenario><world>\n')
+        for region in regions:
+            f.write('<region name="%s"><demographics>' % region)
+            for i in range(repeat):
+                f.write(periods)
+            f.write('</demographics></region>\n')
+        f.write('</world></scenario>\n')
+
+def createWorkspace(workspace, mbytes):
+    for name in ('exe', 'input'):
+        os.makedirs(os.path.join(workspace, name))
+
+    configFile = os.path.join(workspace, 'exe', 'configuration_ref.xml')
+    with open(configFile, 'w') as f:
+        f.write(CONFIG_XML)
+
+    writeSocioFile(os.path.join(workspace, 'input', 'socioeconomics.xml'), GCAM_32_REGIONS, mbytes)
+    writeSocioFile(os.path.join(workspace, 'input', 'socio_usa.xml'), STATES + ['USA'], max(1, mbytes // 4))
+    return configFile
+
+def runProcesses(count, workspace, configFile, cacheFile):
+    start = time.time()
+    for i in range(count):
+        subprocess.check_call([sys.executable, '-c', SCRIPT, workspace, configFile, cacheFile])
+
+    return time.time() - start
+
+def main():
+    args = parseArgs()
+    tmpDir = tempfile.mkdtemp()
+    workspace = os.path.join(tmpDir, 'Workspace')
+    cacheFile = os.path.join(tmpDir, 'region-cache.json')
+
+    try:
+        configFile = createWorkspace(workspace, args.mbytes)
+        print('Running %d processes with a %d MB socioeconomics file' % (args.processes, args.mbytes))
+
+        for label, cache in (('no cache', ''), ('cache', cacheFile)):
+            secs = runProcesses(args.processes, workspace, configFile, cache)
+            print('%-10s %8.2f sec %8.1f ms/process' % (label, secs, secs * 1000 / args.processes))
+    finally:
+        shutil.rmtree(tmpDir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
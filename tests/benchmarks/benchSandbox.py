@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+'''
+Benchmark the creation of MCS trial sandboxes, reported as the mean time per
+sandbox with and without the sandbox template controlled by GCAM.SandboxTemplate,
+using each of the methods available for GCAM.SandboxCloneMethod.
+
+A synthetic reference workspace is created in a temporary directory, holding
+a number of files to copy into each sandbox and an input directory to link to.
+
+Usage:
+    python benchSandbox.py [--sandboxes N] [--files N] [--kbytes N]
+'''
+from __future__ import print_function
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from pygcam.config import getConfig, setParam, setUsingMCS
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Benchmark sandbox creation')
+    parser.add_argument('--sandboxes', type=int, default=50,
+                        help='Number of sandboxes to create for each case. Default is 50.')
+    parser.add_argument('--files', type=int, default=20,
+                        help='Number of files to copy into each sandbox. Default is 20.')
+    parser.add_argument('--kbytes', type=int, default=1024,
+                        help='Size of each file to copy, in KB. Default is 1024.')
+    return parser.parse_args()
+
+def createWorkspace(workspace, numFiles, kbytes):
+    data = os.urandom(kbytes * 1024)
+    copied = []
+
+    for i in range(numFiles):
+        relPath = os.path.join('exe', 'file%03d.dat' % i)
+        path = os.path.join(workspace, relPath)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        copied.append(relPath)
+
+    for name in ('input', 'local-xml', 'dyn-xml'):
+        os.makedirs(os.path.join(workspace, name))
+
+    setParam('GCAM.RequiredFiles', ' '.join(copied + ['input']))
+    setParam('GCAM.SandboxFilesToLink', 'input')
+    setParam('GCAM.CopyAllFiles', 'False')
+
+def createSandboxes(workspace, sandboxDir, count, useTemplate, method):
+    from pygcam.scenarioSetup import createSandbox, SandboxTemplate
+
+    setParam('GCAM.SandboxTemplate', str(useTemplate))
+    setParam('GCAM.SandboxCloneMethod', method)
+    SandboxTemplate.instances.clear()
+    shutil.rmtree(os.path.join(workspace, '.sandbox-template'), ignore_errors=True)
+
+    start = time.time()
+    for i in range(count):
+        sandbox = os.path.join(sandboxDir, 'trial-%d' % i, 'exp')
+        createSandbox(sandbox, srcWorkspace=workspace, mcsMode='trial')
+
+    return time.time() - start
+
+def main():
+    args = parseArgs()
+    setUsingMCS(True)
+    getConfig(reload=True)
+    setParam('GCAM.LogLevel', 'WARNING')
+
+    tmpDir = tempfile.mkdtemp()
+    workspace = os.path.join(tmpDir, 'Workspace')
+
+    try:
+        createWorkspace(workspace, args.files, args.kbytes)
+        print('Creating %d sandboxes with %d files of %d KB each' % (args.sandboxes, args.files, args.kbytes))
+
+        cases = [('no template', False, 'auto')] + \
+                [('template/' + method, True, method) for method in ('reflink', 'copy')]
+
+        for label, useTemplate, method in cases:
+            sandboxDir = os.path.join(tmpDir, 'sandboxes')
+            try:
+                secs = createSandboxes(workspace, sandboxDir, args.sandboxes, useTemplate, method)
+            except Exception as e:
+                print('%-18s failed: %s' % (label, e))
+                continue
+            finally:
+                shutil.rmtree(sandboxDir, ignore_errors=True)
+
+            print('%-18s %8.2f sec %8.1f ms/sandbox' % (label, secs, secs * 1000 / args.sandboxes))
+    finally:
+        shutil.rmtree(tmpDir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+'''
+Benchmark the startup time of "gt", i.e., the time to import pygcam, read the
+configuration, register sub-commands and parse the command line. Each command
+is run in a new python process, as gt is run by "gt run" and by MCS workers.
+The commands run are "gt --help" and "gt run --help", which exercise startup
+without running any project steps.
+
+With --mcs, the MCS sub-commands are also registered, as when running under
+pygcam.mcs. With --importtime, the modules taking the most time to import
+(including their own imports) are listed for each command.
+
+Usage:
+    python benchStartup.py [--reps N] [--mcs] [--importtime]
+'''
+from __future__ import print_function
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+COMMANDS = [['--help'], ['run', '--help']]
+
+SCRIPT = '''
+import sys
+from pygcam.config import setUsingMCS
+setUsingMCS(%s)
+from pygcam.tool import main
+sys.exit(main(sys.argv[1:]))
+'''
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Benchmark gt startup time')
+    parser.add_argument('--reps', type=int, default=10,
+                        help='Number of times to run each command. Default is 10.')
+    parser.add_argument('--mcs', action='store_true',
+                        help='Register the MCS sub-commands, too.')
+    parser.add_argument('--importtime', action='store_true',
+                        help='Show the slowest imports for each command.')
+    return parser.parse_args()
+
+def runCommand(script, command, importtime=False):
+    args = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', script] + command
+    with open(os.devnull, 'w') as devnull:
+        proc = subprocess.Popen(args, stdout=devnull, stderr=subprocess.PIPE, universal_newlines=True)
+        _, stderr = proc.communicate()
+
+    if proc.returncode:
+        sys.exit("Command 'gt %s' failed:\n%s" % (' '.join(command), stderr))
+
+    return stderr
+
+def showImportTimes(stderr, count=15):
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        fields = line[len('import time:'):].split('|')
+        if fields[1].strip().isdigit():
+            rows.append((int(fields[1]), fields[2].strip()))
+
+    rows.sort(reverse=True)
+    for usec, module in rows[:count]:
+        print('    %8.1f ms  %s' % (usec / 1000.0, module))
+
+def main():
+    args = parseArgs()
+    script = SCRIPT % args.mcs
+
+    for command in COMMANDS:
+        runCommand(script, command)     # warm the filesystem cache and any on-disk caches
+
+        times = []
+        for i in range(args.reps):
+            start = time.time()
+            runCommand(script, command)
+            times.append(time.time() - start)
+
+        times.sort()
+        print('gt %-12s median %6.3f sec  min %6.3f sec' % (' '.join(command), times[len(times) // 2], times[0]))
+
+        if args.importtime:
+            showImportTimes(runCommand(script, command, importtime=True))
+
+if __name__ == '__main__':
+    main()
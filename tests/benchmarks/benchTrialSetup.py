@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+'''
+Benchmark the setup phase of MCS baseline trials, i.e., reading parameters.xml
+and the GCAM input files it modifies, running the XPath queries, applying the
+trial data, and writing the modified files, reported as trials per minute with
+and without the per-engine cache controlled by MCS.CacheParameterInfo.
+
+This requires an existing simulation (created by "gt gensim") in a configured
+project. Modified XML files are written to a temporary directory rather than
+to the simulation's trial directories.
+
+Usage:
+    python benchTrialSetup.py -s SCENARIO [-P PROJECT] [-g GROUP] [--simId N] [--trials N]
+'''
+from __future__ import print_function
+import argparse
+import shutil
+import tempfile
+import time
+
+from pygcam.config import getConfig, getParam, setSection, setUsingMCS
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Benchmark MCS trial setup')
+    parser.add_argument('-P', '--projectName', default=None,
+                        help='The project name. Default is the value of GCAM.DefaultProject.')
+    parser.add_argument('-g', '--groupName', default='',
+                        help='The scenario group. Default is the empty string.')
+    parser.add_argument('-s', '--scenario', required=True,
+                        help='The baseline scenario to set up trials for.')
+    parser.add_argument('--simId', type=int, default=1,
+                        help='The simulation ID. Default is 1.')
+    parser.add_argument('--trials', type=int, default=20,
+                        help='Number of trials to set up for each case. Default is 20.')
+    return parser.parse_args()
+
+def setupTrials(args, useCache):
+    from pygcam.mcs.context import Context
+    from pygcam.mcs.XMLParameterFile import XMLParameter, decache
+    from pygcam.mcs.worker import _readParameterInfo, _readTrialData
+
+    decache()       # start each case from scratch
+    paramPath = getParam('MCS.ParametersFile')
+    tmpDir = tempfile.mkdtemp()
+
+    try:
+        start = time.time()
+        for trialNum in range(args.trials):
+            context = Context(projectName=args.projectName, simId=args.simId, trialNum=trialNum,
+                              scenario=args.scenario, groupName=args.groupName, store=False)
+            paramFile = _readParameterInfo(context, paramPath, useCache=useCache)
+            df = _readTrialData(args.simId, useCache=useCache)
+
+            for linkName, dataCol in XMLParameter.getParameterLinks():
+                if linkName not in df.columns:
+                    df[linkName] = df[dataCol]
+
+            XMLParameter.applyTrial(args.simId, trialNum, df)
+            paramFile.writeLocalXmlFiles(tmpDir)
+
+        return time.time() - start
+    finally:
+        shutil.rmtree(tmpDir, ignore_errors=True)
+
+def main():
+    args = parseArgs()
+
+    setUsingMCS(True)
+    getConfig(reload=True)
+    if args.projectName:
+        setSection(args.projectName)
+
+    print('Setting up %d trials of %s for simId %d' % (args.trials, args.scenario, args.simId))
+
+    for label, useCache in (('uncached', False), ('cached', True)):
+        secs = setupTrials(args, useCache)
+        print('%-10s %8.2f sec %10.1f trials/min' % (label, secs, args.trials * 60 / secs))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+#
+# A stand-in for project steps, used by TestParallelSetup.py
+#
+from pygcam.subcommand import SubcommandABC
+
+class StepLogCommand(SubcommandABC):
+    def __init__(self, subparsers):
+        kwargs = {'help' : '''Record a project step in a log file (for testing).'''}
+        super(StepLogCommand, self).__init__('steplog', subparsers, kwargs)
+
+    def addArgs(self, parser):
+        parser.add_argument('scenario', help='''The scenario being processed.''')
+
+        parser.add_argument('step', help='''The name of the step.''')
+
+        parser.add_argument('-l', '--logFile', required=True,
+                            help='''The file to append "scenario step" to.''')
+
+        parser.add_argument('-f', '--fail', action='append', default=[],
+                            help='''Fail if the scenario has this name. May be repeated.''')
+
+        parser.add_argument('-w', '--writeXml',
+                            help='''An XML file to rewrite via the file cache.''')
+
+        return parser
+
+    def run(self, args, tool):
+        import os
+        from pygcam.error import PygcamException
+        from pygcam.xmlEditor import CachedFile
+
+        if args.scenario in args.fail:
+            raise PygcamException("Step '%s' failed for scenario '%s'" % (args.step, args.scenario))
+
+        if args.writeXml:
+            # Replace the file rather than rewriting it in place, since other
+            # scenarios may read it at the same time.
+            item = CachedFile.getFile(args.writeXml)
+            tmpFile = '%s.%s' % (item.filename, args.scenario)
+            item.tree.write(tmpFile, xml_declaration=True, encoding='utf-8')
+            os.rename(tmpFile, item.filename)
+            CachedFile.written.add(item.filename)
+
+        with open(args.logFile, 'a') as f:
+            f.write('%s %s\n' % (args.scenario, args.step))
+
+PluginClass = StepLogCommand
@@ -0,0 +1,42 @@
+'''
+Pure-python stand-in for ModelInterface's batch mode, used by TestQueryBatches.
+Rather than running the queries in the batch file, it writes a placeholder CSV
+file for each command.
+
+Usage:
+    python modelInterfaceStandIn.py -b batchFile
+'''
+import argparse
+import os
+import sys
+
+def runBatch(batchFile, log):
+    from lxml import etree as ET
+
+    tree = ET.parse(batchFile)
+    for command in tree.iterfind('.//command'):
+        scenario  = command.find('scenario').get('name')
+        queryFile = command.findtext('queryFile')
+        csvFile   = command.findtext('outFile')
+
+        queryTree = ET.parse(queryFile)
+        regions = [elt.get('name') for elt in queryTree.iterfind('.//aQuery/region')]
+        queries = queryTree.xpath('//aQuery/*[@title]')
+        title = queries[0].get('title') if queries else os.path.basename(queryFile)
+
+        log.write("Running query '%s' on scenario '%s'\n" % (title, scenario))
+
+        with open(csvFile, 'w') as f:
+            f.write('%s\n' % title)
+            f.write('scenario,region,Units,2015,2020\n')
+            for region in regions:
+                f.write('%s,%s,none,0,0\n' % (scenario, region))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-b', dest='batchFile', required=True)
+    args = parser.parse_args()
+    runBatch(args.batchFile, sys.stdout)
+
+if __name__ == '__main__':
+    main()